@@ -0,0 +1,25 @@
+"""Add embedding storage mode to event_names
+
+Revision ID: event_embedding_storage
+Revises: face_clusters
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'event_embedding_storage'
+down_revision: Union[str, Sequence[str], None] = 'face_clusters'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # float32, float16 or int8; existing events keep full-precision vectors in memory
+    op.add_column('event_names', sa.Column('embedding_storage', sa.String(), server_default='float32', nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('event_names', 'embedding_storage')
@@ -0,0 +1,24 @@
+"""Add version counter to event_names for search-result cache invalidation
+
+Revision ID: event_version
+Revises: face_embeddings
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'event_version'
+down_revision: Union[str, Sequence[str], None] = 'face_embeddings'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('event_names', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('event_names', 'version')
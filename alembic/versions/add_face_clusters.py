@@ -0,0 +1,48 @@
+"""Add face_clusters table and face_embeddings.cluster_id for people albums
+
+Revision ID: face_clusters
+Revises: event_version
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'face_clusters'
+down_revision: Union[str, Sequence[str], None] = 'event_version'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # One row per person found in an event's photos
+    op.create_table('face_clusters',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('event_id', sa.Integer(), nullable=True),
+        sa.Column('model_name', sa.String(), nullable=True),
+        sa.Column('centroid', sa.LargeBinary(), nullable=True),
+        sa.Column('size', sa.Integer(), nullable=True),
+        sa.Column('representative_face_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['event_id'], ['event_names.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_face_clusters_id'), 'face_clusters', ['id'], unique=False)
+    op.create_index(op.f('ix_face_clusters_event_id'), 'face_clusters', ['event_id'], unique=False)
+
+    op.add_column('face_embeddings', sa.Column('cluster_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('fk_face_embeddings_cluster_id', 'face_embeddings', 'face_clusters',
+                          ['cluster_id'], ['id'], ondelete='SET NULL')
+    op.create_index(op.f('ix_face_embeddings_cluster_id'), 'face_embeddings', ['cluster_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_face_embeddings_cluster_id'), table_name='face_embeddings')
+    op.drop_constraint('fk_face_embeddings_cluster_id', 'face_embeddings', type_='foreignkey')
+    op.drop_column('face_embeddings', 'cluster_id')
+    op.drop_index(op.f('ix_face_clusters_event_id'), table_name='face_clusters')
+    op.drop_index(op.f('ix_face_clusters_id'), table_name='face_clusters')
+    op.drop_table('face_clusters')
@@ -0,0 +1,44 @@
+"""Add face_embeddings table for stored face vectors
+
+Revision ID: face_embeddings
+Revises: initial_complete
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'face_embeddings'
+down_revision: Union[str, Sequence[str], None] = 'initial_complete'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # One row per detected face, vector stored as raw float32 bytes
+    op.create_table('face_embeddings',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('photo_id', sa.Integer(), nullable=True),
+        sa.Column('event_id', sa.Integer(), nullable=True),
+        sa.Column('face_index', sa.Integer(), nullable=True),
+        sa.Column('bbox', sa.JSON(), nullable=True),
+        sa.Column('det_score', sa.Float(), nullable=True),
+        sa.Column('embedding', sa.LargeBinary(), nullable=True),
+        sa.Column('model_name', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['photo_id'], ['photo_videos.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['event_id'], ['event_names.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_face_embeddings_id'), 'face_embeddings', ['id'], unique=False)
+    op.create_index(op.f('ix_face_embeddings_photo_id'), 'face_embeddings', ['photo_id'], unique=False)
+    op.create_index(op.f('ix_face_embeddings_event_id'), 'face_embeddings', ['event_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_face_embeddings_event_id'), table_name='face_embeddings')
+    op.drop_index(op.f('ix_face_embeddings_photo_id'), table_name='face_embeddings')
+    op.drop_index(op.f('ix_face_embeddings_id'), table_name='face_embeddings')
+    op.drop_table('face_embeddings')
@@ -0,0 +1,27 @@
+"""Add quality gate columns to face_embeddings
+
+Revision ID: face_quality
+Revises: event_embedding_storage
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'face_quality'
+down_revision: Union[str, Sequence[str], None] = 'event_embedding_storage'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Faces stored before the gate existed stay searchable
+    op.add_column('face_embeddings', sa.Column('low_quality', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column('face_embeddings', sa.Column('quality', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('face_embeddings', 'quality')
+    op.drop_column('face_embeddings', 'low_quality')
@@ -0,0 +1,30 @@
+"""Add perceptual hash and burst duplicate link to photo_videos
+
+Revision ID: photo_burst_hash
+Revises: face_quality
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'photo_burst_hash'
+down_revision: Union[str, Sequence[str], None] = 'face_quality'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Photos processed before this stay unhashed and are never used as burst representatives
+    op.add_column('photo_videos', sa.Column('phash', sa.BigInteger(), nullable=True))
+    op.add_column('photo_videos', sa.Column('duplicate_of_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('fk_photo_videos_duplicate_of_id', 'photo_videos', 'photo_videos',
+                          ['duplicate_of_id'], ['id'], ondelete='SET NULL')
+
+
+def downgrade() -> None:
+    op.drop_constraint('fk_photo_videos_duplicate_of_id', 'photo_videos', type_='foreignkey')
+    op.drop_column('photo_videos', 'duplicate_of_id')
+    op.drop_column('photo_videos', 'phash')
@@ -0,0 +1,27 @@
+"""Add content hash to photo_videos, unique per event
+
+Revision ID: photo_content_hash
+Revises: photo_burst_hash
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'photo_content_hash'
+down_revision: Union[str, Sequence[str], None] = 'photo_burst_hash'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing photos keep a NULL hash, which never conflicts
+    op.add_column('photo_videos', sa.Column('content_sha256', sa.String(length=64), nullable=True))
+    op.create_index('ix_photo_videos_event_content_sha256', 'photo_videos', ['event_id', 'content_sha256'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_photo_videos_event_content_sha256', table_name='photo_videos')
+    op.drop_column('photo_videos', 'content_sha256')
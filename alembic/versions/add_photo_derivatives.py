@@ -0,0 +1,25 @@
+"""Add derivatives (reduced WebP copies) to photo_videos
+
+Revision ID: photo_derivatives
+Revises: photo_content_hash
+Create Date: 2026-10-17 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'photo_derivatives'
+down_revision: Union[str, Sequence[str], None] = 'photo_content_hash'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing photos get their derivatives generated on first request
+    op.add_column('photo_videos', sa.Column('derivatives', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('photo_videos', 'derivatives')
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Recall@k and latency of the IVF index against exact search.
+
+Generates synthetic identity-clustered embeddings (a few faces per person,
+several faces per photo) and runs the same selfie queries through the
+exact matrix scan and the IVF index at several nprobe values.
+
+Usage:
+    python benchmarks/ann_benchmark.py --faces 300000 --top-k 50 --nprobe 4 8 16 32
+"""
+
+import sys
+import os
+import time
+import argparse
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from utils.face_index import EventFaceIndex, normalize_rows
+
+def synthetic_event(n_faces: int, dim: int, faces_per_identity: int, faces_per_photo: int,
+                    noise: float, seed: int = 0):
+    """Face vectors scattered around identity centres, grouped into photos"""
+    rng = np.random.default_rng(seed)
+    n_identities = max(1, n_faces // faces_per_identity)
+    centres = normalize_rows(rng.standard_normal((n_identities, dim)))
+    identity = rng.integers(0, n_identities, n_faces)
+    embeddings = normalize_rows(centres[identity] + noise * rng.standard_normal((n_faces, dim)).astype(np.float32) / np.sqrt(dim))
+    photo_ids = np.arange(n_faces) // faces_per_photo
+    return centres, embeddings, photo_ids
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q) * 1000)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faces", type=int, default=300000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--faces-per-identity", type=int, default=20)
+    parser.add_argument("--faces-per-photo", type=int, default=6)
+    parser.add_argument("--noise", type=float, default=1.0, help="Per-face noise norm (1.0 gives ~0.5 same-person similarity)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=50)
+    parser.add_argument("--threshold", type=float, default=0.3)
+    parser.add_argument("--nlist", type=int, default=0, help="0 = sqrt(faces)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    args = parser.parse_args()
+
+    print(f"Generating {args.faces} faces ({args.dim}-d)...")
+    centres, embeddings, photo_ids = synthetic_event(
+        args.faces, args.dim, args.faces_per_identity, args.faces_per_photo, args.noise
+    )
+    index = EventFaceIndex(0, embeddings, np.arange(args.faces), photo_ids, "synthetic")
+
+    rng = np.random.default_rng(1)
+    query_ids = rng.integers(0, len(centres), args.queries)
+    queries = normalize_rows(centres[query_ids] + args.noise * rng.standard_normal((args.queries, args.dim)).astype(np.float32) / np.sqrt(args.dim))
+
+    settings.ANN_NLIST = args.nlist
+    start = time.perf_counter()
+    index.ann()
+    print(f"IVF build: {time.perf_counter() - start:.2f}s, {index.ann().nlist} lists")
+
+    # Exact baseline
+    exact_results, exact_times = [], []
+    for q in queries:
+        start = time.perf_counter()
+        exact_results.append(index.search(q, top_k=args.top_k, threshold=args.threshold, exact=True))
+        exact_times.append(time.perf_counter() - start)
+
+    print(f"\n{'mode':<14}{'recall@k':>10}{'p50 ms':>10}{'p99 ms':>10}{'speedup':>10}")
+    exact_p50 = percentile_ms(exact_times, 50)
+    print(f"{'exact':<14}{1.0:>10.3f}{exact_p50:>10.2f}{percentile_ms(exact_times, 99):>10.2f}{1.0:>10.1f}")
+
+    for nprobe in args.nprobe:
+        recalls, times = [], []
+        for q, expected in zip(queries, exact_results):
+            start = time.perf_counter()
+            got = index.search(q, top_k=args.top_k, threshold=args.threshold, exact=False, nprobe=nprobe)
+            times.append(time.perf_counter() - start)
+            if expected:
+                expected_ids = {photo_id for photo_id, _ in expected}
+                recalls.append(len(expected_ids & {photo_id for photo_id, _ in got}) / len(expected_ids))
+        p50 = percentile_ms(times, 50)
+        recall = float(np.mean(recalls)) if recalls else float('nan')
+        print(f"{'ivf nprobe=' + str(nprobe):<14}{recall:>10.3f}{p50:>10.2f}{percentile_ms(times, 99):>10.2f}{exact_p50 / p50:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Files per second of a bulk event upload at different MinIO writer counts.
+
+Runs services/bulk_upload.py end to end: hashing, concurrent MinIO writes
+and batched PhotoVideo inserts into a throwaway SQLite database. By
+default MinIO is replaced by a local stand-in that accepts each put_object
+after a fixed round-trip latency plus the transfer time at a given
+bandwidth, so the effect of concurrency can be measured without a server;
+--endpoint writes to a real MinIO instead (e.g. `minio server /tmp/data`).
+Each run uses a fresh event, so no file is skipped as a duplicate.
+
+Usage:
+    python benchmarks/bulk_upload_benchmark.py --files 2000 --size-kb 500 --workers 1 4 8 16
+    python benchmarks/bulk_upload_benchmark.py --endpoint localhost:9000 --files 500
+"""
+
+import sys
+import os
+import io
+import time
+import argparse
+import tempfile
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class StandInMinio:
+    """Accepts put_object calls after a simulated round trip, keeping nothing"""
+
+    def __init__(self, latency_ms: float, bandwidth_mbps: float):
+        self.latency = latency_ms / 1000
+        self.bytes_per_second = bandwidth_mbps * 1024 ** 2 / 8
+
+    def bucket_exists(self, bucket_name):
+        return True
+
+    def put_object(self, bucket_name, object_name, data, length, **kwargs):
+        size = 0
+        while chunk := data.read(1024 * 1024):
+            size += len(chunk)
+        time.sleep(self.latency + size / self.bytes_per_second)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--size-kb", type=int, default=500, help="Size of each synthetic photo")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="MINIO_UPLOAD_WORKERS values")
+    parser.add_argument("--insert-batch", type=int, default=None, help="UPLOAD_INSERT_BATCH (default: setting)")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Stand-in round trip per object")
+    parser.add_argument("--bandwidth-mbps", type=float, default=1000.0, help="Stand-in bandwidth per connection")
+    parser.add_argument("--endpoint", help="Write to this MinIO instead of the stand-in")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    if args.endpoint:
+        os.environ["MINIO_ENDPOINT"] = args.endpoint
+
+    from config import settings
+    from database import SessionLocal, engine
+    from extensions import Base
+    from models import Admin, EventName
+    from services.bulk_upload import bulk_upload
+    from services.minio_service import minio_service
+
+    Base.metadata.create_all(engine)
+    if args.insert_batch:
+        settings.UPLOAD_INSERT_BATCH = args.insert_batch
+    bucket_name = "bulk-upload-benchmark"
+    if args.endpoint:
+        minio_service.create_bucket(bucket_name)
+    else:
+        minio_service.client = StandInMinio(args.latency_ms, args.bandwidth_mbps)
+
+    db = SessionLocal()
+    admin = Admin(email="benchmark@example.com", password="-")
+    db.add(admin)
+    db.commit()
+
+    # Distinct content per file, so the content hash never skips one
+    payload = os.urandom(args.size_kb * 1024)
+    target = "MinIO at " + args.endpoint if args.endpoint else f"stand-in ({args.latency_ms:g} ms, {args.bandwidth_mbps:g} Mbit/s)"
+    print(f"{args.files} files of {args.size_kb} KB to {target}, {settings.UPLOAD_INSERT_BATCH} rows per insert")
+    print(f"\n{'workers':>8}{'files/s':>10}{'MB/s':>8}{'hash s':>8}{'upload s':>10}{'insert s':>10}{'failed':>8}")
+
+    for workers in args.workers:
+        event = EventName(event_name=f"benchmark-{workers}", admin_id=admin.id)
+        db.add(event)
+        db.commit()
+        files = [(f"photo_{i}.jpg", io.BytesIO(i.to_bytes(8, "big") + payload), "image/jpeg") for i in range(args.files)]
+
+        start = time.perf_counter()
+        report = bulk_upload(db, event.id, bucket_name, files, workers=workers)
+        db.commit()
+        elapsed = time.perf_counter() - start
+
+        seconds = report.seconds
+        print(f"{workers:>8}{args.files / elapsed:>10.1f}{args.files * args.size_kb / 1024 / elapsed:>8.1f}"
+              f"{seconds['hash']:>8.2f}{seconds['upload']:>10.2f}{seconds['insert']:>10.2f}{report.count('failed'):>8}")
+    db.close()
+
+if __name__ == "__main__":
+    main()
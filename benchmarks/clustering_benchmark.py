@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Time, peak memory and quality of per-event face clustering (people albums).
+
+Generates synthetic identity-clustered embeddings, clusters them with
+utils.face_clustering.cluster_faces and reports wall time, peak traced
+NumPy memory, the number of clusters found against the true number of
+identities, purity (share of faces whose cluster is dominated by their
+identity) and completeness (average share of an identity's faces in its
+largest cluster). It then times the incremental path used when
+edit_event adds photos: the last --new-fraction of faces are assigned to
+the existing cluster centroids.
+
+Usage:
+    python benchmarks/clustering_benchmark.py --faces 100000 --threshold 0.4
+"""
+
+import sys
+import os
+import time
+import argparse
+import tracemalloc
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.face_clustering import assign_to_centroids, cluster_centroids, cluster_faces
+from utils.face_index import normalize_rows
+
+def synthetic_faces(n_faces: int, dim: int, faces_per_identity: int, noise: float, seed: int = 0):
+    """Face vectors scattered around random identity centres, with their identity"""
+    rng = np.random.default_rng(seed)
+    n_identities = max(1, n_faces // faces_per_identity)
+    centres = normalize_rows(rng.standard_normal((n_identities, dim)))
+    identity = rng.integers(0, n_identities, n_faces)
+    noise_vectors = noise * rng.standard_normal((n_faces, dim)).astype(np.float32) / np.sqrt(dim)
+    return normalize_rows(centres[identity] + noise_vectors), identity
+
+def cluster_quality(labels: np.ndarray, identity: np.ndarray):
+    """(purity, completeness) of a clustering against the true identities"""
+    # Size of every (cluster, identity) cell
+    pairs, counts = np.unique(np.stack([labels, identity]), axis=1, return_counts=True)
+    dominant_per_cluster = np.zeros(labels.max() + 1, dtype=np.int64)
+    np.maximum.at(dominant_per_cluster, pairs[0], counts)
+    largest_per_identity = np.zeros(identity.max() + 1, dtype=np.int64)
+    np.maximum.at(largest_per_identity, pairs[1], counts)
+    identity_sizes = np.bincount(identity)
+    present = identity_sizes > 0
+    purity = dominant_per_cluster.sum() / len(labels)
+    completeness = float(np.mean(largest_per_identity[present] / identity_sizes[present]))
+    return purity, completeness
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faces", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--faces-per-identity", type=int, default=20)
+    parser.add_argument("--noise", type=float, default=1.0, help="Per-face noise norm (1.0 gives ~0.5 same-person similarity)")
+    parser.add_argument("--threshold", type=float, default=0.4)
+    parser.add_argument("--merge-threshold", type=float, default=0.6)
+    parser.add_argument("--neighbors", type=int, default=10)
+    parser.add_argument("--new-fraction", type=float, default=0.1, help="Share of faces added incrementally")
+    args = parser.parse_args()
+
+    print(f"Generating {args.faces} faces ({args.dim}-d, ~{args.faces_per_identity} per identity)...")
+    embeddings, identity = synthetic_faces(args.faces, args.dim, args.faces_per_identity, args.noise)
+    n_identities = len(np.unique(identity))
+    n_existing = int(args.faces * (1 - args.new_fraction))
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    labels = cluster_faces(embeddings[:n_existing], threshold=args.threshold, k=args.neighbors,
+                           merge_threshold=args.merge_threshold)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    purity, completeness = cluster_quality(labels, identity[:n_existing])
+    print(f"\nFull clustering of {n_existing} faces")
+    print(f"  time         {elapsed:.2f}s")
+    print(f"  peak memory  {peak / 1024 ** 2:.0f} MB (input matrix {embeddings[:n_existing].nbytes / 1024 ** 2:.0f} MB)")
+    print(f"  clusters     {labels.max() + 1} (true identities {len(np.unique(identity[:n_existing]))})")
+    print(f"  purity       {purity:.4f}")
+    print(f"  completeness {completeness:.4f}")
+
+    # Incremental: new faces join the nearest existing centroid
+    n_clusters = int(labels.max()) + 1
+    centroids = cluster_centroids(embeddings[:n_existing], labels, n_clusters)
+    start = time.perf_counter()
+    new_labels = assign_to_centroids(embeddings[n_existing:], centroids, args.threshold)
+    elapsed = time.perf_counter() - start
+
+    assigned = new_labels >= 0
+    all_labels = np.r_[labels, np.where(assigned, new_labels, n_clusters + np.arange(len(new_labels)))]
+    purity, completeness = cluster_quality(all_labels, identity)
+    print(f"\nIncremental assignment of {len(new_labels)} new faces")
+    print(f"  time         {elapsed:.2f}s")
+    print(f"  assigned     {assigned.mean():.4f}")
+    print(f"  purity       {purity:.4f}")
+    print(f"  completeness {completeness:.4f} (all {args.faces} faces, {n_identities} identities)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Recall and speedup of coarse-to-fine (people cluster) search against exact search.
+
+Runs the same selfie queries through EventFaceIndex.search with the exact
+strategy and with the "clusters" strategy at several COARSE_CLUSTERS
+values, reporting recall@k against exact, p50 latency, speedup and how
+often the ambiguity check fell back to an exact scan.
+
+Synthetic mode (default) generates identity-clustered faces, clusters
+them with utils.face_clustering.cluster_faces and queries with fresh faces
+of known people plus a share of strangers. With --event-id the stored
+embeddings and cluster ids of a real event are used instead (after
+ingest with CLUSTER_AT_INGEST), with --queries faces held out as selfies.
+
+Usage:
+    python benchmarks/coarse_search_benchmark.py --faces 200000 --clusters 4 8 16
+    python benchmarks/coarse_search_benchmark.py --event-id 12 --model buffalo_l
+"""
+
+import sys
+import os
+import time
+import argparse
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from utils.face_clustering import cluster_faces
+from utils.face_index import EventFaceIndex, normalize_rows
+
+def synthetic_setup(args):
+    """Index over clustered synthetic faces, plus selfie queries"""
+    rng = np.random.default_rng(0)
+    n_identities = max(1, args.faces // args.faces_per_identity)
+    centres = normalize_rows(rng.standard_normal((n_identities, args.dim)))
+
+    def faces_of(identity):
+        noise = args.noise * rng.standard_normal((len(identity), args.dim)).astype(np.float32) / np.sqrt(args.dim)
+        return normalize_rows(centres[identity] + noise)
+
+    embeddings = faces_of(rng.integers(0, n_identities, args.faces))
+    photo_ids = np.arange(args.faces) // args.faces_per_photo
+
+    start = time.perf_counter()
+    labels = cluster_faces(embeddings, threshold=settings.CLUSTER_THRESHOLD, merge_threshold=settings.CLUSTER_MERGE_THRESHOLD)
+    # Singletons are stored without a cluster, as in services/people_albums.py
+    labels[np.bincount(labels)[labels] < settings.CLUSTER_MIN_FACES] = -1
+    print(f"Clustered in {time.perf_counter() - start:.1f}s: {len(np.unique(labels[labels >= 0]))} clusters, "
+          f"{int((labels < 0).sum())} unclustered faces")
+
+    n_strangers = int(args.queries * args.strangers)
+    queries = np.r_[
+        faces_of(rng.integers(0, n_identities, args.queries - n_strangers)),
+        normalize_rows(rng.standard_normal((n_strangers, args.dim)))
+    ]
+    index = EventFaceIndex(0, embeddings, np.arange(args.faces), photo_ids, "synthetic", cluster_ids=labels)
+    return index, queries
+
+def event_setup(args):
+    """Index over a stored event with held-out faces as queries"""
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        full = EventFaceIndex.from_db(db, args.event_id, args.model)
+    finally:
+        db.close()
+    if len(full) == 0:
+        raise SystemExit(f"No {args.model} faces stored for event {args.event_id}")
+
+    rng = np.random.default_rng(0)
+    held_out = np.zeros(len(full), dtype=bool)
+    held_out[rng.choice(len(full), min(args.queries, len(full) // 10), replace=False)] = True
+    keep = ~held_out
+    print(f"Event {args.event_id}: {int(keep.sum())} faces, {len(np.unique(full.cluster_ids[full.cluster_ids >= 0]))} clusters")
+    index = EventFaceIndex(args.event_id, full.embeddings[keep], full.face_ids[keep], full.photo_ids[keep],
+                           args.model, cluster_ids=full.cluster_ids[keep])
+    return index, np.asarray(full.embeddings[held_out])
+
+def run(index, queries, args, **search_args):
+    results, times = [], []
+    for q in queries:
+        start = time.perf_counter()
+        results.append(index.search(q, top_k=args.top_k, threshold=args.threshold, **search_args))
+        times.append(time.perf_counter() - start)
+    return results, float(np.percentile(times, 50) * 1000)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--event-id", type=int, help="Benchmark a stored event instead of synthetic data")
+    parser.add_argument("--model", default="buffalo_l", help="FaceEmbedding.model_name of the event's faces")
+    parser.add_argument("--faces", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--faces-per-identity", type=int, default=20)
+    parser.add_argument("--faces-per-photo", type=int, default=6)
+    parser.add_argument("--noise", type=float, default=1.0, help="Per-face noise norm (1.0 gives ~0.5 same-person similarity)")
+    parser.add_argument("--strangers", type=float, default=0.2, help="Share of synthetic queries of people not in the event")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=50)
+    parser.add_argument("--threshold", type=float, default=0.3)
+    parser.add_argument("--clusters", type=int, nargs="+", default=[2, 4, 8, 16], help="COARSE_CLUSTERS values")
+    parser.add_argument("--margin", type=float, default=settings.COARSE_MARGIN)
+    args = parser.parse_args()
+
+    index, queries = event_setup(args) if args.event_id else synthetic_setup(args)
+    index.coarse()  # build the centroid index outside the timings
+    settings.COARSE_MARGIN = args.margin
+
+    exact, exact_p50 = run(index, queries, args, strategy="exact")
+    print(f"\n{'mode':<14}{'recall@k':>10}{'p50 ms':>10}{'speedup':>10}{'fallback':>10}")
+    print(f"{'exact':<14}{1.0:>10.3f}{exact_p50:>10.2f}{1.0:>10.1f}{'-':>10}")
+
+    for n_clusters in args.clusters:
+        settings.COARSE_CLUSTERS = n_clusters
+        index.coarse_searches = index.coarse_fallbacks = 0
+        results, p50 = run(index, queries, args, strategy="clusters")
+
+        recalls = []
+        for ref, res in zip(exact, results):
+            if ref:
+                found = {photo_id for photo_id, _ in res}
+                recalls.append(sum(photo_id in found for photo_id, _ in ref) / len(ref))
+        recall = float(np.mean(recalls)) if recalls else 1.0
+        fallback = index.coarse_fallbacks / max(1, index.coarse_searches)
+        print(f"{'clusters=' + str(n_clusters):<14}{recall:>10.3f}{p50:>10.2f}{exact_p50 / p50:>10.1f}{fallback:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Decode time and peak memory of full-size versus reduced-resolution decoding.
+
+Compares the old path (Image.open().convert('RGB') + np.array()[:, :, ::-1])
+with utils.image_decode.decode_image at several target long sides. Each mode
+runs in a fresh subprocess so its peak RSS is measured in isolation.
+Without --images a synthetic 24 MP JPEG is generated.
+
+Usage:
+    python benchmarks/decode_benchmark.py --images path/to/photos --max-side 1024 2048
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _proc_status_mb(field: str) -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    raise KeyError(field)
+
+def reset_peak_rss() -> float:
+    """Reset the peak RSS high-water mark (Linux) and return the current RSS in MB"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return _proc_status_mb("VmRSS")
+    except OSError:
+        return peak_rss_mb()
+
+def peak_rss_mb() -> float:
+    try:
+        return _proc_status_mb("VmHWM")
+    except OSError:
+        # ru_maxrss is in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_child(mode: str, paths):
+    """Decode every path in one mode and print timing and peak memory as JSON"""
+    from PIL import Image
+    from utils.image_decode import decode_image
+
+    baseline = reset_peak_rss()
+    times = []
+    for path in paths:
+        start = time.perf_counter()
+        if mode == "full":
+            img = Image.open(path).convert('RGB')
+            bgr = np.array(img)[:, :, ::-1]
+            del img
+        else:
+            bgr = decode_image(path, int(mode)).bgr
+        times.append(time.perf_counter() - start)
+        shape = bgr.shape
+        del bgr
+
+    print(json.dumps({
+        "ms_per_image": 1000 * float(np.mean(times)),
+        "peak_mb": peak_rss_mb() - baseline,
+        "shape": list(shape),
+    }))
+
+def synthetic_jpeg(directory: str) -> str:
+    """A 6000x4000 (24 MP) JPEG with enough texture to decode like a photo"""
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    small = rng.integers(0, 256, (400, 600, 3), dtype=np.uint8)
+    path = os.path.join(directory, "synthetic_24mp.jpg")
+    Image.fromarray(small).resize((6000, 4000)).save(path, quality=90)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="Folder of JPEG photos (default: one synthetic 24 MP JPEG)")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--max-side", type=int, nargs="+", default=[1024, 2048])
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("paths", nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.paths)
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if args.images:
+            paths = sorted(
+                os.path.join(args.images, name) for name in os.listdir(args.images)
+                if name.lower().endswith(('.jpg', '.jpeg'))
+            )[:args.limit]
+        else:
+            paths = [synthetic_jpeg(temp_dir)]
+
+        print(f"{len(paths)} images\n")
+        print(f"{'mode':<16}{'ms/image':>10}{'peak MB':>10}  decoded shape")
+        for mode in ["full"] + [str(side) for side in args.max_side]:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", mode, *paths],
+                capture_output=True, text=True, check=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            label = "full decode" if mode == "full" else f"max_side={mode}"
+            print(f"{label:<16}{result['ms_per_image']:>10.1f}{result['peak_mb']:>10.1f}  {tuple(result['shape'])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+How much each ingest quality gate shrinks the search index.
+
+With --event-id the gate is replayed over the measures stored with an
+event's faces at ingest, so thresholds can be tuned without re-running
+the models. With --images the configured face engine detects the faces of
+a directory of photos and the gate is applied to fresh measures. Either
+way the report lists, per gate, the faces it rejects (and those only it
+rejects), the total shrink of the default search index and the float32
+vector bytes kept out of it.
+
+Thresholds default to the FACE_* settings; 0 disables a gate.
+
+Usage:
+    python benchmarks/quality_gate_report.py --event-id 12 --min-size 48 --max-yaw 45
+    python benchmarks/quality_gate_report.py --images ./sample_photos
+"""
+
+import sys
+import os
+import argparse
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from utils.face_quality import QUALITY_GATES, GateReport, failed_gates, gate_report, measure_face
+
+def stored_report(args, limits):
+    """Replay the gate over an event's stored (det_score, quality) measures"""
+    from database import SessionLocal
+    from models import FaceEmbedding
+
+    db = SessionLocal()
+    try:
+        rows = db.query(FaceEmbedding.det_score, FaceEmbedding.quality).filter(
+            FaceEmbedding.event_id == args.event_id,
+            FaceEmbedding.model_name == args.model
+        ).all()
+    finally:
+        db.close()
+    if not rows:
+        raise SystemExit(f"No {args.model} faces stored for event {args.event_id}")
+    unmeasured = sum(quality is None for _, quality in rows)
+    if unmeasured:
+        print(f"{unmeasured} faces were stored before the gate existed; only their det_score is checked")
+    return gate_report(rows, args.dim, limits)
+
+def images_report(args, limits):
+    """Detect the faces of a directory of photos and apply the gate"""
+    from utils.face_engine import get_face_engine
+    from utils.image_decode import decode_image
+
+    engine = get_face_engine()
+    report = GateReport(engine.dimension)
+    names = sorted(n for n in os.listdir(args.images) if n.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')))
+    for name in names:
+        # Same decode as ingest, so sizes are in the pixels the model sees
+        image = decode_image(os.path.join(args.images, name), settings.DETECTION_MAX_SIDE).bgr
+        for face in engine.detect(image):
+            report.add(failed_gates(face["det_score"], measure_face(image, face), limits))
+    print(f"{len(names)} photos")
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--event-id", type=int, help="Replay the gate over a stored event")
+    source.add_argument("--images", help="Directory of photos to detect and measure")
+    parser.add_argument("--model", default="buffalo_l", help="FaceEmbedding.model_name of the event's faces")
+    parser.add_argument("--dim", type=int, default=512, help="Embedding dimension, for the bytes saved")
+    parser.add_argument("--min-det-score", type=float, default=settings.FACE_MIN_DET_SCORE)
+    parser.add_argument("--min-size", type=float, default=settings.FACE_MIN_SIZE)
+    parser.add_argument("--max-yaw", type=float, default=settings.FACE_MAX_YAW)
+    parser.add_argument("--min-sharpness", type=float, default=settings.FACE_MIN_SHARPNESS)
+    args = parser.parse_args()
+
+    limits = {"det_score": args.min_det_score, "size": args.min_size, "yaw": args.max_yaw, "blur": args.min_sharpness}
+    report = stored_report(args, limits) if args.event_id else images_report(args, limits)
+    summary = report.summary()
+
+    print(f"\n{'gate':<11}{'limit':>8}{'rejects':>10}{'shrink':>9}{'only':>8}")
+    for gate in QUALITY_GATES:
+        stats = summary["gates"][gate]
+        limit = f"{limits[gate]:g}" if limits[gate] else "off"
+        print(f"{gate:<11}{limit:>8}{stats['failed']:>10}{stats['shrink']:>9.1%}{stats['only_this_gate']:>8}")
+    print(f"\n{summary['low_quality']}/{summary['faces']} faces below the gate: the default index shrinks by "
+          f"{summary['shrink']:.1%} ({summary['bytes_saved'] / 1024 ** 2:.1f} MB of vectors)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Memory, recall and latency of float32, float16 and int8 embedding storage.
+
+Writes one synthetic event as a shard in each storage mode, reopens it the
+way search workers do (float32 vectors memory-mapped, compact copy in
+memory) and runs the same selfie queries through the exact strategy.
+Reports in-process index memory, recall@k against float32 and p50 latency
+for several RESCORE_CANDIDATES values.
+
+Usage:
+    python benchmarks/quantization_benchmark.py --faces 1000000 --rescore 64 256 1024
+"""
+
+import sys
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from utils.face_index import EventFaceIndex, normalize_rows
+
+def synthetic_event(n_faces: int, dim: int, faces_per_identity: int, faces_per_photo: int, noise: float):
+    """Face vectors scattered around identity centres, grouped into photos, plus their centres"""
+    rng = np.random.default_rng(0)
+    n_identities = max(1, n_faces // faces_per_identity)
+    centres = normalize_rows(rng.standard_normal((n_identities, dim)))
+    embeddings = np.empty((n_faces, dim), dtype=np.float32)
+    # In chunks, so generating a million faces doesn't need several copies at once
+    for start in range(0, n_faces, 100000):
+        count = min(100000, n_faces - start)
+        noise_vectors = noise * rng.standard_normal((count, dim)).astype(np.float32) / np.sqrt(dim)
+        embeddings[start:start + count] = normalize_rows(centres[rng.integers(0, n_identities, count)] + noise_vectors)
+    return embeddings, np.arange(n_faces) // faces_per_photo, centres
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faces", type=int, default=300000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--faces-per-identity", type=int, default=20)
+    parser.add_argument("--faces-per-photo", type=int, default=6)
+    parser.add_argument("--noise", type=float, default=1.0, help="Per-face noise norm (1.0 gives ~0.5 same-person similarity)")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=50)
+    parser.add_argument("--threshold", type=float, default=0.3)
+    parser.add_argument("--rescore", type=int, nargs="+", default=[64, 256, 1024], help="RESCORE_CANDIDATES values")
+    args = parser.parse_args()
+
+    print(f"Generating {args.faces} faces ({args.dim}-d)...")
+    embeddings, photo_ids, centres = synthetic_event(
+        args.faces, args.dim, args.faces_per_identity, args.faces_per_photo, args.noise
+    )
+    rng = np.random.default_rng(1)
+    queries = normalize_rows(centres[rng.integers(0, len(centres), args.queries)]
+                             + args.noise * rng.standard_normal((args.queries, args.dim)).astype(np.float32) / np.sqrt(args.dim))
+    face_ids = np.arange(args.faces)
+
+    with tempfile.TemporaryDirectory() as shard_root:
+        settings.EMBEDDING_SHARD_DIR = shard_root
+        reference = None
+        print(f"\n{'storage':<10}{'rescore':>9}{'memory MB':>11}{'recall@k':>10}{'p50 ms':>10}")
+
+        for storage in ("float32", "float16", "int8"):
+            # Keep only the shard-backed index alive, as a search worker would
+            EventFaceIndex(0, embeddings, face_ids, photo_ids, "synthetic",
+                           stats=(args.faces, args.faces - 1), storage=storage).save_shard()
+            index = EventFaceIndex.from_shard(0, "synthetic")
+            if storage == "float32":
+                # float32 workers hold the whole matrix in memory
+                index.embeddings = np.array(index.embeddings)
+
+            for rescore in ([None] if storage == "float32" else args.rescore):
+                if rescore:
+                    settings.RESCORE_CANDIDATES = rescore
+                results, times = [], []
+                for q in queries:
+                    start = time.perf_counter()
+                    results.append(index.search(q, top_k=args.top_k, threshold=args.threshold, strategy="exact"))
+                    times.append(time.perf_counter() - start)
+                if reference is None:
+                    reference = results
+
+                recalls = []
+                for ref, res in zip(reference, results):
+                    if ref:
+                        found = {photo_id for photo_id, _ in res}
+                        recalls.append(sum(photo_id in found for photo_id, _ in ref) / len(ref))
+                recall = float(np.mean(recalls)) if recalls else 1.0
+                print(f"{storage:<10}{str(rescore or '-'):>9}{index.memory_bytes() / 1024 ** 2:>11.1f}"
+                      f"{recall:>10.3f}{np.percentile(times, 50) * 1000:>10.2f}")
+            del index
+
+if __name__ == "__main__":
+    main()
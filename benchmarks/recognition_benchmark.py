@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Throughput of batched face extraction against the per-face app.get path.
+
+Runs a folder of photos through FaceAnalysis.get (every model, one face at a
+time) and through FaceVerif.extract_faces_batch at several batch sizes,
+reporting images/s and faces/s, and checks that both paths produce the same
+embeddings.
+
+Usage:
+    python benchmarks/recognition_benchmark.py --images path/to/photos --batch-size 1 8 32 64
+"""
+
+import sys
+import os
+import time
+import argparse
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.insight_face import FaceVerif, get_app, load_bgr
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", required=True, help="Folder of .jpg/.jpeg/.png photos")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--images-per-call", type=int, default=8, help="Images passed to each extract_faces_batch call")
+    args = parser.parse_args()
+
+    paths = sorted(
+        os.path.join(args.images, name) for name in os.listdir(args.images)
+        if name.lower().endswith(('.jpg', '.jpeg', '.png'))
+    )[:args.limit]
+    if not paths:
+        print("No images found")
+        return
+
+    # Decode once up front so only inference is timed
+    images = [load_bgr(path) for path in paths]
+    face_verif = FaceVerif()
+    face_verif.extract_faces_batch(images[:1])  # warm up the ONNX sessions
+
+    start = time.perf_counter()
+    reference = [[face.normed_embedding for face in get_app().get(img)] for img in images]
+    elapsed = time.perf_counter() - start
+    n_faces = sum(len(faces) for faces in reference)
+    print(f"{len(images)} images, {n_faces} faces\n")
+    print(f"{'path':<18}{'images/s':>10}{'faces/s':>10}{'max |1-cos|':>14}")
+    print(f"{'app.get':<18}{len(images) / elapsed:>10.2f}{n_faces / elapsed:>10.2f}{0.0:>14.2e}")
+
+    for batch_size in args.batch_size:
+        results = []
+        start = time.perf_counter()
+        for i in range(0, len(images), args.images_per_call):
+            results.extend(face_verif.extract_faces_batch(images[i:i + args.images_per_call], batch_size=batch_size))
+        elapsed = time.perf_counter() - start
+
+        # Same detector and order, so faces line up one to one
+        deviation = 0.0
+        for ref_faces, faces in zip(reference, results):
+            for ref, face in zip(ref_faces, faces):
+                deviation = max(deviation, abs(1.0 - float(np.dot(ref, face["embedding"]))))
+
+        print(f"{'batch=' + str(batch_size):<18}{len(images) / elapsed:>10.2f}{n_faces / elapsed:>10.2f}{deviation:>14.2e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Latency and throughput of selfie search with and without micro-batching.
+
+Simulates a burst of guests: --concurrency async clients each send
+--requests selfies back to back through download/app.py:run_selfie_match,
+the path both selfie endpoints take (decode and rank on the inference
+executor, embedding awaited from the micro-batcher). Runs once per
+--max-batch value (1 = one selfie per inference call, on the executor) and reports p50/p99
+latency, selfies/s and the average batch size. The event searched is a
+throwaway SQLite database with --faces random faces; selfie and result
+caches are disabled so every request is embedded.
+
+With --images the configured FACE_ENGINE embeds real selfies. Without it a
+simulated engine is used whose cost is a fixed per-call overhead plus a
+per-image cost (--call-ms, --image-ms) on a single device, which is the
+shape that batching amortizes. --workers sets INFERENCE_WORKERS (default:
+the setting, i.e. the CPU count), so small hosts can be reproduced.
+
+Usage:
+    python benchmarks/selfie_batching_benchmark.py --images path/to/selfies --concurrency 32
+    python benchmarks/selfie_batching_benchmark.py --call-ms 8 --image-ms 2 --max-batch 1 16 --workers 1
+"""
+
+import sys
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.face_engine import FaceEngine
+
+class SimulatedEngine(FaceEngine):
+    """embed_batch stand-in returning one random face per image; one lock models a single inference device"""
+
+    model_id = "simulated"
+    dimension = 512
+    call_ms = 8.0
+    image_ms = 2.0
+    _device = threading.Lock()
+
+    def embed_batch(self, images, batch_size=None):
+        with self._device:
+            time.sleep((self.call_ms + self.image_ms * len(images)) / 1000)
+        rng = np.random.default_rng()
+        faces = []
+        for _ in images:
+            embedding = rng.standard_normal(self.dimension).astype(np.float32)
+            faces.append([{"face_index": 0, "bbox": [0, 0, 64, 64], "det_score": 0.99,
+                           "embedding": embedding / np.linalg.norm(embedding)}])
+        return faces
+
+def create_event(n_faces: int, engine) -> int:
+    """An event with n_faces random faces of the engine's model, one per photo"""
+    from database import SessionLocal, engine as db_engine
+    from extensions import Base
+    from models import Admin, EventName, FaceEmbedding, PhotoVideo
+
+    Base.metadata.create_all(db_engine)
+    db = SessionLocal()
+    try:
+        admin = Admin(email="benchmark@example.com", password="-")
+        db.add(admin)
+        db.flush()
+        event = EventName(event_name="benchmark", admin_id=admin.id)
+        db.add(event)
+        db.flush()
+        rng = np.random.default_rng(0)
+        for i in range(n_faces):
+            photo = PhotoVideo(event_id=event.id, file_path=f"benchmark/{i}.jpg", is_processed=True)
+            db.add(photo)
+            db.flush()
+            embedding = rng.standard_normal(engine.dimension).astype(np.float32)
+            db.add(FaceEmbedding(
+                photo_id=photo.id, event_id=event.id, face_index=0, bbox=[0, 0, 64, 64], det_score=0.99,
+                embedding=(embedding / np.linalg.norm(embedding)).tobytes(), model_name=engine.model_id
+            ))
+        db.commit()
+        return event.id
+    finally:
+        db.close()
+
+async def run_load(run_selfie_match, selfies, event_id: int, concurrency: int, requests: int):
+    """Run concurrency clients x requests selfie searches and return (latencies, elapsed, failures)"""
+    latencies, failures = [], 0
+
+    async def client(worker: int):
+        nonlocal failures
+        for i in range(requests):
+            selfie = selfies[(worker * requests + i) % len(selfies)]
+            start = time.perf_counter()
+            response = await run_selfie_match(selfie, "benchmark", event_id)
+            latencies.append(time.perf_counter() - start)
+            failures += response.status_code != 200
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(w) for w in range(concurrency)))
+    return np.array(latencies), time.perf_counter() - start, failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="Folder of selfies for the real engine (default: simulated engine)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=10, help="Requests per client")
+    parser.add_argument("--max-batch", type=int, nargs="+", default=[1, 16], help="SELFIE_BATCH_MAX_SIZE values")
+    parser.add_argument("--max-latency-ms", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, default=None, help="INFERENCE_WORKERS (default: setting)")
+    parser.add_argument("--faces", type=int, default=1000, help="Faces stored for the searched event")
+    parser.add_argument("--call-ms", type=float, default=8.0, help="Simulated fixed cost per inference call")
+    parser.add_argument("--image-ms", type=float, default=2.0, help="Simulated cost per image")
+    args = parser.parse_args()
+
+    import cv2
+    from config import settings
+    from utils.face_engine import get_face_engine, register_engine
+
+    # The database and caches are created when the app is imported, so configure them first
+    workdir = tempfile.mkdtemp()
+    settings.DATABASE_URL = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    settings.EMBEDDING_SHARD_DIR = os.path.join(workdir, "shards")
+    settings.SELFIE_CACHE_SIZE = 0
+    settings.SELFIE_CACHE_DIR = ""
+    settings.SEARCH_CACHE_SIZE = 0
+    if args.workers:
+        settings.INFERENCE_WORKERS = args.workers
+
+    if args.images:
+        paths = sorted(
+            os.path.join(args.images, name) for name in os.listdir(args.images)
+            if name.lower().endswith(('.jpg', '.jpeg', '.png', '.webp'))
+        )
+        if not paths:
+            print("No images found")
+            return
+        selfies = [open(path, "rb").read() for path in paths]
+        engine = get_face_engine()
+        engine.warm_up()
+        print(f"{len(selfies)} selfies, engine {engine.model_id}")
+    else:
+        SimulatedEngine.call_ms, SimulatedEngine.image_ms = args.call_ms, args.image_ms
+        register_engine("simulated", f"{__name__}:SimulatedEngine")
+        settings.FACE_ENGINE = "simulated"
+        engine = get_face_engine()
+        rng = np.random.default_rng(1)
+        selfies = [cv2.imencode(".jpg", (rng.random((480, 360, 3)) * 255).astype(np.uint8))[1].tobytes()
+                   for _ in range(16)]
+        print(f"Simulated engine: {args.call_ms} ms per call + {args.image_ms} ms per image")
+
+    import download.app as download_app
+    from services.inference_executor import InferenceExecutor
+    from services.micro_batcher import MicroBatcher
+
+    event_id = create_event(args.faces, engine)
+    workers = settings.INFERENCE_WORKERS or os.cpu_count() or 1
+    print(f"{args.concurrency} clients x {args.requests} requests, {workers} inference workers, "
+          f"{args.faces} faces in the event\n")
+    print(f"{'path':<22}{'p50 ms':>10}{'p99 ms':>10}{'selfies/s':>12}{'avg batch':>11}{'failed':>8}")
+
+    for max_batch in args.max_batch:
+        # Fresh executor and batcher per run, admitting every client
+        executor = InferenceExecutor(workers, args.concurrency)
+        download_app.inference_executor = executor
+        batcher = MicroBatcher(engine.embed_batch, max_batch, args.max_latency_ms, executor=executor)
+        download_app.selfie_batcher = batcher
+        latencies, elapsed, failures = asyncio.run(
+            run_load(download_app.run_selfie_match, selfies, event_id, args.concurrency, args.requests)
+        )
+        label = "one per call" if max_batch <= 1 else f"batched (max {max_batch})"
+        print(f"{label:<22}{1000 * np.percentile(latencies, 50):>10.1f}{1000 * np.percentile(latencies, 99):>10.1f}"
+              f"{len(latencies) / elapsed:>12.1f}{batcher.stats()['avg_batch_size']:>11}{failures:>8}")
+
+if __name__ == "__main__":
+    main()
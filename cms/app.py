@@ -1,15 +1,21 @@
-import logging, io, qrcode, uuid, os, re
-from fastapi import APIRouter, Request, HTTPException, Form, Depends, Query, UploadFile, File
-from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+import logging, io, qrcode, re
+from fastapi import APIRouter, Request, HTTPException, Form, Depends, Query, UploadFile, File, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from typing import Optional, List
 from jose import jwt 
 from jose.exceptions import JWTError
 from database import get_db
-from models import Admin, EventName, PhotoVideo
+from models import Admin, EventName, PhotoVideo, FaceEmbedding, FaceCluster
 from config import settings
 from services.minio_service import minio_service
+from services.bulk_upload import BulkUploadReport, bulk_upload
+from services.face_ingest import process_photos
+from services.people_albums import prune_clusters
+from utils.face_index import invalidate_event_index
+from services.selfie_cache import bump_event_version, search_result_cache
 
 logger = logging.getLogger(__name__)
 
@@ -60,13 +66,27 @@ def create_minio_bucket(bucket_name: str):
     logger.info(f"Creating MinIO bucket: {bucket_name}")
     # In a real implementation, you would use the MinIO client to create the bucket
 
+async def store_uploads(db: Session, event_id: int, bucket_name: str,
+                        images: List[UploadFile]) -> BulkUploadReport:
+    """Bulk-upload an event's images off the event loop and add their rows (not committed)"""
+    files = [(image.filename, image.file, image.content_type) for image in images]
+    return await run_in_threadpool(bulk_upload, db, event_id, bucket_name, files)
+
+def upload_redirect(report: BulkUploadReport) -> str:
+    """Dashboard URL reporting the outcome of an upload"""
+    return (f"/cms/dashboard?uploaded={len(report.photo_ids)}&skipped={report.count('duplicate')}"
+            f"&failed={report.count('failed')}")
+
 @router.get("/dashboard", response_class=HTMLResponse)
 async def dashboard_page(
     request: Request,
     db: Session = Depends(get_db),
     page: int = Query(1, ge=1),
     search: Optional[str] = Query(None),
-    items_per_page: int = Query(10, le=100)
+    items_per_page: int = Query(10, le=100),
+    uploaded: Optional[int] = Query(None),
+    skipped: Optional[int] = Query(None),
+    failed: Optional[int] = Query(None)
 ):
     # Check if user is authenticated by validating JWT token
     token = request.cookies.get("access_token")
@@ -118,14 +138,20 @@ async def dashboard_page(
         "total_pages": total_pages,
         "total_events": total_events,
         "search_query": search or "",
-        "items_per_page": items_per_page
+        "items_per_page": items_per_page,
+        # Outcome of the upload that redirected here, if any
+        "uploaded": uploaded,
+        "skipped": skipped,
+        "failed": failed
     })
 
 @router.post("/upload-event")
 async def upload_event(
     request: Request,
+    background_tasks: BackgroundTasks,
     event_name: str = Form(...),
     event_images: List[UploadFile] = File(...),
+    process_all_frames: bool = Form(False),
     db: Session = Depends(get_db)
 ):
     # Check if user is authenticated by validating JWT token
@@ -152,7 +178,8 @@ async def upload_event(
     # Save the event to the database, associating it with the admin
     new_event = EventName(
         event_name=event_name,
-        admin_id=admin.id
+        admin_id=admin.id,
+        embedding_storage=settings.EMBEDDING_STORAGE
     )
     
     try:
@@ -165,47 +192,34 @@ async def upload_event(
         bucket_name = sanitize_bucket_name(event_name)
         minio_service.create_bucket(bucket_name)
         
-        # Upload images to MinIO
-        for image in event_images:
-            if image.filename:
-                # Generate a unique filename
-                file_extension = os.path.splitext(image.filename)[1]
-                unique_filename = f"{uuid.uuid4()}{file_extension}"
-                
-                # Save temporary file
-                temp_file_path = f"temp_{unique_filename}"
-                with open(temp_file_path, "wb") as buffer:
-                    buffer.write(await image.read())
-                
-                # Upload to MinIO
-                minio_service.upload_file(bucket_name, unique_filename, temp_file_path)
-                
-                # Remove temporary file
-                os.remove(temp_file_path)
-                
-                # Save image info to database
-                photo_video = PhotoVideo(
-                    event_id=new_event.id,
-                    file_path=f"{bucket_name}/{unique_filename}"
-                )
-                db.add(photo_video)
-        
+        # Upload images to MinIO, skipping repeated files; a file that fails
+        # is reported without losing the rest of the event
+        report = await store_uploads(db, new_event.id, bucket_name, event_images)
+        new_photo_ids = report.photo_ids
+        bump_event_version(db, new_event.id)
         db.commit()
-        logger.info(f"Uploaded {len(event_images)} images to MinIO for event ID: {new_event.id}")
+        logger.info(f"Uploaded {len(new_photo_ids)} images to MinIO for event ID: {new_event.id} "
+                    f"({report.count('duplicate')} duplicate files skipped, {report.count('failed')} failed)")
+        
+        # Extract and store face embeddings once the response is sent; burst
+        # frames reuse one representative's faces unless the admin opted out
+        background_tasks.add_task(process_photos, new_photo_ids, not process_all_frames)
         
     except Exception as e:
         db.rollback()
         logger.error(f"Error saving event to database: {e}")
         raise HTTPException(status_code=500, detail="Error saving event")
     
-    return RedirectResponse(url="/cms/dashboard", status_code=303)
+    return RedirectResponse(url=upload_redirect(report), status_code=303)
 
 @router.post("/edit-event/{event_id}")
 async def edit_event(
     event_id: int,
     request: Request,
+    background_tasks: BackgroundTasks,
     event_name: str = Form(None),
     new_images: List[UploadFile] = File(default=None),
+    process_all_frames: bool = Form(False),
     db: Session = Depends(get_db)
 ):
     # Check if user is authenticated by validating JWT token
@@ -239,43 +253,143 @@ async def edit_event(
         event.event_name = event_name
     
     try:
-        # Upload new images to MinIO if provided
+        # Upload new images to MinIO if provided; re-uploaded files are skipped
+        report = BulkUploadReport()
         if new_images and any(image.filename for image in new_images):
             bucket_name = sanitize_bucket_name(event.event_name)
-            
-            # Upload new images to MinIO
-            for image in new_images:
-                if image.filename:
-                    # Generate a unique filename
-                    file_extension = os.path.splitext(image.filename)[1]
-                    unique_filename = f"{uuid.uuid4()}{file_extension}"
-                    
-                    # Save temporary file
-                    temp_file_path = f"temp_{unique_filename}"
-                    with open(temp_file_path, "wb") as buffer:
-                        buffer.write(await image.read())
-                    
-                    # Upload to MinIO
-                    minio_service.upload_file(bucket_name, unique_filename, temp_file_path)
-                    
-                    # Remove temporary file
-                    os.remove(temp_file_path)
-                    
-                    # Save image info to database
-                    photo_video = PhotoVideo(
-                        event_id=event_id,
-                        file_path=f"{bucket_name}/{unique_filename}"
-                    )
-                    db.add(photo_video)
+            report = await store_uploads(db, event_id, bucket_name, new_images)
         
+        new_photo_ids = report.photo_ids
+        bump_event_version(db, event_id)
         db.commit()
-        logger.info(f"Event ID {event_id} updated successfully")
+        logger.info(f"Event ID {event_id} updated successfully: {len(new_photo_ids)} new images, "
+                    f"{report.count('duplicate')} duplicate files skipped, {report.count('failed')} failed")
+        
+        # Extract and store face embeddings for the new photos
+        background_tasks.add_task(process_photos, new_photo_ids, not process_all_frames)
         
     except Exception as e:
         db.rollback()
         logger.error(f"Error updating event: {e}")
         raise HTTPException(status_code=500, detail="Error updating event")
     
+    return RedirectResponse(url=upload_redirect(report), status_code=303)
+
+@router.post("/bulk-upload/{event_id}")
+async def bulk_upload_photos(
+    event_id: int,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(...),
+    process_all_frames: bool = Form(False),
+    db: Session = Depends(get_db)
+):
+    """Add many photos to an event and return the outcome of every file as JSON"""
+    # Check if user is authenticated by validating JWT token
+    token = request.cookies.get("access_token")
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    # Validate JWT token
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        user_email = payload.get("sub")
+        if user_email is None:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    # Get the admin user
+    admin = db.query(Admin).filter(Admin.email == user_email).first()
+    if not admin:
+        raise HTTPException(status_code=404, detail="Admin user not found")
+    
+    # Get the event from the database, ensuring it belongs to this admin
+    event = db.query(EventName).filter(EventName.id == event_id, EventName.admin_id == admin.id).first()
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found or not authorized")
+    
+    try:
+        report = await store_uploads(db, event_id, sanitize_bucket_name(event.event_name), files)
+        bump_event_version(db, event_id)
+        db.commit()
+        background_tasks.add_task(process_photos, report.photo_ids, not process_all_frames)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error bulk uploading to event {event_id}: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Error saving uploaded photos"}
+        )
+    
+    return JSONResponse(report.summary())
+
+@router.post("/delete-photos/{event_id}")
+async def delete_photos(
+    event_id: int,
+    request: Request,
+    photo_ids: List[int] = Form(...),
+    db: Session = Depends(get_db)
+):
+    # Check if user is authenticated by validating JWT token
+    token = request.cookies.get("access_token")
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    # Validate JWT token
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        user_email = payload.get("sub")
+        if user_email is None:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    # Get the admin user
+    admin = db.query(Admin).filter(Admin.email == user_email).first()
+    if not admin:
+        raise HTTPException(status_code=404, detail="Admin user not found")
+    
+    # Get the event from the database, ensuring it belongs to this admin
+    event = db.query(EventName).filter(EventName.id == event_id, EventName.admin_id == admin.id).first()
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found or not authorized")
+    
+    try:
+        photos = db.query(PhotoVideo.id, PhotoVideo.file_path, PhotoVideo.derivatives).filter(
+            PhotoVideo.event_id == event_id,
+            PhotoVideo.id.in_(photo_ids)
+        ).all()
+        ids = [photo.id for photo in photos]
+        
+        if ids:
+            # Search indexes tombstone these faces on their next catch-up,
+            # so deleting photos never forces a rebuild of the event's index
+            cluster_ids = {cluster_id for (cluster_id,) in db.query(FaceEmbedding.cluster_id).filter(
+                FaceEmbedding.photo_id.in_(ids),
+                FaceEmbedding.cluster_id.isnot(None)
+            ).distinct()}
+            db.query(FaceEmbedding).filter(FaceEmbedding.photo_id.in_(ids)).delete(synchronize_session=False)
+            prune_clusters(db, cluster_ids)
+            db.query(PhotoVideo).filter(PhotoVideo.id.in_(ids)).delete(synchronize_session=False)
+            bump_event_version(db, event_id)
+        db.commit()
+        
+        # Stored files go last, once no row points to them
+        for photo in photos:
+            bucket_name, object_name = photo.file_path.split('/', 1)
+            try:
+                for name in [object_name, *(photo.derivatives or {}).values()]:
+                    minio_service.remove_file(bucket_name, name)
+            except Exception as e:
+                logger.error(f"Error removing photo {photo.id} from storage: {e}")
+        logger.info(f"User {user_email} deleted {len(ids)} photos from event ID {event_id}")
+        
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error deleting photos: {e}")
+        raise HTTPException(status_code=500, detail="Error deleting photos")
+    
     return RedirectResponse(url="/cms/dashboard", status_code=303)
 
 @router.post("/delete-event/{event_id}")
@@ -311,16 +425,25 @@ async def delete_event(
         raise HTTPException(status_code=404, detail="Event not found or not authorized")
     
     try:
+        # Delete stored face embeddings before the photos they point to,
+        # then the people clusters they belonged to
+        db.query(FaceEmbedding).filter(FaceEmbedding.event_id == event_id).delete()
+        db.query(FaceCluster).filter(FaceCluster.event_id == event_id).delete()
+        
         # Delete all associated photos/videos
         db.query(PhotoVideo).filter(PhotoVideo.event_id == event_id).delete()
         
-        # Delete the event
+        # Delete the event; the version bump lands in the same transaction
+        # and stops other workers from serving cached results before it commits
+        bump_event_version(db, event_id)
         db.delete(event)
         
         # Delete MinIO bucket (optional)
         # minio_service.delete_bucket(f"event-{event_id}")
         
         db.commit()
+        invalidate_event_index(event_id)
+        search_result_cache.invalidate_event(event_id)
         logger.info(f"Event ID {event_id} deleted successfully")
         
     except Exception as e:
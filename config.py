@@ -12,6 +12,91 @@ class Settings(BaseSettings):
     MINIO_ENDPOINT: str = os.getenv("MINIO_ENDPOINT", "localhost:9000")
     MINIO_ACCESS_KEY: str = os.getenv("MINIO_ACCESS_KEY", "minioadmin")
     MINIO_SECRET_KEY: str = os.getenv("MINIO_SECRET_KEY", "minioadmin")
+    # Multipart part size for streamed uploads (S3 minimum 5 MiB); bounds memory per upload
+    MINIO_PART_SIZE: int = int(os.getenv("MINIO_PART_SIZE", str(10 * 1024 * 1024)))
+    # Bulk event uploads: concurrent MinIO writers, PhotoVideo rows per INSERT
+    MINIO_UPLOAD_WORKERS: int = int(os.getenv("MINIO_UPLOAD_WORKERS", "8"))
+    UPLOAD_INSERT_BATCH: int = int(os.getenv("UPLOAD_INSERT_BATCH", "500"))
+    # Cache-Control max-age of served photos; stored objects never change, so a year is safe
+    IMAGE_CACHE_MAX_AGE: int = int(os.getenv("IMAGE_CACHE_MAX_AGE", str(365 * 24 * 3600)))
+    # Long sides (comma-separated) of the WebP copies made at ingest and served with ?size=
+    DERIVATIVE_SIZES: str = os.getenv("DERIVATIVE_SIZES", "256,1024")
+    DERIVATIVE_QUALITY: int = int(os.getenv("DERIVATIVE_QUALITY", "80"))
+    # Local disk cache of MinIO objects shared by the workers of a host (0 bytes disables it)
+    OBJECT_CACHE_DIR: str = os.getenv("OBJECT_CACHE_DIR", "data/object_cache")
+    OBJECT_CACHE_MAX_BYTES: int = int(os.getenv("OBJECT_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+    # Face engine: "insightface" (buffalo_l, ONNX Runtime) or "facenet" (facenet-pytorch)
+    FACE_ENGINE: str = os.getenv("FACE_ENGINE", "insightface")
+    # Load and warm up the face models in the background at startup; /readyz reports 503 until done.
+    # Off by default so /cms and /auth workers never load them; enable it on selfie-serving workers
+    WARM_UP_MODELS: bool = os.getenv("WARM_UP_MODELS", "false").lower() in ("1", "true", "yes")
+    RECOGNITION_BATCH_SIZE: int = int(os.getenv("RECOGNITION_BATCH_SIZE", "32"))
+    INGEST_IMAGE_BATCH: int = int(os.getenv("INGEST_IMAGE_BATCH", "8"))
+    # Photos are decoded with JPEG DCT scaling to about this long side before detection (0 = full size)
+    DETECTION_MAX_SIDE: int = int(os.getenv("DETECTION_MAX_SIDE", "2048"))
+    # Ingest quality gate (0 disables a gate): faces below it are stored as low quality and
+    # left out of the default search index. Size is the shorter bbox side in detection pixels,
+    # yaw is estimated from landmarks, sharpness is the Laplacian variance of the face crop
+    FACE_MIN_DET_SCORE: float = float(os.getenv("FACE_MIN_DET_SCORE", "0.6"))
+    FACE_MIN_SIZE: float = float(os.getenv("FACE_MIN_SIZE", "32"))
+    FACE_MAX_YAW: float = float(os.getenv("FACE_MAX_YAW", "60"))
+    FACE_MIN_SHARPNESS: float = float(os.getenv("FACE_MIN_SHARPNESS", "20"))
+    # Burst frames within this many dHash bits (of 64) of the burst of one of the previous BURST_WINDOW
+    # photos of the event (upload order) reuse its faces instead of running inference. Off by default:
+    # similar shots of different people (photo booth backdrops) can still match; admins can opt out per upload
+    BURST_DEDUP: bool = os.getenv("BURST_DEDUP", "false").lower() in ("1", "true", "yes")
+    BURST_MAX_DISTANCE: int = int(os.getenv("BURST_MAX_DISTANCE", "6"))
+    BURST_WINDOW: int = int(os.getenv("BURST_WINDOW", "3"))
+    # Face search
+    SELFIE_MATCH_TOP_K: int = int(os.getenv("SELFIE_MATCH_TOP_K", "10"))
+    SELFIE_MAX_BYTES: int = int(os.getenv("SELFIE_MAX_BYTES", str(5 * 1024 * 1024)))
+    # Also search low-quality faces by default (slower; requests can opt in per search)
+    SEARCH_INCLUDE_LOW_QUALITY: bool = os.getenv("SEARCH_INCLUDE_LOW_QUALITY", "false").lower() in ("1", "true", "yes")
+    # Selfie inference executor: threads (0 = CPU count), extra queued requests, per-request timeout
+    INFERENCE_WORKERS: int = int(os.getenv("INFERENCE_WORKERS", "0"))
+    INFERENCE_QUEUE_SIZE: int = int(os.getenv("INFERENCE_QUEUE_SIZE", "32"))
+    INFERENCE_TIMEOUT_SECONDS: float = float(os.getenv("INFERENCE_TIMEOUT_SECONDS", "30"))
+    INFERENCE_RETRY_AFTER_SECONDS: int = int(os.getenv("INFERENCE_RETRY_AFTER_SECONDS", "5"))
+    # Concurrent selfies arriving within this window are embedded as one batch (max size 1 embeds each
+    # selfie on its own on the inference executor)
+    SELFIE_BATCH_MAX_SIZE: int = int(os.getenv("SELFIE_BATCH_MAX_SIZE", "16"))
+    SELFIE_BATCH_MAX_LATENCY_MS: float = float(os.getenv("SELFIE_BATCH_MAX_LATENCY_MS", "5"))
+    # Selfie embedding cache; SELFIE_CACHE_DIR adds an on-disk tier shared by all workers
+    SELFIE_CACHE_SIZE: int = int(os.getenv("SELFIE_CACHE_SIZE", "1024"))
+    SELFIE_CACHE_TTL_SECONDS: float = float(os.getenv("SELFIE_CACHE_TTL_SECONDS", "900"))
+    SELFIE_CACHE_DIR: str = os.getenv("SELFIE_CACHE_DIR", "")
+    # Ranked results per (selfie, event version, threshold, top_k)
+    SEARCH_CACHE_SIZE: int = int(os.getenv("SEARCH_CACHE_SIZE", "4096"))
+    SEARCH_CACHE_TTL_SECONDS: float = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "900"))
+    # With SEARCH_STRATEGY=auto, events with at least this many faces are searched through an IVF index (0 disables)
+    ANN_MIN_FACES: int = int(os.getenv("ANN_MIN_FACES", "50000"))
+    ANN_NLIST: int = int(os.getenv("ANN_NLIST", "0"))  # 0 = sqrt(face count)
+    ANN_NPROBE: int = int(os.getenv("ANN_NPROBE", "16"))
+    # Search strategy: "exact", "auto" (ann above ANN_MIN_FACES, else exact), "ann" or "clusters".
+    # ann is opt-in: benchmarks/ann_benchmark.py measures recall@50 of about 0.76 at nprobe 16
+    SEARCH_STRATEGY: str = os.getenv("SEARCH_STRATEGY", "exact")
+    # "clusters": people clusters refined per selfie face, and the centroid score
+    # margin under which a left-out cluster makes the query ambiguous (exact fallback)
+    COARSE_CLUSTERS: int = int(os.getenv("COARSE_CLUSTERS", "8"))
+    COARSE_MARGIN: float = float(os.getenv("COARSE_MARGIN", "0.05"))
+    # Memory-mapped per-event embedding shards, written at ingest and compaction
+    EMBEDDING_SHARD_DIR: str = os.getenv("EMBEDDING_SHARD_DIR", "data/shards")
+    # Faces stored after a shard was written are appended to its index as segments and
+    # deleted ones tombstoned; past these limits the index is compacted in the background
+    INDEX_MAX_SEGMENTS: int = int(os.getenv("INDEX_MAX_SEGMENTS", "8"))
+    INDEX_MAX_APPENDED_FACES: int = int(os.getenv("INDEX_MAX_APPENDED_FACES", "20000"))
+    INDEX_MAX_DELETED_RATIO: float = float(os.getenv("INDEX_MAX_DELETED_RATIO", "0.2"))
+    # Storage mode recorded on new events: "float32", "float16" or "int8" (compact copy
+    # in memory, float32 on disk); compact scans rescore this many faces at full precision
+    EMBEDDING_STORAGE: str = os.getenv("EMBEDDING_STORAGE", "float32")
+    RESCORE_CANDIDATES: int = int(os.getenv("RESCORE_CANDIDATES", "256"))
+    # People albums: faces are clustered into persons after ingest
+    CLUSTER_AT_INGEST: bool = os.getenv("CLUSTER_AT_INGEST", "true").lower() in ("1", "true", "yes")
+    CLUSTER_THRESHOLD: float = float(os.getenv("CLUSTER_THRESHOLD", "0.5"))
+    # Fragments of one person whose centroids are at least this similar are merged
+    CLUSTER_MERGE_THRESHOLD: float = float(os.getenv("CLUSTER_MERGE_THRESHOLD", "0.6"))
+    CLUSTER_NEIGHBORS: int = int(os.getenv("CLUSTER_NEIGHBORS", "10"))
+    CLUSTER_MIN_FACES: int = int(os.getenv("CLUSTER_MIN_FACES", "2"))
 
     class Config:
         env_file = ".env"
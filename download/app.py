@@ -1,25 +1,29 @@
-import logging, os
-import tempfile
-from fastapi import APIRouter, Depends, Request, Form, status, Query
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse
+import logging, os, time
+import asyncio
+from fastapi import APIRouter, Depends, Request, Form, status, Query, UploadFile, File
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
-from typing import Optional, List
+from typing import NamedTuple, Optional, List, Tuple, Union
+from email.utils import format_datetime, parsedate_to_datetime
+from minio.error import S3Error
 from jose import jwt 
 from jose.exceptions import JWTError
-from database import get_db
-from models import Admin, EventName, PhotoVideo
+from database import SessionLocal, get_db
+from models import Admin, EventName, PhotoVideo, FaceEmbedding, FaceCluster
 from config import settings
-from services.minio_service import minio_service
+from services.minio_service import minio_service, iter_response
+from services.derivatives import derivative_sizes, ensure_derivative
+from services.disk_cache import disk_cache
+from services.inference_executor import inference_executor, ExecutorSaturated
+from services.micro_batcher import selfie_batcher, BatcherSaturated
+from services.selfie_cache import selfie_cache, search_result_cache
 import base64
 import cv2
 import numpy as np
-from io import BytesIO
-from PIL import Image
 
-# Import FaceVerif class for face matching
-# from utils.face_verif import FaceVerif
-from utils.insight_face import FaceVerif
+# Face engine (insightface or facenet) is chosen by settings.FACE_ENGINE
+from utils.face_engine import get_face_engine
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -28,22 +32,29 @@ templates = Jinja2Templates(directory="download/templates")
 
 router = APIRouter()
 
-def decode_base64_image(image_data):
-    """Decode base64 image data to OpenCV image"""
-    # Remove the data URL prefix if present
+def decode_image_bytes(image_bytes: bytes):
+    """Decode JPEG/PNG/WebP bytes to an OpenCV (BGR) image in memory"""
+    np_arr = np.frombuffer(image_bytes, np.uint8)
+    return cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+
+def strip_data_url(image_data: str) -> str:
+    """Remove the data URL prefix (data:image/...;base64,) if present"""
     if image_data.startswith('data:image'):
         image_data = image_data.split(',')[1]
-    
-    # Decode base64 string to bytes
-    image_bytes = base64.b64decode(image_data)
-    
-    # Convert bytes to numpy array
-    np_arr = np.frombuffer(image_bytes, np.uint8)
-    
-    # Decode image using OpenCV
-    img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
-    
-    return img
+    return image_data
+
+def selfie_too_large():
+    return JSONResponse(
+        status_code=413,
+        content={"error": f"Selfie exceeds the {settings.SELFIE_MAX_BYTES // 1024} KB limit"}
+    )
+
+def server_busy(reason: str):
+    return JSONResponse(
+        status_code=503,
+        content={"error": f"Face search is busy ({reason}), please try again shortly"},
+        headers={"Retry-After": str(settings.INFERENCE_RETRY_AFTER_SECONDS)}
+    )
 
 @router.get("/", response_class=HTMLResponse)
 async def download_page(request: Request, event_id: Optional[int] = Query(None), db: Session = Depends(get_db)):
@@ -112,24 +123,136 @@ async def get_all_images_for_event(event_id: int, db: Session = Depends(get_db))
             content={"error": "Internal server error"}
         )
 
-@router.get("/image/{photo_id}")
-async def serve_image(photo_id: int, db: Session = Depends(get_db)):
-    """Serve an image from MinIO by photo ID"""
+@router.get("/clusters/{event_id}", response_class=JSONResponse)
+async def get_event_clusters(event_id: int, limit: int = Query(200, ge=1, le=1000), db: Session = Depends(get_db)):
+    """List the people found in an event, largest first, each with a representative face"""
     try:
-        # Get photo record from database with its event
-        photo = db.query(PhotoVideo).filter(PhotoVideo.id == photo_id).first()
-        if not photo:
+        event = db.query(EventName).filter(EventName.id == event_id).first()
+        if not event:
             return JSONResponse(
                 status_code=404,
-                content={"error": "Photo not found"}
+                content={"error": "Event not found"}
             )
         
-        # Check that the photo's event exists
-        event = db.query(EventName).filter(EventName.id == photo.event_id).first()
-        if not event:
+        rows = db.query(FaceCluster.id, FaceCluster.size, FaceEmbedding.photo_id, FaceEmbedding.bbox).outerjoin(
+            FaceEmbedding, FaceEmbedding.id == FaceCluster.representative_face_id
+        ).filter(
+            FaceCluster.event_id == event_id,
+            FaceCluster.model_name == get_face_engine().model_id
+        ).order_by(FaceCluster.size.desc()).limit(limit).all()
+        
+        clusters = [{
+            "id": cluster_id,
+            "size": size,
+            # Crop bbox within /download/image/{photo_id} for the thumbnail
+            "representative": {"photo_id": photo_id, "bbox": bbox} if photo_id else None
+        } for cluster_id, size, photo_id, bbox in rows]
+        
+        return JSONResponse({
+            "success": True,
+            "clusters": clusters,
+            "event_name": event.event_name
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting clusters for event {event_id}: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Internal server error"}
+        )
+
+@router.get("/clusters/{event_id}/{cluster_id}", response_class=JSONResponse)
+async def get_cluster_photos(event_id: int, cluster_id: int, db: Session = Depends(get_db)):
+    """All photos of one person, via the indexed face_embeddings.cluster_id"""
+    try:
+        photos = db.query(PhotoVideo.id, PhotoVideo.file_path).join(
+            FaceEmbedding, FaceEmbedding.photo_id == PhotoVideo.id
+        ).filter(
+            FaceEmbedding.cluster_id == cluster_id,
+            FaceEmbedding.event_id == event_id
+        ).distinct().order_by(PhotoVideo.id).all()
+        
+        if not photos:
             return JSONResponse(
                 status_code=404,
-                content={"error": "Event not found for this photo"}
+                content={"error": "Cluster not found"}
+            )
+        
+        return JSONResponse({
+            "success": True,
+            "photos": [{"id": photo_id, "file_path": file_path} for photo_id, file_path in photos]
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting photos of cluster {cluster_id}: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Internal server error"}
+        )
+
+# Content types of stored photos that were uploaded without one, by extension
+IMAGE_CONTENT_TYPES = {".png": "image/png", ".gif": "image/gif", ".webp": "image/webp"}
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Inclusive (start, end) bytes of a single-range Range header
+
+    Returns None when there is no usable range, so the whole file is served
+    (multiple ranges included), and raises ValueError when the range lies
+    beyond the end of the file.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, _, end = header[6:].strip().partition("-")
+    try:
+        if start:
+            start, end = int(start), min(int(end), size - 1) if end else size - 1
+            if start > end and start < size:
+                return None
+        else:
+            # Suffix range: the last N bytes
+            suffix = int(end)
+            start, end = max(size - suffix, 0), size - 1 if suffix else -1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise ValueError(f"Range {header} not satisfiable for {size} bytes")
+    return start, end
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match / If-Range header names this ETag (weak or strong)"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+@router.get("/image/{photo_id}")
+def serve_image(photo_id: int, request: Request, size: Optional[int] = Query(None),
+                db: Session = Depends(get_db)):
+    """
+    Stream an image from MinIO by photo ID, or its derivative with the given long side
+
+    Sends ETag, Last-Modified and long-lived Cache-Control headers, answers
+    revalidations with 304 and single Range requests with 206. A missing
+    derivative is generated from the original and kept. A plain def, so the
+    blocking MinIO calls and the streamed body run in the threadpool.
+    """
+    try:
+        if size is not None and size not in derivative_sizes():
+            return JSONResponse(
+                status_code=400,
+                content={"error": f"size must be one of {derivative_sizes()}"}
+            )
+        
+        # The photo, provided its event still exists, in one query
+        photo = db.query(PhotoVideo.file_path, PhotoVideo.content_sha256, PhotoVideo.derivatives).join(
+            EventName, EventName.id == PhotoVideo.event_id
+        ).filter(PhotoVideo.id == photo_id).first()
+        if not photo:
+            return JSONResponse(
+                status_code=404,
+                content={"error": "Photo not found"}
             )
         
         # Parse file path to get bucket and object name
@@ -143,46 +266,81 @@ async def serve_image(photo_id: int, db: Session = Depends(get_db)):
         
         bucket_name = path_parts[0]
         object_name = path_parts[1]
+        headers = {"Cache-Control": f"public, max-age={settings.IMAGE_CACHE_MAX_AGE}"}
+        if_none_match = request.headers.get("if-none-match")
+        
+        # Uploads get fresh object names and are never rewritten, so the
+        # content hash identifies the response and revalidating needs no MinIO call
+        if photo.content_sha256:
+            headers["ETag"] = f'"{photo.content_sha256}-{size}"' if size else f'"{photo.content_sha256}"'
+            if etag_matches(if_none_match, headers["ETag"]):
+                return Response(status_code=304, headers=headers)
+        
+        if size:
+            object_name = (photo.derivatives or {}).get(str(size)) or ensure_derivative(db, photo_id, size)
         
-        # Download file from MinIO
         try:
-            # Create a temporary file to store the downloaded image
-            temp_file_path = None
-            with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-                temp_file_path = tmp_file.name
-            
-            # Download the file to the temporary location
-            minio_service.download_file(bucket_name, object_name, temp_file_path)
-            
-            # Read the file data
-            with open(temp_file_path, "rb") as f:
-                image_data = f.read()
-            
-            # Clean up temporary file
-            os.unlink(temp_file_path)
-            
-            # Determine content type based on file extension
-            content_type = "image/jpeg"
-            if object_name.lower().endswith('.png'):
-                content_type = "image/png"
-            elif object_name.lower().endswith('.gif'):
-                content_type = "image/gif"
-            
-            return StreamingResponse(BytesIO(image_data), media_type=content_type)
-                
-        except Exception as e:
-            # Clean up temporary file if it exists
-            if temp_file_path and os.path.exists(temp_file_path):
-                try:
-                    os.unlink(temp_file_path)
-                except:
-                    pass
-            logger.error(f"Error downloading file from MinIO: {e}")
-            return JSONResponse(
-                status_code=500,
-                content={"error": "Error retrieving image from storage"}
-            )
+            stat = minio_service.stat_file(bucket_name, object_name)
+        except S3Error as e:
+            if e.code == "NoSuchKey":
+                return JSONResponse(
+                    status_code=404,
+                    content={"error": "Image not found in storage"}
+                )
+            raise
+        
+        headers.setdefault("ETag", f'"{stat.etag}"')
+        headers["Last-Modified"] = format_datetime(stat.last_modified, usegmt=True)
+        headers["Accept-Ranges"] = "bytes"
+        if if_none_match is not None:
+            if etag_matches(if_none_match, headers["ETag"]):
+                return Response(status_code=304, headers=headers)
+        elif request.headers.get("if-modified-since"):
+            try:
+                if stat.last_modified.replace(microsecond=0) <= parsedate_to_datetime(request.headers["if-modified-since"]):
+                    return Response(status_code=304, headers=headers)
+            except (TypeError, ValueError):
+                pass
+        
+        # If-Range asks for the range only if the photo is still the one it has
+        byte_range = None
+        if_range = request.headers.get("if-range")
+        if if_range is None or etag_matches(if_range, headers["ETag"]):
+            try:
+                byte_range = parse_range(request.headers.get("range"), stat.size)
+            except ValueError:
+                return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{stat.size}"})
+        
+        content_type = stat.content_type
+        if not content_type or not content_type.startswith("image/"):
+            content_type = IMAGE_CONTENT_TYPES.get(os.path.splitext(object_name)[1].lower(), "image/jpeg")
+        
+        # Popular photos are read from the host's disk cache instead of MinIO
+        cached = disk_cache.open(bucket_name, object_name, stat.etag)
+        if byte_range:
+            start, end = byte_range
+            if cached is not None:
+                body = disk_cache.stream(cached, start, end - start + 1)
+            else:
+                body = iter_response(minio_service.open_file(bucket_name, object_name, offset=start, length=end - start + 1))
+            headers["Content-Range"] = f"bytes {start}-{end}/{stat.size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(body, status_code=206, media_type=content_type, headers=headers)
+        
+        if cached is not None:
+            body = disk_cache.stream(cached)
+        else:
+            body = disk_cache.tee(bucket_name, object_name, stat.etag,
+                                  iter_response(minio_service.open_file(bucket_name, object_name)))
+        headers["Content-Length"] = str(stat.size)
+        return StreamingResponse(body, media_type=content_type, headers=headers)
             
+    except S3Error as e:
+        logger.error(f"Error reading photo {photo_id} from MinIO: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Error retrieving image from storage"}
+        )
     except Exception as e:
         logger.error(f"Error serving image: {e}")
         return JSONResponse(
@@ -190,110 +348,196 @@ async def serve_image(photo_id: int, db: Session = Depends(get_db)):
             content={"error": "Internal server error"}
         )
 
-@router.post("/selfie-match", response_class=JSONResponse)
-async def selfie_match(
-    request: Request,
-    selfie_data: str = Form(...),
-    person_name: str = Form(...),
-    event_id: int = Form(None),
-    db: Session = Depends(get_db)
-):
-    """Process selfie and match against event images using FaceVerif class"""
+# Cosine similarity a stored face needs to count as a selfie match
+SELFIE_MATCH_THRESHOLD = 0.5
+
+class SelfieSearch(NamedTuple):
+    """A decoded selfie whose results were not cached, between the stages of run_selfie_match"""
+    image: np.ndarray
+    selfie_key: str
+    result_key: tuple
+    event_id: int
+    event_name: str
+    include_low_quality: bool
+    # Face records from the selfie cache, or None if the selfie still has to be embedded
+    faces: Optional[List[dict]]
+
+def match_response(results: list, person_name: str, event_name: str) -> JSONResponse:
+    """Format (photo_id, file_path, similarity) matches for the selfie endpoints"""
+    matched_photos = [
+        {"id": photo_id, "file_path": file_path, "similarity": similarity}
+        for photo_id, file_path, similarity in results
+    ]
+    
+    return JSONResponse({
+        "success": True,
+        "matches": matched_photos,
+        "message": f"Found {len(matched_photos)} potential matches for {person_name} in event {event_name}"
+    })
+
+def prepare_selfie_match(image_bytes: bytes, person_name: str, event_id: Optional[int],
+                         include_low_quality: bool) -> Union[JSONResponse, SelfieSearch]:
+    """Decode a selfie, check its event and the caches; runs on the inference executor.
+
+    Returns the finished response (errors, cached results) or the
+    SelfieSearch to embed and rank. Opens its own session: a job that
+    outlives its request's timeout must not use the request's session.
+    """
+    selfie_img = decode_image_bytes(image_bytes)
+    if selfie_img is None:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Invalid image data"}
+        )
+    if not event_id:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Event ID is required for face matching"}
+        )
+    
+    db = SessionLocal()
     try:
-        # Decode the selfie image
-        selfie_img = decode_base64_image(selfie_data)
-        
-        if selfie_img is None:
+        event = db.query(EventName).filter(EventName.id == event_id).first()
+        if not event:
             return JSONResponse(
-                status_code=400,
-                content={"error": "Invalid image data"}
+                status_code=404,
+                content={"error": "Event not found"}
             )
         
-        # Save selfie to temporary file for processing
-        with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as tmp_selfie:
-            cv2.imwrite(tmp_selfie.name, selfie_img)
-            selfie_path = tmp_selfie.name
-        
-        # Get event
-        if event_id:
-            event = db.query(EventName).filter(EventName.id == event_id).first()
-            if not event:
-                # Clean up temporary file
-                os.unlink(selfie_path)
-                return JSONResponse(
-                    status_code=404,
-                    content={"error": "Event not found"}
-                )
-        else:
-            # Clean up temporary file
-            os.unlink(selfie_path)
-            return JSONResponse(
-                status_code=400,
-                content={"error": "Event ID is required for face matching"}
-            )
+        # The same selfie against the same version of the event gives the same ranking
+        selfie_key = selfie_cache.key(get_face_engine().model_id, selfie_img)
+        result_key = search_result_cache.key(selfie_key, event_id, event.version, SELFIE_MATCH_THRESHOLD,
+                                             settings.SELFIE_MATCH_TOP_K, include_low_quality)
+        results = search_result_cache.get(result_key)
+        if results is not None:
+            return match_response(results, person_name, event.event_name)
         
-        # Get the bucket name from an existing photo in this event
-        sample_photo = db.query(PhotoVideo).filter(PhotoVideo.event_id == event_id).first()
+        # Check that the event has photos at all
+        sample_photo = db.query(PhotoVideo.id).filter(PhotoVideo.event_id == event_id).first()
         if not sample_photo:
-            # Clean up temporary file
-            os.unlink(selfie_path)
             return JSONResponse(
                 status_code=404,
                 content={"error": f"No images found for event: {event.event_name}"}
             )
         
-        # Extract bucket name from the file path (format: bucket_name/filename)
-        bucket_name = sample_photo.file_path.split('/')[0]
+        # Retakes and searches of other events reuse the cached embedding
+        return SelfieSearch(selfie_img, selfie_key, result_key, event_id, event.event_name,
+                            include_low_quality, selfie_cache.get(selfie_key))
+    finally:
+        db.close()
+
+def finish_selfie_match(search: SelfieSearch, person_name: str, selfie_faces: List[dict]) -> JSONResponse:
+    """Rank an event against embedded selfie faces; runs on the inference executor"""
+    if search.faces is None:
+        selfie_cache.put(search.selfie_key, selfie_faces)
+    
+    db = SessionLocal()
+    try:
+        # Rank against the face embeddings stored for this event (already
+        # limited to top-k); errors propagate, so they are never cached
+        ranked = get_face_engine().search_event(
+            selfie_faces, search.event_id, db, threshold=SELFIE_MATCH_THRESHOLD,
+            top_k=settings.SELFIE_MATCH_TOP_K, include_low_quality=search.include_low_quality
+        )
         
-        # Check if bucket exists
-        try:
-            file_list = minio_service.list_files(bucket_name)
-        except Exception as e:
-            # Clean up temporary file
-            os.unlink(selfie_path)
-            logger.error(f"Error accessing bucket {bucket_name}: {e}")
-            return JSONResponse(
-                status_code=404,
-                content={"error": f"No images found for event: {event.event_name}"}
-            )
+        # Fetch the file paths of all matches in one query
+        paths = dict(
+            db.query(PhotoVideo.id, PhotoVideo.file_path).filter(
+                PhotoVideo.id.in_([photo_id for photo_id, _ in ranked])
+            ).all()
+        ) if ranked else {}
+    finally:
+        db.close()
+    
+    results = [
+        (photo_id, paths[photo_id], similarity)
+        for photo_id, similarity in ranked
+        if photo_id in paths
+    ]
+    search_result_cache.put(search.result_key, results)
+    return match_response(results, person_name, search.event_name)
+
+async def run_selfie_match(image_bytes: bytes, person_name: str, event_id: Optional[int],
+                           include_low_quality: Optional[bool] = None) -> JSONResponse:
+    """Match a selfie off the event loop, with backpressure and one overall timeout
+
+    Decoding and ranking run on the inference executor; the embedding is
+    awaited from the micro-batcher here, outside the executor, so
+    concurrent requests share a batch however few executor workers there are.
+    """
+    if include_low_quality is None:
+        include_low_quality = settings.SEARCH_INCLUDE_LOW_QUALITY
+    deadline = time.monotonic() + settings.INFERENCE_TIMEOUT_SECONDS
+    remaining = lambda: max(deadline - time.monotonic(), 0.001)
+    try:
+        search = await inference_executor.run(
+            prepare_selfie_match, image_bytes, person_name, event_id, include_low_quality,
+            timeout=remaining()
+        )
+        if isinstance(search, JSONResponse):
+            return search
         
-        # Use FaceVerif to match selfie with images in the bucket
-        face_verif = FaceVerif()
-        
-        # Match selfie with all images in the bucket
-        matches = face_verif.match_selfie_with_bucket_images(selfie_path, bucket_name, threshold=0.5)
-        
-        # Clean up temporary file
-        os.unlink(selfie_path)
-        
-        # Format matches for response
-        matched_photos = []
-        for file_name, similarity in matches[:10]:  # Limit to top 10 matches
-            # Find the corresponding PhotoVideo record
-            photo = db.query(PhotoVideo).filter(
-                PhotoVideo.file_path == f"{bucket_name}/{file_name}"
-            ).first()
-            if photo:
-                matched_photos.append({
-                    "id": photo.id,
-                    "file_path": photo.file_path,
-                    "similarity": similarity
-                })
+        selfie_faces = search.faces
+        if selfie_faces is None:
+            selfie_faces = await selfie_batcher.submit_async(search.image, timeout=remaining())
         
-        return JSONResponse({
-            "success": True,
-            "matches": matched_photos,
-            "message": f"Found {len(matched_photos)} potential matches for {person_name} in event {event.event_name}"
-        })
+        return await inference_executor.run(
+            finish_selfie_match, search, person_name, selfie_faces,
+            timeout=remaining()
+        )
+    except (ExecutorSaturated, BatcherSaturated):
+        return server_busy("queue full")
+    except asyncio.TimeoutError:
+        return server_busy("timed out")
+
+@router.post("/selfie-match", response_class=JSONResponse)
+async def selfie_match(
+    request: Request,
+    selfie_data: str = Form(...),
+    person_name: str = Form(...),
+    event_id: int = Form(None),
+    include_low_quality: Optional[bool] = Form(None)
+):
+    """Process a base64 (data URL) selfie and match against event images"""
+    try:
+        # Reject oversized payloads before decoding (base64 is 4 chars per 3 bytes)
+        if len(strip_data_url(selfie_data)) * 3 // 4 > settings.SELFIE_MAX_BYTES:
+            return selfie_too_large()
+        
+        image_bytes = base64.b64decode(strip_data_url(selfie_data))
+        return await run_selfie_match(image_bytes, person_name, event_id, include_low_quality)
         
     except Exception as e:
         logger.error(f"Error processing selfie match: {e}")
-        # Clean up temporary file if it exists
-        try:
-            os.unlink(selfie_path)
-        except:
-            pass
         return JSONResponse(
             status_code=500,
             content={"error": "Internal server error processing selfie"}
-        )
\ No newline at end of file
+        )
+
+@router.post("/selfie-match/upload", response_class=JSONResponse)
+async def selfie_match_upload(
+    request: Request,
+    selfie: UploadFile = File(...),
+    person_name: str = Form(...),
+    event_id: int = Form(None),
+    include_low_quality: Optional[bool] = Form(None)
+):
+    """Process a binary (multipart JPEG/WebP) selfie and match against event images"""
+    try:
+        # Reject oversized payloads before decoding
+        if selfie.size is not None and selfie.size > settings.SELFIE_MAX_BYTES:
+            return selfie_too_large()
+        
+        image_bytes = await selfie.read(settings.SELFIE_MAX_BYTES + 1)
+        if len(image_bytes) > settings.SELFIE_MAX_BYTES:
+            return selfie_too_large()
+        
+        # Decoded in memory on the inference executor
+        return await run_selfie_match(image_bytes, person_name, event_id, include_low_quality)
+        
+    except Exception as e:
+        logger.error(f"Error processing selfie upload match: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Internal server error processing selfie"}
+        )
@@ -1,7 +1,8 @@
-import os, uvicorn, logging
+import os, uvicorn, logging, threading
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, JSONResponse
 
 from config import settings
 
@@ -27,8 +28,21 @@ except Exception as e:
 from auth.app import router as auth_router
 from cms.app import router as cms_router
 from download.app import router as download_router
+from utils.face_engine import get_face_engine
+from utils.face_index import index_status
+from services.inference_executor import inference_executor
+from services.micro_batcher import selfie_batcher
+from services.selfie_cache import selfie_cache, search_result_cache
+from services.disk_cache import disk_cache
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in a thread so the server starts accepting /healthz right away
+    if settings.WARM_UP_MODELS:
+        threading.Thread(target=get_face_engine().warm_up, name="model-warm-up", daemon=True).start()
+    yield
+
+app = FastAPI(lifespan=lifespan)
 
 # Mount static
 try:
@@ -46,5 +60,35 @@ async def root():
     # return {"message": "FaceFindr API"}
     return RedirectResponse(url="/auth/login")
 
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: face models (and warm-up, if enabled) and index storage"""
+    models = get_face_engine().status()
+    ready = models["warmed_up"] or not settings.WARM_UP_MODELS
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "ready": ready,
+            "models": models,
+            "indexes": index_status()
+        }
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """Queue depth, wait times and other counters for sizing workers"""
+    return {
+        "inference_executor": inference_executor.stats(),
+        "selfie_batcher": selfie_batcher.stats(),
+        "selfie_cache": selfie_cache.stats(),
+        "search_result_cache": search_result_cache.stats(),
+        "object_cache": disk_cache.stats()
+    }
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=7219)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean
+from sqlalchemy import BigInteger, Column, Index, Integer, String, ForeignKey, DateTime, Boolean, Float, LargeBinary, JSON, false
 from sqlalchemy.orm import relationship
 from extensions import Base  # ← import from extensions
 from datetime import datetime
@@ -18,6 +18,10 @@ class EventName(Base):
     id = Column(Integer, primary_key=True, index=True)
     event_name = Column(String, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Bumped whenever the event's searchable photos change; part of the search-result cache key
+    version = Column(Integer, default=0, server_default="0", nullable=False)
+    # How the event's face vectors are held for search: float32, float16 or int8
+    embedding_storage = Column(String, default="float32", server_default="float32")
     # Foreign key to Admin
     admin_id = Column(Integer, ForeignKey("admin.id"))
     
@@ -31,9 +35,55 @@ class PhotoVideo(Base):
     event_id = Column(Integer, ForeignKey("event_names.id"))
     file_path = Column(String)
     is_processed = Column(Boolean, default=False)
+    # 64-bit dHash (utils/image_hash.py), used to spot near-duplicate burst frames at ingest
+    phash = Column(BigInteger)
+    # Burst representative whose detected faces this photo reuses (None if it was detected itself)
+    duplicate_of_id = Column(Integer, ForeignKey("photo_videos.id", ondelete="SET NULL"))
+    # Hex SHA-256 of the uploaded file; the same content is stored once per event
+    content_sha256 = Column(String(64))
+    # Reduced WebP copies made at ingest: {"256": object name, ...} in the photo's bucket
+    derivatives = Column(JSON)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     event = relationship("EventName", back_populates="photos_videos")
+    faces = relationship("FaceEmbedding", back_populates="photo", passive_deletes=True)
+
+    __table_args__ = (
+        Index("ix_photo_videos_event_content_sha256", "event_id", "content_sha256", unique=True),
+    )
+
+class FaceEmbedding(Base):
+    __tablename__ = "face_embeddings"
+    id = Column(Integer, primary_key=True, index=True)
+    photo_id = Column(Integer, ForeignKey("photo_videos.id", ondelete="CASCADE"), index=True)
+    # Denormalized so a search can load an event's vectors without a join
+    event_id = Column(Integer, ForeignKey("event_names.id", ondelete="CASCADE"), index=True)
+    face_index = Column(Integer)
+    bbox = Column(JSON)  # [x1, y1, x2, y2] in original image pixels
+    det_score = Column(Float)
+    embedding = Column(LargeBinary)  # L2-normalized float32 vector
+    model_name = Column(String)
+    # Below the ingest quality gate (utils/face_quality.py): left out of the default search index
+    low_quality = Column(Boolean, default=False, server_default=false(), nullable=False)
+    # Measures the gate was applied to: {"size", "yaw", "sharpness"}
+    quality = Column(JSON)
+    # Person the face was grouped into (None until clustered, or if it stays a singleton)
+    cluster_id = Column(Integer, ForeignKey("face_clusters.id", ondelete="SET NULL"), index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    photo = relationship("PhotoVideo", back_populates="faces")
+
+class FaceCluster(Base):
+    __tablename__ = "face_clusters"
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(Integer, ForeignKey("event_names.id", ondelete="CASCADE"), index=True)
+    model_name = Column(String)
+    centroid = Column(LargeBinary)  # L2-normalized float32 mean of the member faces
+    size = Column(Integer, default=0)
+    # Face closest to the centroid, shown as the cluster's thumbnail
+    representative_face_id = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 # Add relationship to EventName
 EventName.photos_videos = relationship("PhotoVideo", back_populates="event")
\ No newline at end of file
@@ -0,0 +1,171 @@
+import os
+import time
+import uuid
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict, List, Optional, Tuple
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from config import settings
+from models import PhotoVideo
+from services.minio_service import minio_service
+
+logger = logging.getLogger(__name__)
+
+# Uploads are hashed in chunks of this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Digests looked up per query when checking which files the event already has
+DIGEST_QUERY_BATCH = 500
+
+# (filename, readable stream, content type) of one file to ingest
+UploadSource = Tuple[str, BinaryIO, Optional[str]]
+
+def hash_stream(data: BinaryIO) -> Tuple[str, int]:
+    """SHA-256 and size of a stream, read in chunks and rewound for uploading"""
+    sha256 = hashlib.sha256()
+    size = 0
+    while chunk := data.read(UPLOAD_CHUNK_SIZE):
+        sha256.update(chunk)
+        size += len(chunk)
+    data.seek(0)
+    return sha256.hexdigest(), size
+
+class BulkUploadReport:
+    """Outcome of every file of a bulk upload, in upload order"""
+
+    def __init__(self):
+        self.files: List[dict] = []
+        self.seconds = {"hash": 0.0, "upload": 0.0, "insert": 0.0}
+
+    def add(self, filename: str) -> dict:
+        entry = {"filename": filename, "status": "pending", "photo_id": None, "error": None}
+        self.files.append(entry)
+        return entry
+
+    def count(self, status: str) -> int:
+        return sum(entry["status"] == status for entry in self.files)
+
+    @property
+    def photo_ids(self) -> List[int]:
+        return [entry["photo_id"] for entry in self.files if entry["status"] == "uploaded"]
+
+    def summary(self) -> dict:
+        return {
+            "uploaded": self.count("uploaded"),
+            "duplicates": self.count("duplicate"),
+            "failed": self.count("failed"),
+            "seconds": {stage: round(value, 3) for stage, value in self.seconds.items()},
+            "files": self.files,
+        }
+
+def bulk_upload(db: Session, event_id: int, bucket_name: str, files: List[UploadSource],
+                workers: Optional[int] = None) -> BulkUploadReport:
+    """
+    Store a batch of files for an event and add their PhotoVideo rows (not committed)
+
+    Files are hashed and written to MinIO by a pool of `workers` threads
+    (MINIO_UPLOAD_WORKERS by default). Files repeated within the batch or
+    already stored for the event are skipped before any write. A failed
+    write is reported for that file and the others carry on. Rows for the
+    written files are inserted UPLOAD_INSERT_BATCH at a time with one
+    executemany each; a batch that hits the unique content index (a
+    concurrent upload of the same file) is retried row by row and the
+    losing objects are removed. Blocking: call it from a worker thread.
+
+    Returns:
+        BulkUploadReport with one entry per named file
+    """
+    report = BulkUploadReport()
+    sources = [(report.add(filename), data, content_type) for filename, data, content_type in files if filename]
+    workers = max(1, workers or settings.MINIO_UPLOAD_WORKERS)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="minio-upload") as pool:
+        start = time.perf_counter()
+        hashes = list(pool.map(lambda source: _hash_source(*source), sources))
+        report.seconds["hash"] = time.perf_counter() - start
+
+        # Keep the first copy of each content the event does not have yet
+        existing = _existing_digests(db, event_id, {digest for digest, _ in hashes if digest})
+        pending = []
+        for (entry, data, content_type), (digest, size) in zip(sources, hashes):
+            if digest is None:
+                continue
+            if digest in existing:
+                entry["status"] = "duplicate"
+                continue
+            existing.add(digest)
+            object_name = f"{uuid.uuid4()}{os.path.splitext(entry['filename'])[1]}"
+            pending.append((entry, data, content_type, digest, size, object_name))
+
+        start = time.perf_counter()
+        written = [item for item, ok in zip(pending, pool.map(lambda item: _write(bucket_name, *item), pending)) if ok]
+        report.seconds["upload"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_size = max(1, settings.UPLOAD_INSERT_BATCH)
+    for offset in range(0, len(written), batch_size):
+        _insert_batch(db, event_id, bucket_name, written[offset:offset + batch_size])
+    report.seconds["insert"] = time.perf_counter() - start
+
+    summary = report.summary()
+    logger.info(f"Bulk upload to event {event_id}: {summary['uploaded']} stored, {summary['duplicates']} duplicates, "
+                f"{summary['failed']} failed with {workers} writers ({summary['seconds']})")
+    return report
+
+def _hash_source(entry: dict, data: BinaryIO, content_type: Optional[str]) -> Tuple[Optional[str], int]:
+    try:
+        return hash_stream(data)
+    except Exception as e:
+        entry["status"], entry["error"] = "failed", f"read: {e}"
+        return None, 0
+
+def _existing_digests(db: Session, event_id: int, digests: set) -> set:
+    existing, digests = set(), list(digests)
+    for offset in range(0, len(digests), DIGEST_QUERY_BATCH):
+        existing.update(digest for (digest,) in db.query(PhotoVideo.content_sha256).filter(
+            PhotoVideo.event_id == event_id,
+            PhotoVideo.content_sha256.in_(digests[offset:offset + DIGEST_QUERY_BATCH])
+        ))
+    return existing
+
+def _write(bucket_name: str, entry: dict, data: BinaryIO, content_type: Optional[str],
+           digest: str, size: int, object_name: str) -> bool:
+    try:
+        minio_service.upload_stream(bucket_name, object_name, data, length=size, content_type=content_type)
+        return True
+    except Exception as e:
+        entry["status"], entry["error"] = "failed", f"upload: {e}"
+        return False
+
+def _insert_batch(db: Session, event_id: int, bucket_name: str, batch: list):
+    rows = [{
+        "event_id": event_id,
+        "file_path": f"{bucket_name}/{object_name}",
+        "content_sha256": digest,
+    } for _, _, _, digest, _, object_name in batch]
+    statement = insert(PhotoVideo).returning(PhotoVideo.content_sha256, PhotoVideo.id)
+    try:
+        with db.begin_nested():
+            ids: Dict[str, int] = dict(db.execute(statement, rows).all())
+    except IntegrityError:
+        # Another upload stored some of this content meanwhile; keep the rest
+        ids = {}
+        for row in rows:
+            try:
+                with db.begin_nested():
+                    ids[row["content_sha256"]] = db.execute(statement, row).one().id
+            except IntegrityError:
+                pass
+
+    for entry, _, _, digest, _, object_name in batch:
+        if digest in ids:
+            entry["status"], entry["photo_id"] = "uploaded", ids[digest]
+            continue
+        entry["status"] = "duplicate"
+        try:
+            minio_service.remove_file(bucket_name, object_name)
+        except Exception as e:
+            logger.error(f"Error removing duplicate object '{object_name}' from bucket '{bucket_name}': {e}")
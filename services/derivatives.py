@@ -0,0 +1,72 @@
+import io
+import os
+import logging
+import tempfile
+import threading
+from typing import Dict, List
+from sqlalchemy.orm import Session
+from config import settings
+from models import PhotoVideo
+from services.disk_cache import disk_cache
+from services.minio_service import minio_service
+from utils.image_decode import ImageSource
+from utils.image_derivatives import DERIVATIVE_CONTENT_TYPE, derivative_object_name, render_derivatives
+
+logger = logging.getLogger(__name__)
+
+# One on-the-fly generation per photo at a time; concurrent requests wait for it
+_generating: Dict[int, threading.Lock] = {}
+_generating_lock = threading.Lock()
+
+def derivative_sizes() -> List[int]:
+    """Configured derivative long sides, ascending"""
+    return sorted({int(size) for size in settings.DERIVATIVE_SIZES.split(",") if size.strip()})
+
+def store_derivatives(bucket_name: str, object_name: str, source: ImageSource) -> Dict[str, str]:
+    """
+    Render every configured derivative of a photo and upload it next to the original
+
+    Returns:
+        {str(size): object name}, the value stored in PhotoVideo.derivatives
+        (empty if DERIVATIVE_SIZES is)
+    """
+    stored = {}
+    for size, data in render_derivatives(source, derivative_sizes(), settings.DERIVATIVE_QUALITY).items():
+        name = derivative_object_name(object_name, size)
+        minio_service.upload_stream(bucket_name, name, io.BytesIO(data), length=len(data),
+                                    content_type=DERIVATIVE_CONTENT_TYPE)
+        stored[str(size)] = name
+    return stored
+
+def ensure_derivative(db: Session, photo_id: int, size: int) -> str:
+    """
+    Object name of a photo's derivative, generating it first if it is missing
+
+    Photos uploaded before derivatives existed, or whose ingest could not
+    make them, get all sizes rendered from the original on first request;
+    they are stored and recorded, so this happens once per photo. The
+    original is read through the object cache, like at ingest.
+    """
+    with _generating_lock:
+        lock = _generating.setdefault(photo_id, threading.Lock())
+    try:
+        with lock:
+            # Read under the lock: a concurrent request may have just made it
+            file_path, derivatives = db.query(PhotoVideo.file_path, PhotoVideo.derivatives).filter(
+                PhotoVideo.id == photo_id
+            ).one()
+            if derivatives and str(size) in derivatives:
+                return derivatives[str(size)]
+
+            bucket_name, object_name = file_path.split('/', 1)
+            with tempfile.TemporaryDirectory() as temp_dir:
+                original_path = os.path.join(temp_dir, os.path.basename(object_name))
+                disk_cache.download_file(bucket_name, object_name, original_path)
+                derivatives = {**(derivatives or {}), **store_derivatives(bucket_name, object_name, original_path)}
+            db.query(PhotoVideo).filter(PhotoVideo.id == photo_id).update({"derivatives": derivatives})
+            db.commit()
+            logger.info(f"Generated missing derivatives of photo {photo_id}")
+            return derivatives[str(size)]
+    finally:
+        with _generating_lock:
+            _generating.pop(photo_id, None)
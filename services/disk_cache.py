@@ -0,0 +1,262 @@
+import os
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional
+from config import settings
+from services.minio_service import minio_service
+
+try:
+    import fcntl
+except ImportError:  # Windows: eviction is then only serialized within a process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Chunk size of bodies streamed from or into the cache
+CHUNK_SIZE = 256 * 1024
+
+# Eviction frees space down to this share of the budget, so it does not run on every write
+LOW_WATER = 0.9
+
+# Temporary files older than this are left over from a crashed writer
+STALE_TMP_SECONDS = 3600
+
+class DiskCache:
+    """Read-through cache of MinIO objects on local disk, shared by the workers of a host.
+
+    Entries are keyed by bucket, object name and the object's ETag, so a
+    changed object is never served stale: callers pass the ETag they got
+    from stat_object and an old entry simply stops matching until it is
+    evicted. Writes go to a temporary file that is renamed into place, so
+    readers in any process see a complete file or none. Hits touch the
+    file's mtime; when the directory exceeds max_bytes the least recently
+    used files are removed under an flock shared by all workers. Files
+    being read when they are evicted stay readable through their open
+    handle. Counters are per process, like the other /metrics sections.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Bytes on disk as of the last scan, plus what this process wrote since
+        self._size_bytes: Optional[int] = None
+        self._written_since_scan = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.bytes_written = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory) and self.max_bytes > 0
+
+    def _path(self, bucket_name: str, object_name: str, etag: str) -> str:
+        key = hashlib.sha256(f"{bucket_name}/{object_name}\0{etag}".encode()).hexdigest()
+        return os.path.join(self.directory, key[:2], key)
+
+    def open(self, bucket_name: str, object_name: str, etag: str) -> Optional[BinaryIO]:
+        """Open the cached copy of an object at this ETag, or None on a miss"""
+        if not self.enabled:
+            return None
+        path = self._path(bucket_name, object_name, etag)
+        try:
+            cached = open(path, "rb")
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return cached
+
+    def stream(self, cached: BinaryIO, offset: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+        """Yield length bytes (default: the rest) of an open cached file from offset, then close it"""
+        try:
+            cached.seek(offset)
+            remaining = length
+            while remaining is None or remaining > 0:
+                chunk = cached.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                with self._lock:
+                    self.bytes_saved += len(chunk)
+                yield chunk
+        finally:
+            cached.close()
+
+    def tee(self, bucket_name: str, object_name: str, etag: str, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        """
+        Pass an object's body through while storing it in the cache
+
+        The entry is kept only if the whole body went through; a client that
+        disconnects, or a disk error, just leaves the object uncached.
+        """
+        if not self.enabled:
+            yield from chunks
+            return
+        tmp_file, tmp_path = self._temp_file()
+        size, complete = 0, False
+        try:
+            for chunk in chunks:
+                if tmp_file is not None:
+                    try:
+                        tmp_file.write(chunk)
+                        size += len(chunk)
+                    except OSError as e:
+                        logger.warning(f"Not caching '{object_name}': {e}")
+                        tmp_file.close()
+                        tmp_file = None
+                yield chunk
+            complete = tmp_file is not None
+        finally:
+            if tmp_file is not None:
+                tmp_file.close()
+            if complete:
+                self._commit(tmp_path, self._path(bucket_name, object_name, etag), size)
+            elif tmp_path:
+                _remove(tmp_path)
+
+    def download_file(self, bucket_name: str, object_name: str, file_path: str, cache_misses: bool = True):
+        """
+        MinIOService.download_file through the cache
+
+        A hit copies the local entry instead of fetching the object. With
+        cache_misses=False a miss is fetched without being stored, so
+        one-off reads (ingest) do not evict what guests are viewing.
+        """
+        if not self.enabled:
+            minio_service.download_file(bucket_name, object_name, file_path)
+            return
+        etag = minio_service.stat_file(bucket_name, object_name).etag
+        cached = self.open(bucket_name, object_name, etag)
+        if cached is not None:
+            with open(file_path, "wb") as out:
+                for chunk in self.stream(cached):
+                    out.write(chunk)
+            return
+        minio_service.download_file(bucket_name, object_name, file_path)
+        if cache_misses:
+            tmp_file, tmp_path = self._temp_file()
+            if tmp_file is not None:
+                try:
+                    with tmp_file, open(file_path, "rb") as source:
+                        shutil.copyfileobj(source, tmp_file, CHUNK_SIZE)
+                    self._commit(tmp_path, self._path(bucket_name, object_name, etag), os.path.getsize(file_path))
+                except OSError as e:
+                    logger.warning(f"Not caching '{object_name}': {e}")
+                    _remove(tmp_path)
+
+    def _temp_file(self):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            return os.fdopen(fd, "wb"), tmp_path
+        except OSError as e:
+            logger.warning(f"Object cache unavailable: {e}")
+            return None, None
+
+    def _commit(self, tmp_path: str, path: str, size: int):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Readers in other workers see either no file or a complete one
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not store object cache entry: {e}")
+            _remove(tmp_path)
+            return
+        with self._lock:
+            self.bytes_written += size
+            self._written_since_scan += size
+            if self._size_bytes is not None:
+                self._size_bytes += size
+            # Other workers write too: rescan after writing a slice of the budget
+            due = (self._size_bytes is None or self._size_bytes > self.max_bytes
+                   or self._written_since_scan > self.max_bytes * (1 - LOW_WATER) / 2)
+        if due:
+            self.evict()
+
+    @contextmanager
+    def _directory_lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def evict(self):
+        """Scan the cache and remove least recently used entries until it fits the budget"""
+        with self._directory_lock():
+            entries, total, now = [], 0, time.time()
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        info = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    if name.endswith(".tmp"):
+                        if now - info.st_mtime > STALE_TMP_SECONDS:
+                            _remove(path)
+                        continue
+                    if name == ".lock":
+                        continue
+                    entries.append((info.st_mtime, info.st_size, path))
+                    total += info.st_size
+
+            evicted = 0
+            if total > self.max_bytes:
+                entries.sort()
+                for _, size, path in entries:
+                    if total <= self.max_bytes * LOW_WATER:
+                        break
+                    if _remove(path):
+                        total -= size
+                        evicted += 1
+        with self._lock:
+            self._size_bytes = total
+            self._written_since_scan = 0
+            self.evictions += evicted
+        if evicted:
+            logger.info(f"Object cache: evicted {evicted} files, {total / 1024 ** 2:.0f} MB left")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "directory": self.directory or None,
+                "max_bytes": self.max_bytes,
+                "size_bytes": self._size_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "bytes_saved": self.bytes_saved,
+                "bytes_written": self.bytes_written,
+                "evictions": self.evictions,
+            }
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
+
+# Global instance
+disk_cache = DiskCache(settings.OBJECT_CACHE_DIR, settings.OBJECT_CACHE_MAX_BYTES)
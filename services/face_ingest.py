@@ -0,0 +1,263 @@
+import os
+import time
+import logging
+import tempfile
+from typing import Dict, List
+from config import settings
+from database import SessionLocal
+from models import FaceEmbedding, PhotoVideo
+from services.disk_cache import disk_cache
+from utils.face_engine import get_face_engine
+from utils.image_decode import decode_image, scale_bbox
+from utils.face_quality import GateReport, failed_gates, measure_face
+from utils.image_hash import HASH_THUMBNAIL_SIDE, NearDuplicateIndex, dhash
+from utils.face_index import get_event_index
+from services.selfie_cache import bump_event_version
+from services.people_albums import update_event_clusters
+from services.derivatives import store_derivatives
+
+logger = logging.getLogger(__name__)
+
+def _copy_faces(db, photo_id: int, representative_id: int) -> int:
+    """Give a burst duplicate copies of its representative's face records; returns the face count"""
+    faces = db.query(FaceEmbedding).filter(FaceEmbedding.photo_id == representative_id).all()
+    for face in faces:
+        # Unclustered, so the duplicate joins its people cluster at the end of ingest
+        db.add(FaceEmbedding(
+            photo_id=photo_id,
+            event_id=face.event_id,
+            face_index=face.face_index,
+            bbox=face.bbox,
+            det_score=face.det_score,
+            embedding=face.embedding,
+            model_name=face.model_name,
+            low_quality=face.low_quality,
+            quality=face.quality
+        ))
+    return len(faces)
+
+def process_photos(photo_ids: List[int], skip_bursts: bool = True):
+    """Detect faces in uploaded photos and store their embeddings.
+
+    Runs as a background task after an upload, so it opens its own session.
+    Each photo is committed on its own and marked as processed, so a failure
+    on one file does not lose the work done on the others. After every
+    batch the events' versions are bumped, so searches stop reusing cached
+    results and append the new faces to their indexes as a segment: new
+    photos are findable within seconds, long before the whole upload is
+    done. At the end new faces are added to the events' people clusters;
+    indexes are compacted into a new shard once their segments grow past
+    the INDEX_MAX_* limits.
+
+    Faces below the quality gate (utils/face_quality.py) are stored with
+    low_quality set and their measures, and stay out of the default search
+    index; how much each gate removed is logged at the end.
+
+    Burst frames: every photo's dHash is computed from a 1/8-scale decode
+    first. With skip_bursts (and BURST_DEDUP), a photo within
+    BURST_MAX_DISTANCE bits of the burst of one of the previous
+    BURST_WINDOW photos of its event (upload order) gets copies of the
+    face records of that burst's detected photo and a link to it
+    (duplicate_of_id) instead of its own inference. A photo whose decode
+    or face storage fails is not a representative; its duplicates are
+    queued again and processed on their own. The inference time this
+    saved is logged per event.
+
+    Every photo, burst frames included, also gets its gallery derivatives
+    (DERIVATIVE_SIZES WebP copies, see services/derivatives.py) from the
+    same download, recorded per batch before detection runs.
+    """
+    if not photo_ids:
+        return
+
+    db = SessionLocal()
+    engine = get_face_engine()
+    processed = 0
+    gate_report = GateReport(engine.dimension)
+    skip_bursts = skip_bursts and settings.BURST_DEDUP
+    bursts = NearDuplicateIndex(settings.BURST_MAX_DISTANCE, settings.BURST_WINDOW)
+    # Photos that reused a representative's faces, and the time spent on inference
+    skipped: Dict[int, int] = {}
+    inference_seconds, inferred = 0.0, 0
+
+    try:
+        photos = db.query(PhotoVideo.id, PhotoVideo.event_id, PhotoVideo.file_path).filter(
+            PhotoVideo.id.in_(photo_ids),
+            PhotoVideo.is_processed.isnot(True)
+        ).order_by(PhotoVideo.id).all()
+        event_ids = {photo.event_id for photo in photos}
+
+        if skip_bursts:
+            # The last frames of earlier uploads of these events, so a burst split across uploads is still found
+            for event_id in event_ids:
+                recent = db.query(PhotoVideo.id, PhotoVideo.phash, PhotoVideo.duplicate_of_id).filter(
+                    PhotoVideo.event_id == event_id,
+                    PhotoVideo.is_processed.is_(True),
+                    PhotoVideo.phash.isnot(None)
+                ).order_by(PhotoVideo.id.desc()).limit(settings.BURST_WINDOW).all()
+                representative_hashes = dict(db.query(PhotoVideo.id, PhotoVideo.phash).filter(
+                    PhotoVideo.id.in_({row.duplicate_of_id for row in recent if row.duplicate_of_id is not None})
+                ).all())
+                for photo_id, phash, duplicate_of_id in reversed(recent):
+                    if duplicate_of_id is None:
+                        bursts.add(event_id, photo_id, phash)
+                    elif representative_hashes.get(duplicate_of_id) is not None:
+                        bursts.add(event_id, duplicate_of_id, representative_hashes[duplicate_of_id])
+
+        # Burst duplicates whose representative failed go back in the queue for their own inference
+        pending, retried = list(photos), set()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Several images per pass so recognition runs on batches of crops
+            while pending:
+                batch, pending = pending[:settings.INGEST_IMAGE_BATCH], pending[settings.INGEST_IMAGE_BATCH:]
+                loaded, images, scales, hashes = [], [], [], []
+                duplicates, retry = [], []
+                derivatives: Dict[int, Dict[str, str]] = {}
+                for photo in batch:
+                    temp_file_path = None
+                    try:
+                        # file_path is bucket_name/object_name
+                        bucket_name, object_name = photo.file_path.split('/', 1)
+                        temp_file_path = os.path.join(temp_dir, object_name)
+                        # Served from the object cache if guests viewed the photo; misses
+                        # are not stored, so an upload does not evict what they view
+                        disk_cache.download_file(bucket_name, object_name, temp_file_path, cache_misses=False)
+
+                        # A failure here only means the gallery makes them on first view
+                        if photo.id not in retried:
+                            try:
+                                derivatives[photo.id] = store_derivatives(bucket_name, object_name, temp_file_path)
+                            except Exception as e:
+                                logger.error(f"Error making derivatives of photo {photo.id} ({photo.file_path}): {e}")
+
+                        phash = dhash(decode_image(temp_file_path, HASH_THUMBNAIL_SIDE).bgr)
+                        match = bursts.match(photo.event_id, phash) if skip_bursts else None
+                        if match is not None:
+                            # Faces are copied once the representative's are stored
+                            representative_id, representative_hash = match
+                            bursts.add(photo.event_id, representative_id, representative_hash)
+                            duplicates.append((photo, representative_id, phash))
+                            continue
+
+                        # Decode at reduced resolution; boxes are mapped back below
+                        decoded = decode_image(temp_file_path, settings.DETECTION_MAX_SIDE)
+                        # Later frames of this batch match it; dropped again below if its faces are not stored
+                        bursts.add(photo.event_id, photo.id, phash)
+                        images.append(decoded.bgr)
+                        scales.append(decoded.scale)
+                        hashes.append(phash)
+                        loaded.append(photo)
+                    except Exception as e:
+                        logger.error(f"Error loading photo {photo.id} ({photo.file_path}): {e}")
+                    finally:
+                        if temp_file_path and os.path.exists(temp_file_path):
+                            os.remove(temp_file_path)
+
+                if derivatives:
+                    for photo_id, stored in derivatives.items():
+                        db.query(PhotoVideo).filter(PhotoVideo.id == photo_id).update({"derivatives": stored})
+                    db.commit()
+
+                faces_per_image = []
+                if images:
+                    try:
+                        inference_start = time.perf_counter()
+                        faces_per_image = engine.embed_batch(images)
+                        inference_seconds += time.perf_counter() - inference_start
+                        inferred += len(images)
+                    except Exception as e:
+                        logger.error(f"Error extracting faces for photos {[photo.id for photo in loaded]}: {e}")
+
+                stored_events, stored_ids = set(), set()
+                for photo, faces, image, scale, phash in zip(loaded, faces_per_image, images, scales, hashes):
+                    try:
+                        gates = []
+                        for face in faces:
+                            # Measured on the decoded image, i.e. the pixels the model saw
+                            measures = measure_face(image, face)
+                            failed = failed_gates(face["det_score"], measures)
+                            gates.append(failed)
+                            db.add(FaceEmbedding(
+                                photo_id=photo.id,
+                                event_id=photo.event_id,
+                                face_index=face["face_index"],
+                                bbox=scale_bbox(face["bbox"], scale),
+                                det_score=face["det_score"],
+                                embedding=face["embedding"].tobytes(),
+                                model_name=engine.model_id,
+                                low_quality=bool(failed),
+                                quality=measures
+                            ))
+
+                        db.query(PhotoVideo).filter(PhotoVideo.id == photo.id).update({"is_processed": True, "phash": phash})
+                        db.commit()
+                        processed += 1
+                        stored_events.add(photo.event_id)
+                        stored_ids.add(photo.id)
+                        for failed in gates:
+                            gate_report.add(failed)
+
+                    except Exception as e:
+                        db.rollback()
+                        logger.error(f"Error storing faces of photo {photo.id} ({photo.file_path}): {e}")
+
+                # Only photos with stored faces stay representatives for later batches
+                for photo in loaded:
+                    if photo.id not in stored_ids:
+                        bursts.remove(photo.event_id, photo.id)
+
+                for photo, representative_id, phash in duplicates:
+                    try:
+                        representative = db.query(PhotoVideo.is_processed).filter(PhotoVideo.id == representative_id).scalar()
+                        if not representative:
+                            logger.warning(f"Photo {photo.id} is a burst duplicate of photo {representative_id}, "
+                                           f"which failed to process; running detection on it instead")
+                            retry.append(photo)
+                            continue
+                        _copy_faces(db, photo.id, representative_id)
+                        db.query(PhotoVideo).filter(PhotoVideo.id == photo.id).update(
+                            {"is_processed": True, "phash": phash, "duplicate_of_id": representative_id}
+                        )
+                        db.commit()
+                        processed += 1
+                        stored_events.add(photo.event_id)
+                        skipped[photo.event_id] = skipped.get(photo.event_id, 0) + 1
+
+                    except Exception as e:
+                        db.rollback()
+                        logger.error(f"Error copying faces of photo {representative_id} to burst duplicate {photo.id}: {e}")
+
+                # The batch is searchable now; cached results of its events are stale
+                for event_id in stored_events:
+                    bump_event_version(db, event_id)
+                db.commit()
+
+                # Failed representatives left the burst index, so each retry either
+                # matches another representative or becomes one; the queue always shrinks
+                retried.update(photo.id for photo in retry)
+                pending = retry + pending
+
+        logger.info(f"Processed {processed}/{len(photos)} photos for face embeddings")
+        if gate_report.total:
+            logger.info(f"Quality gate: {gate_report.describe()}, "
+                        f"{gate_report.summary()['bytes_saved'] / 1024 ** 2:.1f} MB kept out of the search index")
+        seconds_per_photo = inference_seconds / inferred if inferred else None
+        for event_id, count in skipped.items():
+            saved = f"~{count * seconds_per_photo:.1f}s" if seconds_per_photo is not None else "unknown"
+            logger.info(f"Event {event_id}: {count} burst duplicates reused their representative's faces, "
+                        f"{saved} of inference saved")
+
+        for event_id in event_ids:
+            if settings.CLUSTER_AT_INGEST:
+                try:
+                    update_event_clusters(db, event_id, engine.model_id)
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Error clustering faces of event {event_id}: {e}")
+
+            # Catch this worker's index up (or build the event's first shard);
+            # compaction, which also picks up the new cluster ids, runs past the limits
+            get_event_index(db, event_id, engine.model_id)
+
+    finally:
+        db.close()
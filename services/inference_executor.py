@@ -0,0 +1,109 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class ExecutorSaturated(Exception):
+    """Raised when the inference queue is full and a request must be turned away"""
+
+class InferenceExecutor:
+    """Thread pool for blocking face inference with bounded admission.
+
+    At most workers + queue_size jobs are admitted at once; anything beyond
+    that is rejected immediately with ExecutorSaturated so the caller can
+    answer 503 instead of piling requests up behind the event loop.
+    ONNX Runtime and NumPy release the GIL, so threads run inference in
+    parallel.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._running = 0
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args, timeout: Optional[float] = None) -> Any:
+        """Run fn(*args) on the pool and await its result.
+
+        Raises:
+            ExecutorSaturated: the admission queue is full
+            asyncio.TimeoutError: the job did not finish within timeout seconds
+        """
+        with self._lock:
+            if self._admitted >= self.capacity:
+                self._rejected += 1
+                raise ExecutorSaturated()
+            self._admitted += 1
+            self._submitted += 1
+
+        enqueued = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            with self._lock:
+                self._running += 1
+                self._wait_total += started - enqueued
+                self._wait_max = max(self._wait_max, started - enqueued)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._run_total += time.perf_counter() - started
+
+        def release(_):
+            # Runs on completion and on cancellation of a still-queued job
+            with self._lock:
+                self._admitted -= 1
+
+        future = self._pool.submit(job)
+        future.add_done_callback(release)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._timed_out += 1
+            logger.warning(f"Inference job timed out after {timeout}s")
+            raise
+
+    def stats(self) -> dict:
+        """Queue depth and wait/run times, for sizing workers"""
+        with self._lock:
+            completed = self._completed or 1
+            started = (self._completed + self._running) or 1
+            return {
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "running": self._running,
+                "queued": self._admitted - self._running,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "avg_wait_ms": round(1000 * self._wait_total / started, 2),
+                "max_wait_ms": round(1000 * self._wait_max, 2),
+                "avg_run_ms": round(1000 * self._run_total / completed, 2),
+            }
+
+# Global instance
+inference_executor = InferenceExecutor(
+    settings.INFERENCE_WORKERS or os.cpu_count() or 1,
+    settings.INFERENCE_QUEUE_SIZE
+)
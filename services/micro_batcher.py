@@ -0,0 +1,147 @@
+import time
+import queue
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional
+from config import settings
+from services.inference_executor import InferenceExecutor, inference_executor
+from utils.face_engine import get_face_engine
+
+logger = logging.getLogger(__name__)
+
+class BatcherSaturated(Exception):
+    """Raised when too many items are already waiting for a batch"""
+
+class MicroBatcher:
+    """Groups concurrent single-item calls into batched calls.
+
+    Callers await submit_async() while a background thread collects
+    requests arriving within max_latency_ms of the first one (up to
+    max_batch), runs batch_fn once on the whole list and hands every caller
+    its own result. No thread is held while a batch fills, so a batch can
+    hold more items than there are inference workers. With max_batch <= 1
+    each item is run on its own on the inference executor instead, in
+    parallel up to its worker count.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], max_batch: int, max_latency_ms: float,
+                 name: str = "batcher", max_pending: int = 0, executor: Optional[InferenceExecutor] = None):
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        # Runs single items when batching is off
+        self.executor = executor or inference_executor
+        # Items allowed to wait for a batch in submit_async (0 = unbounded)
+        self.max_pending = max_pending
+        self.max_latency = max_latency_ms / 1000
+        self.name = name
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._largest = 0
+        self._errors = 0
+
+    async def submit_async(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """Await the result of one item without holding a thread while its batch fills
+
+        Raises:
+            BatcherSaturated: max_pending items are already waiting
+            ExecutorSaturated: batching is off and the inference executor is full
+            asyncio.TimeoutError: no result within timeout seconds; the item
+                is dropped if its batch has not started yet
+        """
+        if self.max_batch <= 1:
+            results = await self.executor.run(self.batch_fn, [item], timeout=timeout)
+            if len(results) != 1:
+                raise RuntimeError(f"batch_fn returned {len(results)} results for 1 item")
+            self._record(1)
+            return results[0]
+
+        if self.max_pending and self._queue.qsize() >= self.max_pending:
+            raise BatcherSaturated()
+        self._ensure_thread()
+        future = Future()
+        self._queue.put((item, future))
+        # Cancelling the awaited wrapper (on timeout) cancels the queued future
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._thread_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._thread.start()
+
+    def _collect(self) -> List[tuple]:
+        """Block for the first request, then gather more until the batch is full or the window closes"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_latency
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Callers that gave up before their batch started are skipped
+            batch = [(item, future) for item, future in self._collect() if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"batch_fn returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                logger.error(f"{self.name}: batch of {len(items)} failed: {e}")
+                with self._stats_lock:
+                    self._errors += 1
+                # Every caller gets an answer, so none waits on a dropped result
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self._record(len(items))
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def _record(self, size: int):
+        with self._stats_lock:
+            self._batches += 1
+            self._items += size
+            self._largest = max(self._largest, size)
+
+    def stats(self) -> dict:
+        """Batch counts and sizes, for tuning max_batch and max_latency_ms"""
+        with self._stats_lock:
+            return {
+                "max_batch": self.max_batch,
+                "max_latency_ms": round(self.max_latency * 1000, 2),
+                "pending": self._queue.qsize(),
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+                "largest_batch": self._largest,
+                "failed_batches": self._errors,
+            }
+
+def _embed_selfies(images):
+    return get_face_engine().embed_batch(images)
+
+# Global instance: selfie detection + recognition for concurrent /download/selfie-match requests
+selfie_batcher = MicroBatcher(
+    _embed_selfies,
+    settings.SELFIE_BATCH_MAX_SIZE,
+    settings.SELFIE_BATCH_MAX_LATENCY_MS,
+    name="selfie-batcher",
+    max_pending=settings.INFERENCE_QUEUE_SIZE + settings.SELFIE_BATCH_MAX_SIZE
+)
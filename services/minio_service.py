@@ -1,5 +1,6 @@
 import os
 import logging
+from typing import BinaryIO, Iterator, Optional
 from minio import Minio
 from minio.error import S3Error
 from config import settings
@@ -37,6 +38,28 @@ class MinIOService:
             logger.error(f"Error uploading file '{file_path}' to bucket '{bucket_name}': {e}")
             raise
     
+    def upload_stream(self, bucket_name: str, object_name: str, data: BinaryIO,
+                      length: Optional[int] = None, content_type: Optional[str] = None,
+                      part_size: Optional[int] = None):
+        """
+        Upload a readable stream to MinIO with put_object
+
+        The stream is sent in multipart parts of part_size (MINIO_PART_SIZE by
+        default), so memory stays bounded by the part size and nothing is
+        written to disk. length may be None when it is not known in advance.
+        """
+        try:
+            self.client.put_object(
+                bucket_name, object_name, data,
+                length=-1 if length is None else length,
+                content_type=content_type or "application/octet-stream",
+                part_size=part_size or settings.MINIO_PART_SIZE
+            )
+            logger.info(f"Stream uploaded as '{object_name}' to bucket '{bucket_name}'")
+        except S3Error as e:
+            logger.error(f"Error uploading stream '{object_name}' to bucket '{bucket_name}': {e}")
+            raise
+    
     def download_file(self, bucket_name: str, object_name: str, file_path: str):
         """Download a file from MinIO"""
         try:
@@ -46,6 +69,36 @@ class MinIOService:
             logger.error(f"Error downloading file '{object_name}' from bucket '{bucket_name}': {e}")
             raise
     
+    def stat_file(self, bucket_name: str, object_name: str):
+        """Metadata of a file in MinIO (size, etag, last_modified, content_type) without its body"""
+        try:
+            return self.client.stat_object(bucket_name, object_name)
+        except S3Error as e:
+            logger.error(f"Error reading metadata of '{object_name}' in bucket '{bucket_name}': {e}")
+            raise
+    
+    def open_file(self, bucket_name: str, object_name: str, offset: int = 0, length: int = 0):
+        """
+        Open a file in MinIO for streaming, optionally only length bytes from offset
+
+        The returned response must be closed and its connection released,
+        which iter_response does once the body has been read.
+        """
+        try:
+            return self.client.get_object(bucket_name, object_name, offset=offset, length=length)
+        except S3Error as e:
+            logger.error(f"Error opening file '{object_name}' in bucket '{bucket_name}': {e}")
+            raise
+    
+    def remove_file(self, bucket_name: str, object_name: str):
+        """Remove a file from MinIO"""
+        try:
+            self.client.remove_object(bucket_name, object_name)
+            logger.info(f"File '{object_name}' removed from bucket '{bucket_name}'")
+        except S3Error as e:
+            logger.error(f"Error removing file '{object_name}' from bucket '{bucket_name}': {e}")
+            raise
+    
     def list_files(self, bucket_name: str):
         """List all files in a bucket"""
         try:
@@ -57,5 +110,13 @@ class MinIOService:
             logger.error(f"Error listing files in bucket '{bucket_name}': {e}")
             raise
 
+def iter_response(response, chunk_size: int = 256 * 1024) -> Iterator[bytes]:
+    """Yield an open MinIO response in chunks, then close it and release its connection"""
+    try:
+        yield from response.stream(chunk_size)
+    finally:
+        response.close()
+        response.release_conn()
+
 # Global instance
 minio_service = MinIOService()
\ No newline at end of file
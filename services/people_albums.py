@@ -0,0 +1,129 @@
+import time
+import logging
+import numpy as np
+from sqlalchemy.orm import Session
+from config import settings
+from models import FaceCluster, FaceEmbedding
+from utils.face_clustering import assign_to_centroids, cluster_centroids, cluster_faces, representatives
+from utils.face_index import normalize_rows, quality_filter
+
+logger = logging.getLogger(__name__)
+
+def update_event_clusters(db: Session, event_id: int, model_name: str) -> dict:
+    """
+    Group an event's unclustered faces into people ("people albums")
+
+    Only faces that passed the ingest quality gate are clustered.
+    Incremental: faces not yet in a cluster (new uploads, and earlier
+    singletons) are first matched against the existing cluster centroids;
+    the rest are clustered among themselves and every group of at least
+    CLUSTER_MIN_FACES becomes a new cluster. With no clusters yet this is a
+    full clustering of the event. Commits when done.
+
+    Returns:
+        Counts of assigned faces, new clusters and faces left unclustered
+    """
+    start = time.perf_counter()
+    rows = db.query(FaceEmbedding.id, FaceEmbedding.embedding).filter(
+        FaceEmbedding.event_id == event_id,
+        FaceEmbedding.model_name == model_name,
+        FaceEmbedding.cluster_id.is_(None),
+        quality_filter()
+    ).all()
+    if not rows:
+        return {"assigned": 0, "new_clusters": 0, "unclustered": 0}
+
+    face_ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    embeddings = normalize_rows(np.frombuffer(b''.join(r[1] for r in rows), dtype=np.float32).reshape(len(rows), -1))
+    updates = []
+
+    # Join existing clusters, moving their centroids towards the new members
+    clusters = db.query(FaceCluster).filter(
+        FaceCluster.event_id == event_id,
+        FaceCluster.model_name == model_name
+    ).all()
+    labels = np.full(len(rows), -1, dtype=np.int64)
+    if clusters:
+        centroids = np.stack([np.frombuffer(cluster.centroid, dtype=np.float32) for cluster in clusters])
+        labels = assign_to_centroids(embeddings, centroids, settings.CLUSTER_THRESHOLD)
+        for idx in np.unique(labels[labels >= 0]):
+            members = labels == idx
+            cluster = clusters[idx]
+            total = centroids[idx] * cluster.size + embeddings[members].sum(axis=0)
+            cluster.centroid = normalize_rows(total)[0].tobytes()
+            cluster.size += int(members.sum())
+            updates.extend({"id": int(face_id), "cluster_id": cluster.id} for face_id in face_ids[members])
+    assigned = int((labels >= 0).sum())
+
+    # Cluster the remaining faces among themselves
+    rest = np.flatnonzero(labels < 0)
+    new_clusters = 0
+    unclustered = len(rest)
+    if len(rest) >= settings.CLUSTER_MIN_FACES:
+        rest_embs = embeddings[rest]
+        rest_labels = cluster_faces(
+            rest_embs,
+            threshold=settings.CLUSTER_THRESHOLD,
+            k=settings.CLUSTER_NEIGHBORS,
+            merge_threshold=settings.CLUSTER_MERGE_THRESHOLD
+        )
+        n_groups = int(rest_labels.max()) + 1
+        sizes = np.bincount(rest_labels, minlength=n_groups)
+        centroids = cluster_centroids(rest_embs, rest_labels, n_groups)
+        reps = representatives(rest_embs, rest_labels, centroids)
+
+        groups = np.flatnonzero(sizes >= settings.CLUSTER_MIN_FACES)
+        created = [FaceCluster(
+            event_id=event_id,
+            model_name=model_name,
+            centroid=centroids[group].tobytes(),
+            size=int(sizes[group]),
+            representative_face_id=int(face_ids[rest[reps[group]]])
+        ) for group in groups]
+        db.add_all(created)
+        # One flush assigns all the new cluster IDs
+        db.flush()
+
+        cluster_ids = np.zeros(n_groups, dtype=np.int64)
+        cluster_ids[groups] = [cluster.id for cluster in created]
+        in_cluster = sizes[rest_labels] >= settings.CLUSTER_MIN_FACES
+        updates.extend(
+            {"id": int(face_id), "cluster_id": int(cluster_id)}
+            for face_id, cluster_id in zip(face_ids[rest[in_cluster]], cluster_ids[rest_labels[in_cluster]])
+        )
+        new_clusters = len(created)
+        unclustered -= int(in_cluster.sum())
+
+    if updates:
+        db.bulk_update_mappings(FaceEmbedding, updates)
+    db.commit()
+
+    logger.info(
+        f"Clustered event {event_id} in {time.perf_counter() - start:.2f}s: {assigned} faces joined existing "
+        f"clusters, {new_clusters} new clusters, {unclustered} faces left unclustered"
+    )
+    return {"assigned": assigned, "new_clusters": new_clusters, "unclustered": unclustered}
+
+def prune_clusters(db: Session, cluster_ids) -> int:
+    """
+    Refresh clusters after some of their faces were deleted
+
+    Sizes are recounted, a deleted representative is replaced by the
+    member with the best detection score and clusters left empty are
+    removed. Centroids are kept. Does not commit.
+
+    Returns:
+        Number of clusters removed
+    """
+    removed = 0
+    for cluster in db.query(FaceCluster).filter(FaceCluster.id.in_(list(cluster_ids))).all():
+        members = db.query(FaceEmbedding.id).filter(FaceEmbedding.cluster_id == cluster.id)
+        size = members.count()
+        if size == 0:
+            db.delete(cluster)
+            removed += 1
+            continue
+        cluster.size = size
+        if members.filter(FaceEmbedding.id == cluster.representative_face_id).first() is None:
+            cluster.representative_face_id = members.order_by(FaceEmbedding.det_score.desc()).first()[0]
+    return removed
@@ -0,0 +1,185 @@
+import os
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional
+from sqlalchemy.orm import Session
+from config import settings
+from models import EventName
+
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire ttl_seconds after being stored"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+def image_digest(image: np.ndarray) -> str:
+    """SHA-256 of a decoded image's shape and pixels (identical re-posts hash the same)"""
+    digest = hashlib.sha256(str(image.shape).encode())
+    digest.update(np.ascontiguousarray(image).data)
+    return digest.hexdigest()
+
+class SelfieEmbeddingCache:
+    """Face records of recently seen selfies, keyed by model and pixel hash.
+
+    Retakes re-post the identical canvas image, and guests search several
+    events with the same selfie; both skip detection and recognition on a
+    hit. The in-process LRU can be backed by a directory shared between
+    workers (SELFIE_CACHE_DIR), where each entry is a small .npz file.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, disk_dir: str = ""):
+        self.memory = TTLCache(max_entries, ttl_seconds)
+        self.ttl = ttl_seconds
+        self.disk_dir = disk_dir
+        self.disk_hits = 0
+
+    def key(self, model_id: str, image: np.ndarray) -> str:
+        return f"{model_id}-{image_digest(image)}"
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        """Cached face records of a selfie (see key()), from memory or the shared directory"""
+        faces = self.memory.get(key)
+        if faces is None:
+            faces = self._read_disk(key)
+            if faces is not None:
+                self.memory.put(key, faces)
+        return faces
+
+    def put(self, key: str, faces: List[dict]):
+        """Remember the face records of a freshly embedded selfie"""
+        self._write_disk(key, faces)
+        self.memory.put(key, faces)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.npz")
+
+    def _read_disk(self, key: str) -> Optional[List[dict]]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with np.load(path) as data:
+                faces = [{
+                    "face_index": i,
+                    "bbox": [float(v) for v in data["bboxes"][i]],
+                    "det_score": float(data["det_scores"][i]),
+                    "embedding": data["embeddings"][i].copy()
+                } for i in range(len(data["det_scores"]))]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable selfie cache entry {path}: {e}")
+            return None
+        self.disk_hits += 1
+        return faces
+
+    def _write_disk(self, key: str, faces: List[dict]):
+        # Selfies without faces are only remembered in memory
+        if not self.disk_dir or not faces:
+            return
+        tmp_path = None
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    bboxes=np.array([face["bbox"] for face in faces], dtype=np.float32).reshape(-1, 4),
+                    det_scores=np.array([face["det_score"] for face in faces], dtype=np.float32),
+                    embeddings=np.array([face["embedding"] for face in faces], dtype=np.float32)
+                )
+            # Readers in other workers see either no file or a complete one
+            os.replace(tmp_path, self._disk_path(key))
+        except Exception as e:
+            logger.warning(f"Could not write selfie cache entry: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def stats(self) -> dict:
+        return {**self.memory.stats(), "disk_dir": self.disk_dir or None, "disk_hits": self.disk_hits}
+
+class SearchResultCache(TTLCache):
+    """Ranked matches of a selfie in an event, valid for one version of the event.
+
+    Keys include EventName.version, which is bumped in the database whenever
+    the event's photos change, so every worker stops using old results as
+    soon as it reads the new version; stale entries simply age out.
+    """
+
+    @staticmethod
+    def key(selfie_key: str, event_id: int, version: int, threshold: float, top_k: Optional[int],
+            include_low_quality: bool = False) -> tuple:
+        return (selfie_key, event_id, version, threshold, top_k, include_low_quality)
+
+    def invalidate_event(self, event_id: int):
+        """Drop this worker's entries for an event (used when it is deleted)"""
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == event_id]:
+                del self._entries[key]
+
+def bump_event_version(db: Session, event_id: int):
+    """Increment an event's version in the caller's transaction (atomic across workers)"""
+    db.query(EventName).filter(EventName.id == event_id).update(
+        {EventName.version: EventName.version + 1}, synchronize_session=False
+    )
+
+# Global instances
+selfie_cache = SelfieEmbeddingCache(
+    settings.SELFIE_CACHE_SIZE,
+    settings.SELFIE_CACHE_TTL_SECONDS,
+    settings.SELFIE_CACHE_DIR
+)
+
+# Values are lists of (photo_id, file_path, similarity), highest first
+search_result_cache = SearchResultCache(settings.SEARCH_CACHE_SIZE, settings.SEARCH_CACHE_TTL_SECONDS)
@@ -132,8 +132,8 @@ async function submitSelfie() {
   allImagesContainer.classList.add('hidden');
   
   try {
-    // Get image data from canvas
-    const imageData = canvas.toDataURL('image/png');
+    // Get the canvas as a binary JPEG (much smaller than a base64 PNG data URL)
+    const imageBlob = await new Promise(resolve => canvas.toBlob(resolve, 'image/jpeg', 0.92));
     
     // Get event ID if available
     const eventId = eventIdInput ? eventIdInput.value : null;
@@ -148,14 +148,14 @@ async function submitSelfie() {
     
     // Prepare form data
     const formData = new FormData();
-    formData.append('selfie_data', imageData);
+    formData.append('selfie', imageBlob, 'selfie.jpg');
     formData.append('person_name', name);
     if (eventId) {
       formData.append('event_id', eventId);
     }
     
     // Send to server
-    const response = await fetch('/download/selfie-match', {
+    const response = await fetch('/download/selfie-match/upload', {
       method: 'POST',
       body: formData
     });
@@ -192,7 +192,7 @@ function displayMatches(matches) {
       matchElement.className = 'border rounded p-2 text-center';
       matchElement.innerHTML = `
         <div class="bg-gray-200 border-2 border-dashed rounded-xl w-full h-32 mx-auto flex items-center justify-center overflow-hidden">
-          <img src="/download/image/${match.id}" alt="Matched photo" class="w-full h-full object-cover" onerror="this.parentElement.innerHTML='<div class=\\'text-gray-500\\'>Image not available</div>'">
+          <img src="/download/image/${match.id}?size=256" loading="lazy" alt="Matched photo" class="w-full h-full object-cover" onerror="this.parentElement.innerHTML='<div class=\\'text-gray-500\\'>Image not available</div>'">
         </div>
         <p class="text-sm mt-1">Similarity: ${(match.similarity * 100).toFixed(1)}%</p>
         <button class="mt-2 px-2 py-1 bg-blue-500 text-white text-xs rounded hover:bg-blue-600 view-photo-btn" data-photo-id="${match.id}">
@@ -261,7 +261,7 @@ function displayAllImages(photos) {
       photoElement.className = 'border rounded p-2 text-center';
       photoElement.innerHTML = `
         <div class="bg-gray-200 border-2 border-dashed rounded-xl w-full h-32 mx-auto flex items-center justify-center overflow-hidden">
-          <img src="/download/image/${photo.id}" alt="Event photo" class="w-full h-full object-cover" onerror="this.parentElement.innerHTML='<div class=\\'text-gray-500\\'>Image not available</div>'">
+          <img src="/download/image/${photo.id}?size=256" loading="lazy" alt="Event photo" class="w-full h-full object-cover" onerror="this.parentElement.innerHTML='<div class=\\'text-gray-500\\'>Image not available</div>'">
         </div>
         <button class="mt-2 px-2 py-1 bg-blue-500 text-white text-xs rounded hover:bg-blue-600 view-photo-btn" data-photo-id="${photo.id}">
           View Photo
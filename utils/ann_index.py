@@ -0,0 +1,138 @@
+import logging
+import numpy as np
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Rows assigned to lists per block, bounds the (block x nlist) score matrix
+ASSIGN_BLOCK_SIZE = 65536
+
+def _assign(embeddings: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid (by inner product) of every row, computed in blocks"""
+    labels = np.empty(len(embeddings), dtype=np.int64)
+    for start in range(0, len(embeddings), ASSIGN_BLOCK_SIZE):
+        block = embeddings[start:start + ASSIGN_BLOCK_SIZE]
+        labels[start:start + len(block)] = (block @ centroids.T).argmax(axis=1)
+    return labels
+
+def spherical_kmeans(embeddings: np.ndarray, n_clusters: int, n_iter: int = 10,
+                     sample_size: Optional[int] = None, seed: int = 0) -> np.ndarray:
+    """K-means on the unit sphere (cosine similarity), trained on a sample.
+
+    Args:
+        embeddings: L2-normalized float32 matrix
+        n_clusters: Number of centroids
+        n_iter: Lloyd iterations
+        sample_size: Rows used for training (default 64 per centroid)
+        seed: Random seed for the sample and the initial centroids
+
+    Returns:
+        L2-normalized (n_clusters x dim) float32 centroid matrix
+    """
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(embeddings), sample_size or n_clusters * 64)
+    sample = embeddings[rng.choice(len(embeddings), sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, n_clusters, replace=False)].copy()
+
+    for _ in range(n_iter):
+        labels = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        counts = np.bincount(labels, minlength=n_clusters)
+
+        # Re-seed empty clusters from random sample rows
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            sums[empty] = sample[rng.choice(sample_size, len(empty), replace=False)]
+
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+
+    return centroids
+
+class IVFIndex:
+    """Inverted-file approximate nearest-neighbour index over face vectors.
+
+    A spherical k-means coarse quantizer splits the rows into nlist lists.
+    A query only scans the nprobe lists whose centroids are closest to it,
+    so the cost per selfie is roughly nprobe/nlist of an exact scan.
+    """
+
+    def __init__(self, embeddings: np.ndarray, nlist: Optional[int] = None, n_iter: int = 10, seed: int = 0):
+        n = len(embeddings)
+        # sqrt(N) lists keeps list scans and centroid scoring balanced
+        self.nlist = max(1, min(n, nlist or int(np.sqrt(n))))
+        self.centroids = spherical_kmeans(embeddings, self.nlist, n_iter=n_iter, seed=seed)
+
+        labels = _assign(embeddings, self.centroids)
+        # Row indices grouped by list, with list k at order[offsets[k]:offsets[k + 1]]
+        self.order = np.argsort(labels, kind='stable').astype(np.int64)
+        self.offsets = np.r_[0, np.cumsum(np.bincount(labels, minlength=self.nlist))].astype(np.int64)
+
+    def candidates(self, query_embs: np.ndarray, nprobe: int) -> np.ndarray:
+        """Sorted unique row indices in the nprobe closest lists of any query"""
+        nprobe = max(1, min(nprobe, self.nlist))
+        centroid_scores = query_embs @ self.centroids.T
+        probed = np.unique(np.argpartition(-centroid_scores, nprobe - 1, axis=1)[:, :nprobe])
+        rows = np.concatenate([self.order[self.offsets[k]:self.offsets[k + 1]] for k in probed])
+        rows.sort()
+        return rows
+
+class ClusterIndex:
+    """Coarse index over an event's people clusters (see utils/face_clustering.py).
+
+    Same layout as IVFIndex, but the lists are the precomputed identity
+    clusters and the centroids their mean faces. A selfie is scored against
+    the centroids first and only the faces of its best clusters, plus the
+    faces that belong to no cluster, are scored exactly.
+    """
+
+    def __init__(self, embeddings: np.ndarray, cluster_ids: np.ndarray):
+        clustered = np.flatnonzero(cluster_ids >= 0)
+        _, labels = np.unique(cluster_ids[clustered], return_inverse=True)
+        self.nlist = int(labels.max()) + 1 if len(labels) else 0
+
+        sums = np.zeros((self.nlist, embeddings.shape[1]), dtype=np.float32)
+        np.add.at(sums, labels, embeddings[clustered])
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.centroids = sums / norms
+
+        self.order = clustered[np.argsort(labels, kind='stable')].astype(np.int64)
+        self.offsets = np.r_[0, np.cumsum(np.bincount(labels, minlength=self.nlist))].astype(np.int64)
+        # Singletons are always scored, so a guest seen only once is still found
+        self.unclustered = np.flatnonzero(cluster_ids < 0).astype(np.int64)
+        self.count = len(cluster_ids)
+
+    def candidates(self, query_embs: np.ndarray, n_clusters: int, margin: float,
+                   threshold: float) -> Optional[np.ndarray]:
+        """Sorted rows of the n_clusters best clusters of each query, plus unclustered rows.
+
+        Returns None when the coarse stage cannot be trusted and the caller
+        should fall back to an exact scan: when refining would cover every
+        cluster anyway, or when for some query face the best cluster left
+        out still scores above threshold and within margin of the best one,
+        or when the candidates are more than half of all rows (gathering them
+        would cost more than the exact scan saves).
+        """
+        if self.nlist <= n_clusters or 2 * len(self.unclustered) > self.count:
+            return None
+
+        centroid_scores = query_embs @ self.centroids.T
+        top = np.argpartition(-centroid_scores, n_clusters, axis=1)[:, :n_clusters + 1]
+        top_scores = np.take_along_axis(centroid_scores, top, axis=1)
+        ranked = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, ranked, axis=1)
+        top_scores = np.take_along_axis(top_scores, ranked, axis=1)
+
+        best, first_left_out = top_scores[:, 0], top_scores[:, n_clusters]
+        if np.any((first_left_out >= threshold) & (first_left_out >= best - margin)):
+            return None
+
+        probed = np.unique(top[:, :n_clusters])
+        rows = np.concatenate([self.order[self.offsets[k]:self.offsets[k + 1]] for k in probed] + [self.unclustered])
+        if 2 * len(rows) > self.count:
+            return None
+        rows.sort()
+        return rows
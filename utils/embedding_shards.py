@@ -0,0 +1,149 @@
+import os
+import json
+import shutil
+import logging
+import numpy as np
+from typing import Dict, Optional, Tuple
+from config import settings
+from utils.embedding_quant import quantize
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout changes; older shards are then ignored and rebuilt
+SHARD_FORMAT = 3
+HEADER_FILE = "header.json"
+
+def shard_dir(event_id: int, model_name: str) -> str:
+    """Directory holding the shard of one event for one model"""
+    return os.path.join(settings.EMBEDDING_SHARD_DIR, f"event_{event_id}", model_name)
+
+def _write_atomic(path: str, data: bytes):
+    """Write to a temp file and rename it into place so readers never see partial files"""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def write_shard(event_id: int, model_name: str, embeddings: np.ndarray, face_ids: np.ndarray,
+                photo_ids: np.ndarray, cluster_ids: np.ndarray, stats: Tuple[int, int],
+                storage: str = "float32"):
+    """Write an event's face vectors as a shard.
+
+    Layout of shard_dir(event_id, model_name):
+        header.json                  model name, storage mode, dimension, count, stats, file names
+        embeddings-<tag>.f32         raw float32 (count x dim), row-major
+        face_ids-<tag>.i64           raw int64 face ids, parallel to the rows
+        photo_ids-<tag>.i64          raw int64 photo ids, parallel to the rows
+        cluster_ids-<tag>.i64        raw int64 people-cluster ids (-1 = none), parallel to the rows
+        compact-<tag>.f16 / .i8      float16 or int8 copy of the vectors (compact storage only)
+        scales-<tag>.f32             per-row int8 scales (int8 storage only)
+
+    Data files are named after the stats they were built from and the
+    header is replaced last, so a reader always sees a consistent set.
+    Arrays are expected in EventFaceIndex order (normalized, sorted by photo).
+    """
+    directory = shard_dir(event_id, model_name)
+    os.makedirs(directory, exist_ok=True)
+
+    tag = f"{stats[0]}-{stats[1]}"
+    arrays = {
+        "embeddings": (f"embeddings-{tag}.f32", np.ascontiguousarray(embeddings, dtype=np.float32)),
+        "face_ids": (f"face_ids-{tag}.i64", np.ascontiguousarray(face_ids, dtype=np.int64)),
+        "photo_ids": (f"photo_ids-{tag}.i64", np.ascontiguousarray(photo_ids, dtype=np.int64)),
+        "cluster_ids": (f"cluster_ids-{tag}.i64", np.ascontiguousarray(cluster_ids, dtype=np.int64)),
+    }
+    if storage != "float32" and len(face_ids):
+        compact, scales = quantize(arrays["embeddings"][1], storage)
+        arrays["compact"] = (f"compact-{tag}.{'f16' if storage == 'float16' else 'i8'}", compact)
+        if scales is not None:
+            arrays["scales"] = (f"scales-{tag}.f32", scales)
+
+    files = {}
+    for key, (name, array) in arrays.items():
+        _write_atomic(os.path.join(directory, name), array.tobytes())
+        files[key] = name
+
+    header = {
+        "format": SHARD_FORMAT,
+        "model_name": model_name,
+        "storage": storage,
+        "dim": int(embeddings.shape[1]) if len(face_ids) else 0,
+        "count": int(len(face_ids)),
+        "stats": [int(stats[0]), int(stats[1])],
+        "files": files,
+    }
+    _write_atomic(os.path.join(directory, HEADER_FILE), json.dumps(header).encode("utf-8"))
+
+    # Remove data files of older versions; processes that already mapped them keep their pages
+    for name in os.listdir(directory):
+        if name != HEADER_FILE and name not in files.values() and ".tmp-" not in name:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+    logger.info(f"Wrote embedding shard for event {event_id}: {header['count']} faces ({storage})")
+
+def read_shard_header(event_id: int, model_name: str) -> Optional[dict]:
+    """Header of an event's shard, or None if there is no usable one"""
+    try:
+        with open(os.path.join(shard_dir(event_id, model_name), HEADER_FILE), "rb") as f:
+            header = json.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except (ValueError, OSError) as e:
+        logger.warning(f"Ignoring unreadable embedding shard header for event {event_id}: {e}")
+        return None
+    if header.get("format") != SHARD_FORMAT or header.get("model_name") != model_name:
+        return None
+    return header
+
+def read_shard(event_id: int, model_name: str) -> Optional[Tuple[dict, Dict[str, np.ndarray]]]:
+    """Open an event's shard.
+
+    The float32 vectors and id arrays are memory-mapped with np.memmap; the
+    compact copy (if any) is read into memory, since it is what gets scanned.
+
+    Returns:
+        (header, arrays) with embeddings, face_ids, photo_ids, cluster_ids
+        and, for compact storage, compact (+ scales for int8); or None if
+        there is no usable shard (missing, other format/model, or replaced
+        mid-read)
+    """
+    directory = shard_dir(event_id, model_name)
+    header = read_shard_header(event_id, model_name)
+    if header is None:
+        return None
+    try:
+        count, dim = header["count"], header["dim"]
+        if count == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return header, {
+                "embeddings": np.zeros((0, 0), dtype=np.float32),
+                "face_ids": empty, "photo_ids": empty, "cluster_ids": empty
+            }
+
+        files = header["files"]
+        path = {key: os.path.join(directory, name) for key, name in files.items()}
+        arrays = {
+            "embeddings": np.memmap(path["embeddings"], dtype=np.float32, mode="r", shape=(count, dim)),
+            "face_ids": np.memmap(path["face_ids"], dtype=np.int64, mode="r", shape=(count,)),
+            "photo_ids": np.memmap(path["photo_ids"], dtype=np.int64, mode="r", shape=(count,)),
+            "cluster_ids": np.memmap(path["cluster_ids"], dtype=np.int64, mode="r", shape=(count,)),
+        }
+        if "compact" in files:
+            compact_dtype = np.float16 if header["storage"] == "float16" else np.int8
+            arrays["compact"] = np.fromfile(path["compact"], dtype=compact_dtype).reshape(count, dim)
+        if "scales" in files:
+            arrays["scales"] = np.fromfile(path["scales"], dtype=np.float32)
+        return header, arrays
+
+    except FileNotFoundError:
+        return None
+    except (ValueError, KeyError, OSError) as e:
+        logger.warning(f"Ignoring unreadable embedding shard for event {event_id}: {e}")
+        return None
+
+def remove_shards(event_id: int):
+    """Delete all shards of an event"""
+    shutil.rmtree(os.path.join(settings.EMBEDDING_SHARD_DIR, f"event_{event_id}"), ignore_errors=True)
@@ -0,0 +1,182 @@
+import logging
+import numpy as np
+from typing import Optional, Tuple
+from utils.ann_index import ASSIGN_BLOCK_SIZE, _assign, spherical_kmeans
+from utils.face_index import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+# Above this many faces the kNN graph only compares faces sharing a k-means list
+EXACT_KNN_MAX_FACES = 20000
+# Upper bound on the (block x candidates) similarity matrix, in elements
+KNN_BLOCK_ELEMENTS = 32 * 1024 * 1024
+
+def _block_knn(embeddings: np.ndarray, rows: np.ndarray, candidates: np.ndarray, k: int,
+               threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Top-k neighbours (excluding self) of rows among candidates, above threshold"""
+    src, dst, weight = [], [], []
+    k = min(k, len(candidates) - 1)
+    if k <= 0:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0, np.float32)
+
+    cand_embs = embeddings[candidates]
+    block_size = max(1, KNN_BLOCK_ELEMENTS // len(candidates))
+    for start in range(0, len(rows), block_size):
+        block = rows[start:start + block_size]
+        sims = embeddings[block] @ cand_embs.T
+        sims[block[:, None] == candidates[None, :]] = -np.inf
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_sims = np.take_along_axis(sims, top, axis=1)
+        keep = top_sims >= threshold
+        src.append(np.repeat(block, k).reshape(-1, k)[keep])
+        dst.append(candidates[top][keep])
+        weight.append(top_sims[keep])
+
+    return np.concatenate(src), np.concatenate(dst), np.concatenate(weight).astype(np.float32)
+
+def _top_lists(embeddings: np.ndarray, centroids: np.ndarray, m: int) -> np.ndarray:
+    """The m most similar centroids of every row, computed in blocks"""
+    top = np.empty((len(embeddings), m), dtype=np.int64)
+    for start in range(0, len(embeddings), ASSIGN_BLOCK_SIZE):
+        scores = embeddings[start:start + ASSIGN_BLOCK_SIZE] @ centroids.T
+        block_top = np.argpartition(-scores, m - 1, axis=1)[:, :m]
+        # Nearest list first
+        best = np.take_along_axis(scores, block_top, axis=1).argsort(axis=1)[:, ::-1]
+        top[start:start + len(scores)] = np.take_along_axis(block_top, best, axis=1)
+    return top
+
+def knn_graph(embeddings: np.ndarray, k: int = 10, threshold: float = 0.5, lists_per_face: int = 5,
+              seed: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Undirected similarity graph linking each face to its k nearest faces
+
+    Small sets are compared all against all in blocks. Larger sets are split
+    into sqrt(N) k-means lists; every face is filed under its lists_per_face
+    nearest lists, and the faces whose nearest list is L are compared with
+    everything filed under L. Two faces of one person almost always share a
+    list that way, and 100k faces never need a 100k x 100k matrix.
+
+    Args:
+        embeddings: L2-normalized float32 matrix
+        k: Neighbours per face
+        threshold: Minimum cosine similarity of an edge
+        lists_per_face: Lists each face is filed under (large sets only)
+
+    Returns:
+        (src, dst, weight) edge arrays, each edge present in both directions
+    """
+    n = len(embeddings)
+    if n <= EXACT_KNN_MAX_FACES:
+        all_rows = np.arange(n)
+        src, dst, weight = _block_knn(embeddings, all_rows, all_rows, k, threshold)
+    else:
+        nlist = int(np.sqrt(n))
+        centroids = spherical_kmeans(embeddings, nlist, seed=seed)
+        top = _top_lists(embeddings, centroids, min(lists_per_face, nlist))
+
+        # Faces filed under each list, with list L at filed[offsets[L]:offsets[L + 1]]
+        filed = np.argsort(top.ravel(), kind='stable') // top.shape[1]
+        offsets = np.r_[0, np.cumsum(np.bincount(top.ravel(), minlength=nlist))]
+        primary = np.argsort(top[:, 0], kind='stable')
+        primary_offsets = np.r_[0, np.cumsum(np.bincount(top[:, 0], minlength=nlist))]
+
+        parts = []
+        for lst in range(nlist):
+            rows = primary[primary_offsets[lst]:primary_offsets[lst + 1]]
+            if len(rows):
+                parts.append(_block_knn(embeddings, rows, filed[offsets[lst]:offsets[lst + 1]], k, threshold))
+        src, dst, weight = (np.concatenate(arrays) for arrays in zip(*parts))
+
+    return np.r_[src, dst], np.r_[dst, src], np.r_[weight, weight]
+
+def chinese_whispers(n: int, src: np.ndarray, dst: np.ndarray, weight: np.ndarray,
+                     n_iter: int = 20, seed: int = 0) -> np.ndarray:
+    """
+    Chinese whispers graph clustering, vectorized with NumPy
+
+    Every face starts in its own cluster and repeatedly takes the label with
+    the largest total edge weight among its neighbours. Updates are applied
+    to a random half of the nodes per round (instead of one node at a time),
+    which avoids the oscillation of fully synchronous updates.
+
+    Returns:
+        Cluster label per node, numbered 0..C-1; isolated nodes get their own label
+    """
+    rng = np.random.default_rng(seed)
+    labels = np.arange(n, dtype=np.int64)
+    if len(src) == 0:
+        return labels
+
+    for _ in range(n_iter):
+        # Total weight of each (node, neighbour label) pair
+        keys, inverse = np.unique(src * n + labels[dst], return_inverse=True)
+        totals = np.bincount(inverse, weights=weight)
+        nodes, node_labels = keys // n, keys % n
+
+        # Heaviest label per node
+        order = np.lexsort((-totals, nodes))
+        first = order[np.r_[True, nodes[order][1:] != nodes[order][:-1]]]
+        proposed = labels.copy()
+        proposed[nodes[first]] = node_labels[first]
+
+        changed = proposed != labels
+        if not changed.any():
+            break
+        update = changed & (rng.random(n) < 0.5)
+        labels[update] = proposed[update]
+
+    return np.unique(labels, return_inverse=True)[1].astype(np.int64)
+
+def cluster_faces(embeddings: np.ndarray, threshold: float = 0.5, k: int = 10,
+                  merge_threshold: Optional[float] = 0.6, seed: int = 0) -> np.ndarray:
+    """
+    Group faces into identities
+
+    Chinese whispers on the face kNN graph, followed by one more round on
+    the graph of cluster centroids that merges fragments of one person
+    (centroids average out per-photo noise, so fragments of the same person
+    are far more similar than any two of their faces).
+
+    Args:
+        embeddings: L2-normalized float32 matrix
+        threshold: Minimum cosine similarity of a face-face edge
+        k: Neighbours per face
+        merge_threshold: Minimum centroid similarity to merge clusters (None skips merging)
+
+    Returns:
+        Cluster label per row, numbered 0..C-1
+    """
+    src, dst, weight = knn_graph(embeddings, k=k, threshold=threshold, seed=seed)
+    labels = chinese_whispers(len(embeddings), src, dst, weight, seed=seed)
+
+    if merge_threshold is not None and len(embeddings):
+        n_clusters = int(labels.max()) + 1
+        centroids = cluster_centroids(embeddings, labels, n_clusters)
+        src, dst, weight = knn_graph(centroids, k=k, threshold=merge_threshold, seed=seed)
+        labels = chinese_whispers(n_clusters, src, dst, weight, seed=seed)[labels]
+
+    return labels
+
+def cluster_centroids(embeddings: np.ndarray, labels: np.ndarray, n_clusters: int) -> np.ndarray:
+    """L2-normalized mean vector of each cluster"""
+    sums = np.zeros((n_clusters, embeddings.shape[1]), dtype=np.float32)
+    np.add.at(sums, labels, embeddings)
+    return normalize_rows(sums)
+
+def assign_to_centroids(embeddings: np.ndarray, centroids: np.ndarray, threshold: float) -> np.ndarray:
+    """Index of the most similar centroid per row, or -1 when below threshold"""
+    if len(centroids) == 0:
+        return np.full(len(embeddings), -1, dtype=np.int64)
+    labels = _assign(embeddings, centroids)
+    best = np.einsum('ij,ij->i', embeddings, centroids[labels])
+    labels[best < threshold] = -1
+    return labels
+
+def representatives(embeddings: np.ndarray, labels: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Row of the face closest to its centroid, for each cluster"""
+    sims = np.einsum('ij,ij->i', embeddings, centroids[labels])
+    order = np.lexsort((-sims, labels))
+    firsts = np.r_[True, labels[order][1:] != labels[order][:-1]]
+    reps = np.full(len(centroids), -1, dtype=np.int64)
+    reps[labels[order][firsts]] = order[firsts]
+    return reps
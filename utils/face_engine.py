@@ -0,0 +1,101 @@
+import logging
+import importlib
+import threading
+import numpy as np
+from typing import Dict, List, Optional, Tuple, Union
+from sqlalchemy.orm import Session
+from config import settings
+from utils.face_index import get_event_index
+from utils.image_decode import decode_image
+
+logger = logging.getLogger(__name__)
+
+ImageInput = Union[str, np.ndarray]
+
+def load_bgr(image: ImageInput) -> np.ndarray:
+    """Load an image path as an EXIF-oriented, contiguous BGR array (arrays are passed through)"""
+    if isinstance(image, np.ndarray):
+        return image
+    return decode_image(image).bgr
+
+class FaceEngine:
+    """Interface of a face detection and recognition backend.
+
+    Face records are dicts with face_index, bbox ([x1, y1, x2, y2]),
+    det_score, optionally kps (5x2 landmarks: eyes, nose, mouth corners)
+    and, once embedded, an L2-normalized float32 embedding.
+    Images are paths or BGR arrays.
+    """
+
+    # Stored as FaceEmbedding.model_name; vectors of different models never mix
+    model_id: str = ""
+    dimension: int = 0
+
+    def detect(self, image: ImageInput) -> List[dict]:
+        """Detect faces without embedding them"""
+        raise NotImplementedError
+
+    def embed(self, image: ImageInput) -> List[dict]:
+        """Detect and embed the faces of one image"""
+        return self.embed_batch([image])[0]
+
+    def embed_batch(self, images: List[ImageInput], batch_size: Optional[int] = None) -> List[List[dict]]:
+        """Detect and embed the faces of several images, one list of records per image"""
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Load the models and run a dummy inference"""
+        raise NotImplementedError
+
+    def status(self) -> dict:
+        """Load/warm-up state of the models, for readiness checks"""
+        raise NotImplementedError
+
+    def search_event(self, selfie_faces: List[dict], event_id: int, db: Session, threshold: float = 0.5,
+                     top_k: Optional[int] = 10, include_low_quality: bool = False) -> List[Tuple[int, float]]:
+        """Rank an event's photos against embedded selfie faces; errors are raised, not swallowed
+
+        With include_low_quality, faces below the ingest quality gate are
+        searched too (slower: they are scanned from an in-memory copy).
+
+        Returns:
+            List of (photo_id, similarity_score), highest first
+        """
+        if not selfie_faces:
+            logger.info("No faces detected in selfie")
+            return []
+
+        selfie_embs = np.array([f["embedding"] for f in selfie_faces], dtype=np.float32)
+
+        index = get_event_index(db, event_id, self.model_id, include_low_quality=include_low_quality)
+        return index.search(selfie_embs, top_k=top_k, threshold=threshold)
+
+# Engine name -> "module:Class". Modules are imported only when selected, so
+# an unused engine's dependencies (torch, onnxruntime) are never loaded.
+ENGINES: Dict[str, str] = {
+    "insightface": "utils.insight_face:FaceVerif",
+    "facenet": "utils.face_verif:FaceVerif",
+}
+
+_engines: Dict[str, FaceEngine] = {}
+_engines_lock = threading.Lock()
+
+def register_engine(name: str, target: str):
+    """Register an engine class given as "module:Class" under a FACE_ENGINE name"""
+    ENGINES[name] = target
+
+def get_face_engine(name: Optional[str] = None) -> FaceEngine:
+    """Return the shared instance of the configured (or named) face engine"""
+    name = name or settings.FACE_ENGINE
+    engine = _engines.get(name)
+    if engine is None:
+        if name not in ENGINES:
+            raise ValueError(f"Unknown face engine '{name}', expected one of {sorted(ENGINES)}")
+        with _engines_lock:
+            engine = _engines.get(name)
+            if engine is None:
+                module_name, class_name = ENGINES[name].split(':')
+                engine = getattr(importlib.import_module(module_name), class_name)()
+                _engines[name] = engine
+                logger.info(f"Using face engine '{name}' ({engine.model_id})")
+    return engine
@@ -0,0 +1,653 @@
+import os
+import copy
+import time
+import logging
+import threading
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from config import settings
+from models import EventName, FaceEmbedding
+from utils.ann_index import ClusterIndex, IVFIndex
+from utils.embedding_quant import STORAGE_MODES, approx_scores, quantize
+from utils.embedding_shards import read_shard, read_shard_header, write_shard, remove_shards
+
+logger = logging.getLogger(__name__)
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize each row, returning a contiguous float32 matrix"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def group_starts(photo_ids: np.ndarray) -> np.ndarray:
+    """Start offset of each run of equal photo IDs in a photo-sorted array"""
+    if len(photo_ids) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.flatnonzero(np.r_[True, photo_ids[1:] != photo_ids[:-1]])
+
+def score_faces(embeddings: np.ndarray, query_embs: np.ndarray) -> np.ndarray:
+    """Best similarity of every stored face against any of the query faces.
+
+    One (faces x dim) @ (dim x queries) product, then a max over the queries.
+    """
+    return (embeddings @ query_embs.T).max(axis=1)
+
+def top_k_photos(face_scores: np.ndarray, starts: np.ndarray, photo_ids: np.ndarray,
+                 top_k: Optional[int], threshold: float) -> List[Tuple[int, float]]:
+    """Reduce face scores to a per-photo max and return the best photos.
+
+    Args:
+        face_scores: Score per face, with faces grouped by photo
+        starts: Offset of the first face of each photo (see group_starts)
+        photo_ids: Photo ID of each group, parallel to starts
+        top_k: Number of photos to return (None for all above threshold)
+        threshold: Minimum cosine similarity for a match
+
+    Returns:
+        List of (photo_id, similarity) sorted by similarity, highest first
+    """
+    if len(face_scores) == 0:
+        return []
+
+    photo_scores = np.maximum.reduceat(face_scores, starts)
+    candidates = np.flatnonzero(photo_scores > threshold)
+
+    # argpartition keeps the top-k selection O(photos) instead of a full sort
+    if top_k is not None and len(candidates) > top_k:
+        best = np.argpartition(-photo_scores[candidates], top_k - 1)[:top_k]
+        candidates = candidates[best]
+
+    candidates = candidates[np.argsort(-photo_scores[candidates], kind='stable')]
+    return [(int(photo_ids[i]), float(photo_scores[i])) for i in candidates]
+
+# Selectable with SEARCH_STRATEGY (default exact) or per call; "auto" picks exact or ann by face count
+SEARCH_STRATEGIES = ("auto", "exact", "ann", "clusters")
+
+# Compact scores below threshold minus this can't reach threshold after
+# rescoring (float16 error is ~1e-3, int8 ~1e-2 for 512-d unit vectors)
+RESCORE_SLACK = 0.02
+
+class EventFaceIndex:
+    """Face vectors of one event held as a single contiguous matrix.
+
+    Rows are L2-normalized float32 and sorted by photo, with parallel
+    face_ids/photo_ids/cluster_ids int arrays, so a selfie is scored against
+    the whole event with one matrix product and a vectorized group-max.
+    With SEARCH_STRATEGY=auto, events with at least ANN_MIN_FACES faces are
+    searched through an IVF index instead, and the "clusters" strategy
+    refines only the best people clusters (see search).
+
+    With float16/int8 storage the exact scan runs over a compact in-memory
+    copy, and only the best RESCORE_CANDIDATES faces are rescored against
+    the float32 vectors, which stay memory-mapped on disk when the index
+    comes from a shard.
+
+    Deleted faces are masked by a tombstone bitmap (deleted) rather than
+    removed; see with_deleted and SegmentedEventIndex.
+    """
+
+    def __init__(self, event_id: int, embeddings: np.ndarray, face_ids: np.ndarray,
+                 photo_ids: np.ndarray, model_name: str, stats: Tuple[int, int] = (0, 0),
+                 presorted: bool = False, cluster_ids: Optional[np.ndarray] = None,
+                 storage: str = "float32", compact: Optional[np.ndarray] = None,
+                 scales: Optional[np.ndarray] = None):
+        self.event_id = event_id
+        self.model_name = model_name
+        self.storage = storage
+        if cluster_ids is None:
+            cluster_ids = np.full(len(face_ids), -1, dtype=np.int64)
+        if presorted:
+            # Already normalized and sorted (e.g. memory-mapped from a shard), keep as is
+            self.embeddings, self.face_ids, self.photo_ids = embeddings, face_ids, photo_ids
+            self.cluster_ids = cluster_ids
+        else:
+            order = np.argsort(photo_ids, kind='stable')
+            self.embeddings = normalize_rows(embeddings[order]) if len(order) else np.zeros((0, 0), dtype=np.float32)
+            self.face_ids = np.ascontiguousarray(face_ids[order], dtype=np.int64)
+            self.photo_ids = np.ascontiguousarray(photo_ids[order], dtype=np.int64)
+            self.cluster_ids = np.ascontiguousarray(cluster_ids[order], dtype=np.int64)
+        if storage != "float32" and compact is None and len(self.face_ids):
+            compact, scales = quantize(self.embeddings, storage)
+        self.compact, self.scales = compact, scales
+        # Tombstones: True for rows of deleted faces, None if there are none
+        self.deleted: Optional[np.ndarray] = None
+        self.starts = group_starts(self.photo_ids)
+        self.group_photo_ids = self.photo_ids[self.starts]
+        # (face count, max face id) of the rows this index was built from
+        self.stats = stats
+        self._ann = None
+        self._ann_lock = threading.Lock()
+        self._coarse = None
+        # Cluster-strategy searches, and how many fell back to an exact scan
+        self.coarse_searches = 0
+        self.coarse_fallbacks = 0
+
+    def __len__(self):
+        return len(self.face_ids)
+
+    @property
+    def live_count(self) -> int:
+        """Rows that are not tombstoned"""
+        return len(self) if self.deleted is None else len(self) - int(self.deleted.sum())
+
+    def memory_bytes(self) -> int:
+        """Bytes held in process memory (memory-mapped arrays are not counted)"""
+        arrays = [self.embeddings, self.face_ids, self.photo_ids, self.cluster_ids,
+                  self.starts, self.group_photo_ids, self.compact, self.scales, self.deleted]
+        return sum(a.nbytes for a in arrays if a is not None and not isinstance(a, np.memmap))
+
+    def with_deleted(self, face_ids: np.ndarray) -> "EventFaceIndex":
+        """Copy of this index with the given faces tombstoned; the arrays are shared, not copied"""
+        hit = np.isin(self.face_ids, face_ids)
+        if self.deleted is not None:
+            hit &= ~self.deleted
+        if not hit.any():
+            return self
+        index = copy.copy(self)
+        index.deleted = hit if self.deleted is None else self.deleted | hit
+        return index
+
+    @classmethod
+    def from_rows(cls, event_id: int, model_name: str, rows: list, storage: str = "float32") -> "EventFaceIndex":
+        """Build the index from (id, photo_id, embedding, cluster_id) face_embeddings rows"""
+        if not rows:
+            empty = np.zeros(0, dtype=np.int64)
+            return cls(event_id, np.zeros((0, 0), dtype=np.float32), empty, empty, model_name, storage=storage)
+
+        face_ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        photo_ids = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows))
+        embeddings = np.frombuffer(b''.join(r[2] for r in rows), dtype=np.float32).reshape(len(rows), -1)
+        cluster_ids = np.fromiter((-1 if r[3] is None else r[3] for r in rows), dtype=np.int64, count=len(rows))
+        return cls(event_id, embeddings, face_ids, photo_ids, model_name,
+                   stats=(len(rows), int(face_ids.max())), cluster_ids=cluster_ids, storage=storage)
+
+    @classmethod
+    def from_db(cls, db: Session, event_id: int, model_name: str, storage: str = "float32") -> "EventFaceIndex":
+        """Build the index from the face_embeddings rows of an event"""
+        return cls.from_rows(event_id, model_name, face_rows(db, event_id, model_name), storage=storage)
+
+    @classmethod
+    def from_shard(cls, event_id: int, model_name: str) -> Optional["EventFaceIndex"]:
+        """Open the event's on-disk shard; vectors are memory-mapped, not read"""
+        shard = read_shard(event_id, model_name)
+        if shard is None:
+            return None
+        header, arrays = shard
+        return cls(event_id, arrays["embeddings"], arrays["face_ids"], arrays["photo_ids"], model_name,
+                   stats=tuple(header["stats"]), presorted=True, cluster_ids=arrays["cluster_ids"],
+                   storage=header["storage"], compact=arrays.get("compact"), scales=arrays.get("scales"))
+
+    def save_shard(self):
+        """Write this index to disk so other processes can memory-map it"""
+        write_shard(self.event_id, self.model_name, self.embeddings, self.face_ids, self.photo_ids,
+                    self.cluster_ids, self.stats, storage=self.storage)
+
+    @property
+    def uses_ann(self) -> bool:
+        """Whether searches go through the approximate index by default"""
+        return settings.ANN_MIN_FACES > 0 and len(self) >= settings.ANN_MIN_FACES
+
+    def ann(self) -> IVFIndex:
+        """IVF index over this event's faces, built on first use"""
+        if self._ann is None:
+            with self._ann_lock:
+                if self._ann is None:
+                    self._ann = IVFIndex(self.embeddings, nlist=settings.ANN_NLIST or None)
+                    logger.info(f"Built IVF index for event {self.event_id}: {len(self)} faces, {self._ann.nlist} lists")
+        return self._ann
+
+    def coarse(self) -> ClusterIndex:
+        """Centroid index over this event's people clusters, built on first use"""
+        if self._coarse is None:
+            with self._ann_lock:
+                if self._coarse is None:
+                    self._coarse = ClusterIndex(self.embeddings, self.cluster_ids)
+        return self._coarse
+
+    def search(self, query_embs: np.ndarray, top_k: Optional[int] = 10, threshold: float = 0.5,
+               exact: Optional[bool] = None, nprobe: Optional[int] = None,
+               strategy: Optional[str] = None) -> List[Tuple[int, float]]:
+        """Score all query faces at once and return the top-k (photo_id, similarity).
+
+        Strategies:
+            exact     one scan over every face
+            ann       IVF index, nprobe lists per query face
+            clusters  score the people-cluster centroids, then only the faces
+                      of the COARSE_CLUSTERS best clusters and unclustered
+                      faces; ambiguous queries fall back to exact
+            auto      ann for events with at least ANN_MIN_FACES faces, else exact
+
+        Args:
+            query_embs: Selfie face embeddings (one row per face)
+            top_k: Number of photos to return (None for all above threshold)
+            threshold: Minimum cosine similarity for a match
+            exact: Force (True) or skip (False) the exact scan, overriding strategy
+            nprobe: IVF lists probed per query face (default ANN_NPROBE)
+            strategy: One of SEARCH_STRATEGIES (default SEARCH_STRATEGY)
+        """
+        if len(self) == 0:
+            return []
+        query_embs = normalize_rows(query_embs)
+
+        if exact is not None:
+            strategy = "exact" if exact else "ann"
+        strategy = strategy or settings.SEARCH_STRATEGY
+        if strategy not in SEARCH_STRATEGIES:
+            raise ValueError(f"Unknown search strategy '{strategy}', expected one of {SEARCH_STRATEGIES}")
+        if strategy == "auto":
+            strategy = "ann" if self.uses_ann else "exact"
+
+        if strategy == "ann":
+            rows = self.ann().candidates(query_embs, nprobe or settings.ANN_NPROBE)
+            return self._search_rows(rows, query_embs, top_k, threshold)
+
+        if strategy == "clusters":
+            self.coarse_searches += 1
+            rows = self.coarse().candidates(query_embs, settings.COARSE_CLUSTERS, settings.COARSE_MARGIN, threshold)
+            if rows is not None:
+                return self._search_rows(rows, query_embs, top_k, threshold)
+            self.coarse_fallbacks += 1
+
+        if self.compact is not None:
+            return self._search_compact(query_embs, top_k, threshold)
+
+        face_scores = score_faces(self.embeddings, query_embs)
+        if self.deleted is not None:
+            face_scores[self.deleted] = -np.inf
+        return top_k_photos(face_scores, self.starts, self.group_photo_ids, top_k, threshold)
+
+    def _search_compact(self, query_embs: np.ndarray, top_k: Optional[int],
+                        threshold: float) -> List[Tuple[int, float]]:
+        """Exact-strategy scan over the compact copy, rescored at full precision"""
+        approx = approx_scores(self.compact, self.scales, query_embs)
+        if self.deleted is not None:
+            approx[self.deleted] = -np.inf
+        candidates = np.flatnonzero(approx > threshold - RESCORE_SLACK)
+
+        # Keep enough faces for top_k photos even when photos have several
+        if top_k is not None:
+            limit = max(settings.RESCORE_CANDIDATES, 4 * top_k)
+            if len(candidates) > limit:
+                candidates = candidates[np.argpartition(-approx[candidates], limit - 1)[:limit]]
+
+        candidates.sort()
+        return self._search_rows(candidates, query_embs, top_k, threshold)
+
+    def _search_rows(self, rows: np.ndarray, query_embs: np.ndarray, top_k: Optional[int],
+                     threshold: float) -> List[Tuple[int, float]]:
+        """Exact scoring restricted to a sorted subset of rows"""
+        if self.deleted is not None:
+            rows = rows[~self.deleted[rows]]
+        if len(rows) == 0:
+            return []
+        # Rows are sorted, so their photo ids are still grouped
+        photo_ids = self.photo_ids[rows]
+        starts = group_starts(photo_ids)
+        face_scores = score_faces(self.embeddings[rows], query_embs)
+        return top_k_photos(face_scores, starts, photo_ids[starts], top_k, threshold)
+
+def quality_filter(low_quality: bool = False):
+    """Filter selecting the faces of the default search index, or the low-quality ones"""
+    return FaceEmbedding.low_quality.is_(True) if low_quality else FaceEmbedding.low_quality.isnot(True)
+
+def face_rows(db: Session, event_id: int, model_name: str, *criteria, low_quality: bool = False) -> list:
+    """(id, photo_id, embedding, cluster_id) rows of an event's faces matching extra criteria"""
+    return db.query(FaceEmbedding.id, FaceEmbedding.photo_id, FaceEmbedding.embedding, FaceEmbedding.cluster_id).filter(
+        FaceEmbedding.event_id == event_id,
+        FaceEmbedding.model_name == model_name,
+        quality_filter(low_quality),
+        *criteria
+    ).all()
+
+# Face ids per IN (...) query when fetching rows missed by an id-range catch-up
+FETCH_CHUNK_SIZE = 1000
+
+class SegmentedEventIndex:
+    """An event's index as a compacted base plus append-only segments.
+
+    Faces stored after the base was built (from a shard or the database)
+    are appended as small segments, one per catch-up, and deleted faces are
+    tombstoned in whichever segment holds them, so keeping the index current
+    only touches the changed rows. Instances are never modified: caught_up
+    returns a new one and searches still running on the old one are
+    unaffected. Once needs_compaction() the live rows are merged into a new
+    base in the background (see compact_event_index).
+    """
+
+    def __init__(self, segments: List[EventFaceIndex], stats: Tuple[int, int]):
+        self.segments = segments
+        self.base = segments[0]
+        self.event_id = self.base.event_id
+        self.model_name = self.base.model_name
+        self.storage = self.base.storage
+        # (live face count, max face id) of the rows this index holds
+        self.stats = stats
+
+    def __len__(self):
+        return sum(segment.live_count for segment in self.segments)
+
+    @property
+    def appended_faces(self) -> int:
+        return sum(len(segment) for segment in self.segments[1:])
+
+    @property
+    def deleted_faces(self) -> int:
+        return sum(len(segment) - segment.live_count for segment in self.segments)
+
+    def memory_bytes(self) -> int:
+        return sum(segment.memory_bytes() for segment in self.segments)
+
+    def needs_compaction(self) -> bool:
+        """Whether segments or tombstones have grown past the INDEX_MAX_* limits"""
+        total = sum(len(segment) for segment in self.segments)
+        return (len(self.segments) - 1 > settings.INDEX_MAX_SEGMENTS
+                or self.appended_faces > settings.INDEX_MAX_APPENDED_FACES
+                or self.deleted_faces > settings.INDEX_MAX_DELETED_RATIO * max(total, 1))
+
+    def search(self, query_embs: np.ndarray, top_k: Optional[int] = 10, threshold: float = 0.5,
+               exact: Optional[bool] = None, nprobe: Optional[int] = None,
+               strategy: Optional[str] = None) -> List[Tuple[int, float]]:
+        """Search every segment (see EventFaceIndex.search) and merge the per-photo best scores"""
+        if len(self.segments) == 1:
+            return self.base.search(query_embs, top_k, threshold, exact, nprobe, strategy)
+
+        best: Dict[int, float] = {}
+        for segment in self.segments:
+            for photo_id, score in segment.search(query_embs, top_k, threshold, exact, nprobe, strategy):
+                if score > best.get(photo_id, -np.inf):
+                    best[photo_id] = score
+        ranked = sorted(best.items(), key=lambda item: -item[1])
+        return ranked if top_k is None else ranked[:top_k]
+
+    def caught_up(self, db: Session, stats: Tuple[int, int]) -> "SegmentedEventIndex":
+        """New index including the faces stored since this one was built, up to stats' max face id.
+
+        Faces with higher ids than any held are appended as one segment. If
+        the live count still differs from the database, the event's face ids
+        are compared (ids only, no vectors): faces that are gone are
+        tombstoned and ones that were missed (committed out of id order) are
+        fetched as another segment.
+        """
+        max_id = stats[1]
+        segments = list(self.segments)
+        rows = face_rows(db, self.event_id, self.model_name,
+                         FaceEmbedding.id > self.stats[1], FaceEmbedding.id <= max_id)
+        if rows:
+            segments.append(EventFaceIndex.from_rows(self.event_id, self.model_name, rows))
+
+        if sum(segment.live_count for segment in segments) != stats[0]:
+            ids = db.query(FaceEmbedding.id).filter(
+                FaceEmbedding.event_id == self.event_id,
+                FaceEmbedding.model_name == self.model_name,
+                quality_filter(),
+                FaceEmbedding.id <= max_id
+            ).all()
+            stored = np.fromiter((r[0] for r in ids), dtype=np.int64, count=len(ids))
+            held = np.concatenate([segment.face_ids for segment in segments])
+            gone = np.setdiff1d(held, stored)
+            if len(gone):
+                segments = [segment.with_deleted(gone) for segment in segments]
+            missing = np.setdiff1d(stored, held)
+            if len(missing):
+                rows = []
+                for start in range(0, len(missing), FETCH_CHUNK_SIZE):
+                    chunk = missing[start:start + FETCH_CHUNK_SIZE].tolist()
+                    rows.extend(face_rows(db, self.event_id, self.model_name, FaceEmbedding.id.in_(chunk)))
+                segments.append(EventFaceIndex.from_rows(self.event_id, self.model_name, rows))
+
+        live = sum(segment.live_count for segment in segments)
+        return SegmentedEventIndex(segments, (live, max_id))
+
+    def merged(self, cluster_lookup: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> EventFaceIndex:
+        """Live rows of all segments as a single index in this event's storage mode
+
+        Args:
+            cluster_lookup: (sorted face ids, cluster ids) replacing the cluster
+                ids held, which are stale for faces clustered after they were appended
+        """
+        parts = []
+        for segment in self.segments:
+            if len(segment) == 0:
+                continue
+            keep = np.arange(len(segment)) if segment.deleted is None else np.flatnonzero(~segment.deleted)
+            parts.append((np.asarray(segment.embeddings[keep]), segment.face_ids[keep],
+                          segment.photo_ids[keep], segment.cluster_ids[keep]))
+        if not parts:
+            empty = np.zeros(0, dtype=np.int64)
+            return EventFaceIndex(self.event_id, np.zeros((0, 0), dtype=np.float32), empty, empty,
+                                  self.model_name, stats=self.stats, storage=self.storage)
+
+        embeddings, face_ids, photo_ids, cluster_ids = (np.concatenate(arrays) for arrays in zip(*parts))
+        if cluster_lookup is not None and len(cluster_lookup[0]):
+            lookup_ids, lookup_clusters = cluster_lookup
+            pos = np.minimum(np.searchsorted(lookup_ids, face_ids), len(lookup_ids) - 1)
+            found = lookup_ids[pos] == face_ids
+            cluster_ids[found] = lookup_clusters[pos[found]]
+        return EventFaceIndex(self.event_id, embeddings, face_ids, photo_ids, self.model_name,
+                              stats=self.stats, cluster_ids=cluster_ids, storage=self.storage)
+
+# Per-process cache of event indexes
+_indexes: Dict[Tuple[int, str], SegmentedEventIndex] = {}
+_indexes_lock = threading.Lock()
+# Events with a background compaction running
+_compacting = set()
+# Low-quality faces per event, for searches that include them (rebuilt when stale)
+_low_quality_indexes: Dict[Tuple[int, str], EventFaceIndex] = {}
+# EventName.version each cached index (key + low_quality) was last checked at;
+# faces are never stored or deleted without bumping it, so a match skips the face count
+_checked_versions: Dict[Tuple[int, str, bool], int] = {}
+
+def event_stats(db: Session, event_id: int, model_name: str, low_quality: bool = False) -> Tuple[int, int]:
+    """(face count, max face id) for an event's searchable (or low-quality) faces, to detect a stale index"""
+    count, max_id = db.query(func.count(FaceEmbedding.id), func.max(FaceEmbedding.id)).filter(
+        FaceEmbedding.event_id == event_id,
+        FaceEmbedding.model_name == model_name,
+        quality_filter(low_quality)
+    ).one()
+    return int(count or 0), int(max_id or 0)
+
+def event_storage(db: Session, event_id: int) -> str:
+    """Embedding storage mode recorded for an event (float32 if unknown)"""
+    storage = db.query(EventName.embedding_storage).filter(EventName.id == event_id).scalar()
+    return _storage_mode(event_id, storage)
+
+def event_state(db: Session, event_id: int) -> Tuple[Optional[int], str]:
+    """(version, embedding storage mode) of an event in one primary key lookup; version is None if unknown"""
+    row = db.query(EventName.version, EventName.embedding_storage).filter(EventName.id == event_id).first()
+    if row is None:
+        return None, _storage_mode(event_id, None)
+    return row.version, _storage_mode(event_id, row.embedding_storage)
+
+def _storage_mode(event_id: int, storage: Optional[str]) -> str:
+    if storage not in STORAGE_MODES:
+        if storage is not None:
+            logger.warning(f"Unknown embedding storage '{storage}' for event {event_id}, using float32")
+        storage = "float32"
+    return storage
+
+def _persist(index: EventFaceIndex) -> EventFaceIndex:
+    """Write an index's shard; compact storage is reopened so float32 vectors are memory-mapped"""
+    try:
+        index.save_shard()
+        if index.storage != "float32":
+            index = EventFaceIndex.from_shard(index.event_id, index.model_name) or index
+    except OSError as e:
+        logger.error(f"Error writing embedding shard for event {index.event_id}: {e}")
+    return index
+
+def rebuild_event_index(db: Session, event_id: int, model_name: str, storage: Optional[str] = None) -> SegmentedEventIndex:
+    """Build an event's index from the database, write its shard and cache it"""
+    storage = storage or event_storage(db, event_id)
+    base = _persist(EventFaceIndex.from_db(db, event_id, model_name, storage=storage))
+    logger.info(f"Built face index for event {event_id}: {len(base)} faces ({storage})")
+    index = SegmentedEventIndex([base], base.stats)
+    with _indexes_lock:
+        _indexes[(event_id, model_name)] = index
+    return index
+
+def compact_event_index(db: Session, index: SegmentedEventIndex) -> SegmentedEventIndex:
+    """Merge an index's segments into a new base without tombstones, write its shard and cache it
+
+    Cluster ids are refreshed from the database (ids only, no vectors). If
+    the cached index was caught up meanwhile, its newer segments are kept
+    on top of the new base.
+    """
+    start = time.perf_counter()
+    rows = db.query(FaceEmbedding.id, FaceEmbedding.cluster_id).filter(
+        FaceEmbedding.event_id == index.event_id,
+        FaceEmbedding.model_name == index.model_name,
+        FaceEmbedding.id <= index.stats[1]
+    ).order_by(FaceEmbedding.id).all()
+    lookup = (np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows)),
+              np.fromiter((-1 if r[1] is None else r[1] for r in rows), dtype=np.int64, count=len(rows)))
+    base = _persist(index.merged(lookup))
+    compacted = SegmentedEventIndex([base], index.stats)
+
+    key = (index.event_id, index.model_name)
+    n = len(index.segments)
+    with _indexes_lock:
+        current = _indexes.get(key)
+        if current is index:
+            _indexes[key] = compacted
+        elif current is not None and all(a is b for a, b in zip(current.segments[:n], index.segments)):
+            compacted = SegmentedEventIndex([base] + current.segments[n:], current.stats)
+            _indexes[key] = compacted
+    logger.info(f"Compacted face index for event {index.event_id}: {n} segments, {index.deleted_faces} "
+                f"tombstones -> {len(base)} faces in {time.perf_counter() - start:.2f}s")
+    return compacted
+
+def _compact_in_background(index: SegmentedEventIndex):
+    # Imported here so the index stays usable without a database (e.g. in benchmarks)
+    from database import SessionLocal
+
+    key = (index.event_id, index.model_name)
+    db = SessionLocal()
+    try:
+        compact_event_index(db, index)
+    except Exception as e:
+        logger.error(f"Error compacting face index for event {index.event_id}: {e}")
+    finally:
+        db.close()
+        with _indexes_lock:
+            _compacting.discard(key)
+
+def schedule_compaction(index: SegmentedEventIndex):
+    """Compact an index on a background thread, unless one is already running for its event"""
+    key = (index.event_id, index.model_name)
+    with _indexes_lock:
+        if key in _compacting:
+            return
+        _compacting.add(key)
+    threading.Thread(target=_compact_in_background, args=(index,), daemon=True,
+                     name=f"compact-event-{index.event_id}").start()
+
+def low_quality_index(db: Session, event_id: int, model_name: str, version: Optional[int] = None) -> EventFaceIndex:
+    """In-memory index of an event's low-quality faces, rebuilt from the database when stale"""
+    key = (event_id, model_name)
+    with _indexes_lock:
+        index = _low_quality_indexes.get(key)
+        checked = _checked_versions.get(key + (True,))
+    if index is not None and version is not None and checked == version:
+        return index
+
+    stats = event_stats(db, event_id, model_name, low_quality=True)
+    if index is None or index.stats != stats:
+        index = EventFaceIndex.from_rows(event_id, model_name, face_rows(db, event_id, model_name, low_quality=True))
+    with _indexes_lock:
+        _low_quality_indexes[key] = index
+        _checked_versions[key + (True,)] = version
+    return index
+
+def get_event_index(db: Session, event_id: int, model_name: str,
+                    include_low_quality: bool = False) -> SegmentedEventIndex:
+    """Return an up-to-date index for an event.
+
+    Tries the in-process cache, then the memory-mapped shard written at
+    ingest or compaction. A stale one is caught up with the faces stored
+    (or deleted) since, instead of being rebuilt; every database row is
+    only decoded when there is no usable shard or the storage mode
+    changed. Compaction is started in the background once appended
+    segments or tombstones pass their limits.
+
+    The event's version and storage mode are read on every call; the face
+    counts that detect a stale index only when the version changed.
+
+    Faces below the ingest quality gate are not part of the index; with
+    include_low_quality they are searched as one more segment.
+    """
+    # Read before the face counts, so a bump in between is seen by the next call
+    version, storage = event_state(db, event_id)
+    index = _current_event_index(db, event_id, model_name, version, storage)
+    if include_low_quality:
+        low_quality = low_quality_index(db, event_id, model_name, version)
+        if len(low_quality):
+            return SegmentedEventIndex(index.segments + [low_quality], index.stats)
+    return index
+
+def _current_event_index(db: Session, event_id: int, model_name: str, version: Optional[int],
+                         storage: str) -> SegmentedEventIndex:
+    key = (event_id, model_name)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        checked = _checked_versions.get(key + (False,))
+    if index is not None and index.storage == storage and version is not None and checked == version:
+        return index
+
+    index = _refreshed_event_index(db, event_id, model_name, index, storage)
+    with _indexes_lock:
+        _checked_versions[key + (False,)] = version
+    return index
+
+def _refreshed_event_index(db: Session, event_id: int, model_name: str, index: Optional[SegmentedEventIndex],
+                           storage: str) -> SegmentedEventIndex:
+    key = (event_id, model_name)
+    stats = event_stats(db, event_id, model_name)
+    if index is not None and index.stats == stats and index.storage == storage:
+        return index
+
+    # A shard that is already current (e.g. just compacted elsewhere) beats catching up
+    header = read_shard_header(event_id, model_name)
+    shard_current = header is not None and tuple(header["stats"]) == stats and header["storage"] == storage
+    if index is None or index.storage != storage or shard_current:
+        base = EventFaceIndex.from_shard(event_id, model_name)
+        if base is None or base.storage != storage:
+            return rebuild_event_index(db, event_id, model_name, storage)
+        index = SegmentedEventIndex([base], base.stats)
+
+    if index.stats != stats:
+        index = index.caught_up(db, stats)
+    with _indexes_lock:
+        _indexes[key] = index
+    if index.needs_compaction():
+        schedule_compaction(index)
+    return index
+
+def index_status() -> dict:
+    """Summary of the cached indexes and shard storage, for readiness checks"""
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    return {
+        "cached_indexes": len(indexes),
+        "cached_faces": sum(len(index) for index in indexes),
+        "cached_bytes": sum(index.memory_bytes() for index in indexes),
+        "cached_segments": sum(len(index.segments) for index in indexes),
+        "cached_tombstones": sum(index.deleted_faces for index in indexes),
+        "shard_dir": settings.EMBEDDING_SHARD_DIR,
+        "shard_dir_exists": os.path.isdir(settings.EMBEDDING_SHARD_DIR),
+    }
+
+def invalidate_event_index(event_id: int):
+    """Drop cached indexes and shards of an event (e.g. after it is deleted)"""
+    with _indexes_lock:
+        for key in [k for k in _indexes if k[0] == event_id]:
+            del _indexes[key]
+        for key in [k for k in _low_quality_indexes if k[0] == event_id]:
+            del _low_quality_indexes[key]
+        for key in [k for k in _checked_versions if k[0] == event_id]:
+            del _checked_versions[key]
+    remove_shards(event_id)
@@ -0,0 +1,133 @@
+import cv2
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Tuple
+from config import settings
+
+# Gates in report order; each one is disabled by setting its threshold to 0
+QUALITY_GATES = ("det_score", "size", "yaw", "blur")
+
+# Face crops are resampled to this side before measuring blur, so the
+# score does not depend on how large the face is in the photo
+BLUR_CROP_SIZE = 64
+
+def estimate_yaw(kps) -> Optional[float]:
+    """
+    Approximate head yaw in degrees from 5-point landmarks
+
+    Uses the nose offset from the midpoint of the eyes, measured along the
+    eye axis (so head roll does not count) in units of half the eye
+    distance: 0 for a frontal face, approaching 90 for a profile. Landmarks
+    are (left eye, right eye, nose, left mouth, right mouth) as returned by
+    SCRFD and MTCNN.
+
+    Returns:
+        Yaw in degrees (0-90), or None without usable landmarks
+    """
+    if kps is None:
+        return None
+    kps = np.asarray(kps, dtype=np.float32)
+    if kps.shape != (5, 2):
+        return None
+    eye_axis = kps[1] - kps[0]
+    half_distance = np.linalg.norm(eye_axis) / 2
+    if half_distance < 1e-6:
+        return None
+    offset = np.dot(kps[2] - (kps[0] + kps[1]) / 2, eye_axis / (2 * half_distance))
+    return float(np.degrees(np.arcsin(np.clip(abs(offset) / half_distance, 0.0, 1.0))))
+
+def sharpness(image_bgr: np.ndarray, bbox: List[float]) -> Optional[float]:
+    """Variance of the Laplacian of the face crop at BLUR_CROP_SIZE (low = blurred)"""
+    height, width = image_bgr.shape[:2]
+    x1, y1 = max(int(bbox[0]), 0), max(int(bbox[1]), 0)
+    x2, y2 = min(int(np.ceil(bbox[2])), width), min(int(np.ceil(bbox[3])), height)
+    if x2 - x1 < 2 or y2 - y1 < 2:
+        return None
+    gray = cv2.cvtColor(image_bgr[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY)
+    gray = cv2.resize(gray, (BLUR_CROP_SIZE, BLUR_CROP_SIZE), interpolation=cv2.INTER_AREA)
+    return float(cv2.Laplacian(gray, cv2.CV_32F).var())
+
+def measure_face(image_bgr: np.ndarray, face: dict) -> dict:
+    """
+    Quality measures of a detected face, in the image it was detected in
+
+    Returns:
+        {"size": shorter bbox side in pixels, "yaw": degrees or None,
+        "sharpness": Laplacian variance or None}
+    """
+    bbox = face["bbox"]
+    return {
+        "size": round(float(min(bbox[2] - bbox[0], bbox[3] - bbox[1])), 1),
+        "yaw": _rounded(estimate_yaw(face.get("kps"))),
+        "sharpness": _rounded(sharpness(image_bgr, bbox)),
+    }
+
+def _rounded(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 1)
+
+def thresholds() -> Dict[str, float]:
+    """Current gate thresholds from settings"""
+    return {
+        "det_score": settings.FACE_MIN_DET_SCORE,
+        "size": settings.FACE_MIN_SIZE,
+        "yaw": settings.FACE_MAX_YAW,
+        "blur": settings.FACE_MIN_SHARPNESS,
+    }
+
+def failed_gates(det_score: float, measures: dict, limits: Optional[Dict[str, float]] = None) -> List[str]:
+    """Gates a face fails; measures that could not be taken (None) pass"""
+    limits = limits or thresholds()
+    checks = {
+        "det_score": limits["det_score"] > 0 and det_score is not None and det_score < limits["det_score"],
+        "size": limits["size"] > 0 and measures.get("size") is not None and measures["size"] < limits["size"],
+        "yaw": limits["yaw"] > 0 and measures.get("yaw") is not None and measures["yaw"] > limits["yaw"],
+        "blur": limits["blur"] > 0 and measures.get("sharpness") is not None and measures["sharpness"] < limits["blur"],
+    }
+    return [gate for gate in QUALITY_GATES if checks[gate]]
+
+class GateReport:
+    """How much each quality gate shrinks the default search index"""
+
+    def __init__(self, dimension: int = 0):
+        self.dimension = dimension
+        self.total = 0
+        self.low_quality = 0
+        # Faces failing each gate, and faces failing only that gate
+        self.failed = {gate: 0 for gate in QUALITY_GATES}
+        self.only = {gate: 0 for gate in QUALITY_GATES}
+
+    def add(self, failed: List[str]):
+        self.total += 1
+        if failed:
+            self.low_quality += 1
+            for gate in failed:
+                self.failed[gate] += 1
+            if len(failed) == 1:
+                self.only[failed[0]] += 1
+
+    def summary(self) -> dict:
+        """Counts and shares per gate; bytes are float32 vectors kept out of the index"""
+        share = lambda n: round(n / self.total, 4) if self.total else 0.0
+        return {
+            "faces": self.total,
+            "low_quality": self.low_quality,
+            "shrink": share(self.low_quality),
+            "bytes_saved": self.low_quality * self.dimension * 4,
+            "gates": {gate: {
+                "failed": self.failed[gate],
+                "shrink": share(self.failed[gate]),
+                "only_this_gate": self.only[gate],
+            } for gate in QUALITY_GATES},
+        }
+
+    def describe(self) -> str:
+        """One log line: total shrink and per-gate shares"""
+        gates = ", ".join(f"{gate} {self.failed[gate]} ({self.only[gate]} only)" for gate in QUALITY_GATES)
+        return f"{self.low_quality}/{self.total} faces below the quality gate ({gates})"
+
+def gate_report(rows: Iterable[Tuple[float, Optional[dict]]], dimension: int = 0,
+                limits: Optional[Dict[str, float]] = None) -> GateReport:
+    """Replay the gate over stored (det_score, quality measures) rows, e.g. to tune thresholds"""
+    report = GateReport(dimension)
+    for det_score, measures in rows:
+        report.add(failed_gates(det_score, measures or {}, limits))
+    return report
@@ -1,16 +1,74 @@
 from ast import In, alias
-from facenet_pytorch import MTCNN, InceptionResnetV1
 from PIL import Image, ImageDraw
-import torch
 import os
+import time
+import logging
 import tempfile
-from typing import List, Tuple
+import threading
+import numpy as np
+from typing import List, Optional, Tuple
+from config import settings
 from services.minio_service import minio_service
+from utils.face_engine import FaceEngine, ImageInput
+from utils.face_index import normalize_rows
 
-mtcnn = MTCNN(keep_all=True)
-resnet = InceptionResnetV1(pretrained='casia-webface').eval()
+logger = logging.getLogger(__name__)
 
-class FaceVerif:
+MODEL_NAME = 'casia-webface'
+
+# facenet-pytorch pulls in torch, so the models are only built on first use
+_models = None
+_models_lock = threading.Lock()
+_status = {"loaded": False, "warmed_up": False, "load_seconds": None, "error": None}
+
+def get_models():
+    """Return the shared (mtcnn, resnet) pair, loading it on first call (thread-safe)"""
+    global _models
+    if _models is None:
+        with _models_lock:
+            if _models is None:
+                from facenet_pytorch import MTCNN, InceptionResnetV1
+                
+                start = time.perf_counter()
+                mtcnn = MTCNN(keep_all=True)
+                resnet = InceptionResnetV1(pretrained=MODEL_NAME).eval()
+                _status["load_seconds"] = round(time.perf_counter() - start, 2)
+                _status["loaded"] = True
+                _models = (mtcnn, resnet)
+                logger.info(f"Loaded facenet models in {_status['load_seconds']}s")
+    return _models
+
+def warm_up():
+    """Load the models and run one dummy detection and embedding pass"""
+    try:
+        import torch
+        
+        mtcnn, resnet = get_models()
+        mtcnn(Image.new('RGB', (160, 160)))
+        with torch.no_grad():
+            resnet(torch.zeros((1, 3, 160, 160)))
+        _status["warmed_up"] = True
+        logger.info("Facenet warm-up complete")
+    except Exception as e:
+        _status["error"] = str(e)
+        logger.error(f"Facenet warm-up failed: {e}")
+
+def model_status() -> dict:
+    """Load/warm-up state of the facenet models, for readiness checks"""
+    return {"model": MODEL_NAME, **_status}
+
+def load_rgb(image: ImageInput) -> Image.Image:
+    """Load an image path or BGR array as an RGB PIL image"""
+    if isinstance(image, np.ndarray):
+        return Image.fromarray(np.ascontiguousarray(image[:, :, ::-1]))
+    return Image.open(image).convert('RGB')
+
+class FaceVerif(FaceEngine):
+    """facenet-pytorch (MTCNN detection + InceptionResnetV1 recognition) engine"""
+    
+    model_id = MODEL_NAME
+    dimension = 512
+    
     def __init__(self, image_path=None, selfie_path=None):
         self.image_path = image_path
         self.selfie_path = selfie_path
@@ -19,16 +77,71 @@ class FaceVerif:
         self.face_embeddings = None
         
         if image_path:
+            mtcnn, resnet = get_models()
             self.image = Image.open(image_path).convert('RGB')
             self.faces = mtcnn(self.image)
             if self.faces is not None:
                 self.face_embeddings = resnet(self.faces).detach().numpy()
     
+    def warm_up(self):
+        warm_up()
+    
+    def status(self) -> dict:
+        return model_status()
+    
+    def detect(self, image: ImageInput) -> List[dict]:
+        """Detect faces without running recognition"""
+        mtcnn, _ = get_models()
+        boxes, probs = mtcnn.detect(load_rgb(image))
+        if boxes is None:
+            return []
+        return [{
+            "face_index": i,
+            "bbox": [float(v) for v in box],
+            "det_score": float(prob)
+        } for i, (box, prob) in enumerate(zip(boxes, probs))]
+    
+    def embed_batch(self, images: List[ImageInput], batch_size: Optional[int] = None) -> List[List[dict]]:
+        """Detect faces image by image, then embed all 160x160 crops in batches"""
+        import torch
+        
+        mtcnn, resnet = get_models()
+        batch_size = batch_size or settings.RECOGNITION_BATCH_SIZE
+        
+        results, crops, owners = [], [], []
+        for image in images:
+            img = load_rgb(image)
+            # Landmarks feed the ingest quality gate's yaw estimate
+            boxes, probs, points = mtcnn.detect(img, landmarks=True)
+            
+            records = []
+            if boxes is not None:
+                faces = mtcnn.extract(img, boxes, None)
+                for i, (box, prob) in enumerate(zip(boxes, probs)):
+                    records.append({
+                        "face_index": i,
+                        "bbox": [float(v) for v in box],
+                        "det_score": float(prob),
+                        "kps": points[i]
+                    })
+                    crops.append(faces[i])
+                    owners.append(records[-1])
+            results.append(records)
+        
+        with torch.no_grad():
+            for start in range(0, len(crops), batch_size):
+                feats = normalize_rows(resnet(torch.stack(crops[start:start + batch_size])).numpy())
+                for record, feat in zip(owners[start:start + batch_size], feats):
+                    record["embedding"] = feat
+        
+        return results
+    
     def extract_faces(self):
         """Extract faces from the selfie image"""
         if not self.selfie_path:
             return None
             
+        mtcnn, resnet = get_models()
         img = Image.open(self.selfie_path)
         aligned = mtcnn(img)
         if aligned is not None:
@@ -41,6 +154,9 @@ class FaceVerif:
     def match_faces(self, selfie_path, image_path):
         """Match faces between two images"""
         try:
+            import torch
+            
+            mtcnn, resnet = get_models()
             img1 = Image.open(image_path)
             img2 = Image.open(selfie_path)
             
@@ -55,12 +171,8 @@ class FaceVerif:
             embeddings1 = resnet(faces1).detach()
             embeddings2 = resnet(faces2).detach()
             
-            # Calculate distances between all face pairs
-            min_distance = float('inf')
-            for i in range(len(embeddings1)):
-                for j in range(len(embeddings2)):
-                    distance = (embeddings1[i] - embeddings2[j]).norm().item()
-                    min_distance = min(min_distance, distance)
+            # Distances between all face pairs in one batched call
+            min_distance = torch.cdist(embeddings1, embeddings2).min().item()
             
             # Return match result and similarity score
             is_match = min_distance < 0.5
@@ -87,6 +199,10 @@ class FaceVerif:
         matches = []
         
         try:
+            import torch
+            
+            mtcnn, resnet = get_models()
+            
             # Extract face embedding from selfie
             selfie_img = Image.open(selfie_path)
             selfie_faces = mtcnn(selfie_img)
@@ -123,12 +239,8 @@ class FaceVerif:
                         # Get embeddings for bucket image faces
                         bucket_embeddings = resnet(bucket_faces).detach()
                         
-                        # Compare selfie faces with bucket image faces
-                        min_distance = float('inf')
-                        for i in range(len(selfie_embeddings)):
-                            for j in range(len(bucket_embeddings)):
-                                distance = (selfie_embeddings[i] - bucket_embeddings[j]).norm().item()
-                                min_distance = min(min_distance, distance)
+                        # Compare selfie faces with bucket image faces in one batched call
+                        min_distance = torch.cdist(selfie_embeddings, bucket_embeddings).min().item()
                         
                         # Check if this is a match
                         if min_distance < threshold:
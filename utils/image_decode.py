@@ -0,0 +1,62 @@
+import io
+import numpy as np
+from PIL import Image, ImageOps
+from typing import BinaryIO, List, NamedTuple, Optional, Tuple, Union
+
+ImageSource = Union[str, bytes, BinaryIO]
+
+EXIF_ORIENTATION = 0x0112
+
+class DecodedImage(NamedTuple):
+    """A decoded BGR image plus the factors that map it back to the original"""
+    bgr: np.ndarray
+    # Original (EXIF-oriented) width/height divided by the decoded width/height
+    scale: Tuple[float, float]
+    original_size: Tuple[int, int]
+
+def decode_image(source: ImageSource, max_side: Optional[int] = None) -> DecodedImage:
+    """
+    Decode an image for face detection, at reduced resolution if possible
+
+    For JPEGs, PIL's draft mode lets libjpeg scale by 1/2, 1/4 or 1/8 in the
+    DCT domain, so a 24-45 MP camera photo is never fully decoded when the
+    detector only looks at 640x640 anyway. Any remaining excess is removed
+    with a fast integer reduce(). EXIF orientation is applied afterwards.
+
+    Args:
+        source: Path, raw bytes or binary file object
+        max_side: Target long side in pixels (None decodes at full size)
+
+    Returns:
+        DecodedImage with a contiguous BGR array and the scale back to the
+        original oriented image (see scale_bbox)
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+
+    with Image.open(source) as img:
+        width, height = img.size
+        if max_side and max(width, height) > max_side:
+            ratio = max_side / max(width, height)
+            # Draft never goes below the requested size, so the long side stays >= max_side
+            img.draft('RGB', (int(width * ratio), int(height * ratio)))
+
+        # Orientations 5-8 are rotated by 90/270 degrees, swapping the dimensions
+        if img.getexif().get(EXIF_ORIENTATION, 1) in (5, 6, 7, 8):
+            width, height = height, width
+        img = ImageOps.exif_transpose(img)
+
+        if max_side:
+            factor = max(img.size) // max_side
+            if factor >= 2:
+                img = img.reduce(factor)
+
+        img = img.convert('RGB')
+        bgr = np.ascontiguousarray(np.asarray(img)[:, :, ::-1])
+
+    return DecodedImage(bgr, (width / bgr.shape[1], height / bgr.shape[0]), (width, height))
+
+def scale_bbox(bbox: List[float], scale: Tuple[float, float]) -> List[float]:
+    """Map [x1, y1, x2, y2] from decoded to original image coordinates"""
+    sx, sy = scale
+    return [bbox[0] * sx, bbox[1] * sy, bbox[2] * sx, bbox[3] * sy]
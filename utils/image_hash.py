@@ -0,0 +1,69 @@
+import cv2
+import numpy as np
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+# Long side photos are decoded to for hashing; JPEG draft mode makes this a 1/8-scale decode
+HASH_THUMBNAIL_SIDE = 128
+
+def dhash(image_bgr: np.ndarray) -> int:
+    """
+    64-bit difference hash of an image
+
+    The image is reduced to 9x8 grayscale and each bit says whether a pixel
+    is brighter than its right neighbour, so exposure shifts and recompression
+    barely change it while a different scene changes about half the bits.
+
+    Returns:
+        The hash as a signed 64-bit integer (fits a BIGINT column)
+    """
+    gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = np.packbits((small[:, 1:] > small[:, :-1]).ravel())
+    return int(bits.view('>i8')[0])
+
+def hamming_distances(hashes: np.ndarray, value: int) -> np.ndarray:
+    """Number of differing bits between each int64 hash and value"""
+    diff = (hashes ^ np.int64(value)).view(np.uint8).reshape(-1, 8)
+    return np.unpackbits(diff, axis=1).sum(axis=1)
+
+class NearDuplicateIndex:
+    """The latest frames of each event, each standing for the representative photo of its burst.
+
+    Burst frames are shot back to back, so a photo is only compared with
+    the last window photos of its event in upload order; similar shots
+    taken apart (portraits against one photo booth backdrop) must not share
+    faces. A photo within max_distance bits of the representative of one of
+    those frames is another frame of its burst, anything else becomes a
+    representative. Distances are to the representative's hash, so a burst
+    cannot drift away from it frame by frame.
+    """
+
+    def __init__(self, max_distance: int, window: int):
+        self.max_distance = max_distance
+        self.window = max(window, 1)
+        # event id -> (representative hash, representative photo id) of its latest frames
+        self._frames: Dict[int, Deque[Tuple[int, int]]] = {}
+
+    def add(self, event_id: int, representative_id: int, value: int):
+        """Record an event's latest frame: a representative, or a frame of the burst of representative_id (hash value)"""
+        self._frames.setdefault(event_id, deque(maxlen=self.window)).append((value, representative_id))
+
+    def remove(self, event_id: int, representative_id: int):
+        """Forget a representative and the frames of its burst, e.g. when its faces could not be stored"""
+        frames = self._frames.get(event_id)
+        if frames:
+            self._frames[event_id] = deque((frame for frame in frames if frame[1] != representative_id),
+                                           maxlen=self.window)
+
+    def match(self, event_id: int, value: int) -> Optional[Tuple[int, int]]:
+        """(representative photo id, its hash) of the closest recent frame within max_distance bits, or None"""
+        frames = self._frames.get(event_id)
+        if not frames:
+            return None
+        distances = hamming_distances(np.array([frame[0] for frame in frames], dtype=np.int64), value)
+        best = int(distances.argmin())
+        if distances[best] > self.max_distance:
+            return None
+        representative_hash, representative_id = frames[best]
+        return representative_id, representative_hash
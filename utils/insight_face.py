@@ -1,25 +1,85 @@
-from insightface.app import FaceAnalysis
 import numpy as np
 from PIL import Image
 import os
+import time
+import logging
 import tempfile
-from typing import List, Tuple
+import threading
+from typing import List, Optional, Tuple
+from config import settings
 from services.minio_service import minio_service
-from sklearn.metrics.pairwise import cosine_similarity
+from utils.face_engine import FaceEngine, ImageInput, load_bgr
+from utils.face_index import EventFaceIndex, normalize_rows
 
-# Initialize InsightFace (runs on GPU if available)
-app = FaceAnalysis(name='buffalo_l', providers=['CUDAExecutionProvider', 'CPUExecutionProvider'])
-app.prepare(ctx_id=0, det_size=(640, 640))  # ctx_id = 0 for GPU, -1 for CPU
+logger = logging.getLogger(__name__)
 
-class FaceVerif:
+MODEL_NAME = 'buffalo_l'
+
+# InsightFace is loaded on first use, so workers that never match faces
+# (or just /cms and /auth) don't pay for the import and model load
+_app = None
+_app_lock = threading.Lock()
+_status = {"loaded": False, "warmed_up": False, "load_seconds": None, "error": None}
+
+def get_app():
+    """Return the shared FaceAnalysis instance, loading it on first call (thread-safe)"""
+    global _app
+    if _app is None:
+        with _app_lock:
+            if _app is None:
+                from insightface.app import FaceAnalysis
+                
+                start = time.perf_counter()
+                # Initialize InsightFace (runs on GPU if available)
+                face_app = FaceAnalysis(name=MODEL_NAME, providers=['CUDAExecutionProvider', 'CPUExecutionProvider'])
+                face_app.prepare(ctx_id=0, det_size=(640, 640))  # ctx_id = 0 for GPU, -1 for CPU
+                _status["load_seconds"] = round(time.perf_counter() - start, 2)
+                _status["loaded"] = True
+                _app = face_app
+                logger.info(f"Loaded InsightFace {MODEL_NAME} in {_status['load_seconds']}s")
+    return _app
+
+def warm_up():
+    """Load the models and run one dummy detection and recognition pass.
+    
+    The first ONNX Runtime run of a session does graph optimization and
+    memory planning; doing it here keeps that cost off the first guest's
+    request.
+    """
+    try:
+        face_app = get_app()
+        face_app.det_model.detect(np.zeros((640, 640, 3), dtype=np.uint8), max_num=0, metric='default')
+        face_app.models['recognition'].get_feat([np.zeros((112, 112, 3), dtype=np.uint8)])
+        _status["warmed_up"] = True
+        logger.info("InsightFace warm-up complete")
+    except Exception as e:
+        _status["error"] = str(e)
+        logger.error(f"InsightFace warm-up failed: {e}")
+
+def model_status() -> dict:
+    """Load/warm-up state of the InsightFace models, for readiness checks"""
+    return {"model": MODEL_NAME, **_status}
+
+class FaceVerif(FaceEngine):
+    """InsightFace (buffalo_l: SCRFD detection + ArcFace recognition) engine"""
+    
+    model_id = MODEL_NAME
+    dimension = 512
+    
     def __init__(self):
         pass
     
+    def warm_up(self):
+        warm_up()
+    
+    def status(self) -> dict:
+        return model_status()
+    
     def extract_faces(self, image_path):
         """Extract faces from the image"""
         img = Image.open(image_path).convert('RGB')
         img_bgr = np.array(img)[:, :, ::-1]
-        faces = app.get(img_bgr)
+        faces = get_app().get(img_bgr)
         
         if faces:
             embeddings = np.array([face['embedding'] for face in faces])
@@ -27,6 +87,70 @@ class FaceVerif:
         else:
             return None
     
+    def detect(self, image: ImageInput) -> List[dict]:
+        """Detect faces without running recognition"""
+        bboxes, kpss = get_app().det_model.detect(load_bgr(image), max_num=0, metric='default')
+        return [{
+            "face_index": i,
+            "bbox": [float(v) for v in bboxes[i, :4]],
+            "det_score": float(bboxes[i, 4]),
+            "kps": kpss[i]
+        } for i in range(bboxes.shape[0])]
+    
+    def embed_batch(self, images: List[ImageInput], batch_size: Optional[int] = None) -> List[List[dict]]:
+        return self.extract_faces_batch(images, batch_size)
+    
+    def extract_faces_batch(self, images: List[ImageInput], batch_size: Optional[int] = None) -> List[List[dict]]:
+        """
+        Detect faces image by image, then embed all aligned crops in batches
+        
+        FaceAnalysis.get runs every model (including landmarks and
+        gender/age) and the recognition model one face at a time. Here only
+        detection runs per image; the 112x112 ArcFace crops of all images are
+        sent through the recognition session batch_size at a time. The
+        embeddings match normed_embedding from app.get within float tolerance.
+        
+        Args:
+            images: Image paths or BGR arrays
+            batch_size: Crops per recognition call (default RECOGNITION_BATCH_SIZE)
+            
+        Returns:
+            One list of face records per image, each with face_index, bbox,
+            det_score, kps and an L2-normalized float32 embedding
+        """
+        from insightface.utils import face_align
+        
+        face_app = get_app()
+        rec_model = face_app.models['recognition']
+        batch_size = batch_size or settings.RECOGNITION_BATCH_SIZE
+        # Models exported with a fixed batch dimension can only take one crop per run
+        if rec_model.session.get_inputs()[0].shape[0] == 1:
+            batch_size = 1
+        
+        results, crops, owners = [], [], []
+        for image_idx, image in enumerate(images):
+            img = load_bgr(image)
+            bboxes, kpss = face_app.det_model.detect(img, max_num=0, metric='default')
+            
+            records = []
+            for i in range(bboxes.shape[0]):
+                records.append({
+                    "face_index": i,
+                    "bbox": [float(v) for v in bboxes[i, :4]],
+                    "det_score": float(bboxes[i, 4]),
+                    "kps": kpss[i]
+                })
+                crops.append(face_align.norm_crop(img, landmark=kpss[i], image_size=rec_model.input_size[0]))
+                owners.append(records[-1])
+            results.append(records)
+        
+        for start in range(0, len(crops), batch_size):
+            feats = normalize_rows(rec_model.get_feat(crops[start:start + batch_size]))
+            for record, feat in zip(owners[start:start + batch_size], feats):
+                record["embedding"] = feat
+        
+        return results
+    
     def match_faces(self, selfie_path, image_path):
         """Match faces between two images"""
         try:
@@ -34,18 +158,18 @@ class FaceVerif:
             img2 = Image.open(selfie_path).convert('RGB')
             
             # Detect faces in both images
-            faces1 = app.get(np.array(img1)[:, :, ::-1])
-            faces2 = app.get(np.array(img2)[:, :, ::-1])
+            faces1 = get_app().get(np.array(img1)[:, :, ::-1])
+            faces2 = get_app().get(np.array(img2)[:, :, ::-1])
             
             if not faces1 or not faces2:
                 return False, 0.0
             
             # Get embeddings for all faces
-            embs1 = np.array([f['embedding'] for f in faces1])
-            embs2 = np.array([f['embedding'] for f in faces2])
+            embs1 = normalize_rows(np.array([f['embedding'] for f in faces1]))
+            embs2 = normalize_rows(np.array([f['embedding'] for f in faces2]))
             
-            # Calculate similarities between all face pairs
-            sim_matrix = cosine_similarity(embs1, embs2)
+            # Cosine similarities between all face pairs in one product
+            sim_matrix = embs1 @ embs2.T
             max_similarity = sim_matrix.max()  # highest similarity between any pair
 
             # Cosine similarity ranges from -1 to 1; for ArcFace embeddings, usually 0.2–1.0
@@ -58,14 +182,18 @@ class FaceVerif:
             print(f"Error in match_faces: {e}")
             return False, 0.0
     
-    def match_selfie_with_bucket_images(self, selfie_path: str, bucket_name: str, threshold: float = 0.5) -> List[Tuple[str, float]]:
+    def match_selfie_with_bucket_images(self, selfie_path: str, bucket_name: str, threshold: float = 0.5, top_k: Optional[int] = None) -> List[Tuple[str, float]]:
         """
         Match a selfie with all images in a MinIO bucket
         
+        Slow path that re-detects every image; selfie_match uses the stored
+        embeddings via FaceEngine.search_event instead.
+        
         Args:
             selfie_path: Path to the selfie image
             bucket_name: Name of the MinIO bucket containing images to match against
-            threshold: Distance threshold for matching (lower = stricter)
+            threshold: Cosine similarity threshold for matching (higher = stricter)
+            top_k: Maximum number of matches to return (None for all)
             
         Returns:
             List of tuples containing (image_name, similarity_score) for matches
@@ -75,17 +203,20 @@ class FaceVerif:
         try:
             # Extract face embedding from selfie
             selfie_img = Image.open(selfie_path).convert('RGB')
-            selfie_faces = app.get(np.array(selfie_img)[:, :, ::-1])
+            selfie_faces = get_app().get(np.array(selfie_img)[:, :, ::-1])
             
             if not selfie_faces:
                 print("No faces detected in selfie")
                 return matches
                 
-            selfie_embs = np.array([f['embedding'] for f in selfie_faces])
+            selfie_embs = np.array([f.normed_embedding for f in selfie_faces], dtype=np.float32)
             
             # List all files in the bucket
             file_list = minio_service.list_files(bucket_name)
             
+            # Collect every face of every image, then score them all at once
+            embeddings, image_ids, image_names = [], [], []
+            
             # Temporary directory for downloading images
             with tempfile.TemporaryDirectory() as temp_dir:
                 for file_name in file_list:
@@ -96,23 +227,22 @@ class FaceVerif:
                     minio_service.download_file(bucket_name, file_name, temp_file_path)
                     
                     bucket_img = Image.open(temp_file_path).convert('RGB')
-                    bucket_faces = app.get(np.array(bucket_img)[:, :, ::-1])
-                    
-                    if not bucket_faces:
-                        continue
-                        
-                    bucket_embs = np.array([f['embedding'] for f in bucket_faces])
+                    bucket_faces = get_app().get(np.array(bucket_img)[:, :, ::-1])
                     
-                    # Calculate cosine similarities between all face pairs
-                    similarities = cosine_similarity(selfie_embs, bucket_embs)
-                    max_similarity = similarities.max()
-                    
-                    if max_similarity > threshold:  # threshold closer to 1 means more similar
-                        matches.append((file_name, float(max_similarity)))
+                    for face in bucket_faces:
+                        embeddings.append(face.normed_embedding)
+                        image_ids.append(len(image_names))
+                    image_names.append(file_name)
+            
+            if not embeddings:
+                return matches
+            
+            image_ids = np.array(image_ids, dtype=np.int64)
+            index = EventFaceIndex(0, np.array(embeddings), image_ids, image_ids, MODEL_NAME)
+            for image_id, similarity in index.search(selfie_embs, top_k=top_k, threshold=threshold):
+                matches.append((image_names[image_id], similarity))
                         
         except Exception as e:
             print(f"Error in match_selfie_with_bucket_images: {e}")
             
-        # Sort matches by similarity (highest first)
-        matches.sort(key=lambda x: x[1], reverse=True)
-        return matches
\ No newline at end of file
+        return matches